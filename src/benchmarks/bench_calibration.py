@@ -0,0 +1,76 @@
+"""Projector calibration: legacy per-point loop + plain solvePnP vs the batched robust solver.
+
+Synthetic captures with a known projector (core.calibration.synthetic_correspondences),
+from one board session up to thousands of correspondences with outliers.
+Reports solve time and the reprojection error on the true inliers, after
+checking that pure-outlier input is rejected rather than "calibrated".
+Run from the repo root:
+
+    python src/benchmarks/bench_calibration.py [--outliers 0.1] [--sizes 6 100 400]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from core.calibration import KINECT_INTRINSICS, solve_projector, synthetic_correspondences
+
+def legacy_solve(uvd, proj_pts):
+    """The pre-solver KinectProjector.solve_matrix: Kinect intrinsics stand in for the projector's."""
+    fx, fy, cx, cy = KINECT_INTRINSICS
+    camera_matrix = np.array([[fx, 0, cx], [0, fy, cy], [0, 0, 1]], np.float32)
+    obj_pts = []
+    for u, v, d in uvd:
+        z = float(d)
+        obj_pts.append([(u - cx) * z / fx, (v - cy) * z / fy, z])
+    obj_pts = np.array(obj_pts, np.float32)
+    _, rvec, tvec = cv2.solvePnP(obj_pts, np.array(proj_pts, np.float32), camera_matrix, None)
+    return obj_pts, camera_matrix, rvec, tvec
+
+def check_all_outliers(n=120, seed=0):
+    """Random, unrelated pairs must raise ValueError, not come back as a calibration."""
+    rng = np.random.default_rng(seed)
+    uvd = np.column_stack([rng.uniform(0, 640, n), rng.uniform(0, 480, n), rng.uniform(800, 1100, n)])
+    proj = rng.uniform(0, [1024, 768], (n, 2))
+    try:
+        result = solve_projector(uvd, proj)
+    except ValueError as e:
+        print(f"{n} pure-outlier pairs rejected: {e}")
+        return
+    sys.exit(f"{n} pure-outlier pairs were accepted ({result.inliers.sum()} inliers, rms {result.rms:.2f} px)")
+
+def rms(projected, target):
+    return float(np.sqrt(np.mean(np.sum((projected.reshape(-1, 2) - target) ** 2, axis=1))))
+
+def run(sizes, outliers):
+    check_all_outliers()
+    print(f"{'pairs':>7}{'legacy ms':>11}{'legacy rms':>12}{'solver ms':>11}{'solver rms':>12}{'kept':>7}{'focal err':>11}")
+    for poses in sizes:
+        uvd, proj, truth = synthetic_correspondences(poses=poses, outliers=outliers)
+        clean = ~truth["outliers"]
+
+        t0 = time.perf_counter()
+        obj_pts, K, rvec, tvec = legacy_solve(uvd, proj)
+        t_legacy = 1000 * (time.perf_counter() - t0)
+        legacy_rms = rms(cv2.projectPoints(obj_pts[clean], rvec, tvec, K, None)[0], proj[clean])
+
+        t0 = time.perf_counter()
+        result = solve_projector(uvd, proj)
+        t_solver = 1000 * (time.perf_counter() - t0)
+        solver_rms = float(np.sqrt(np.mean(result.errors[clean] ** 2)))
+        focal_err = abs(result.K[0, 0] - truth["K"][0, 0]) / truth["K"][0, 0]
+
+        print(f"{len(uvd):>7}{t_legacy:>11.1f}{legacy_rms:>12.2f}{t_solver:>11.1f}{solver_rms:>12.2f}"
+              f"{result.inliers.mean():>7.0%}{focal_err:>11.2%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--outliers", type=float, default=0.1)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 100, 400], help="board positions per run")
+    args = parser.parse_args()
+    run(args.sizes, args.outliers)
@@ -0,0 +1,95 @@
+"""Offline calibration from a recorded session: serial vs process-pool corner detection.
+
+Renders a synthetic calibration session (a known projector throwing
+chessboards onto tilted boards, seen by the Kinect's RGB and depth),
+records it as a .gbs file with its .captures.json sidecar, then re-runs
+the calibration from disk with 1 and with N detection workers.
+Run from the repo root:
+
+    python src/benchmarks/bench_calibration_session.py [--captures 18] [--workers 4]
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from core.calibration import KINECT_INTRINSICS
+from core.calibration_pipeline import calibrate_session, detect_session, save_captures
+from core.KinectProjector import KinectProjector
+from core.session import SessionWriter
+
+def record_session(path, n_captures, seed=0):
+    """Writes the session and sidecar; returns the true projector intrinsics."""
+    rng = np.random.default_rng(seed)
+    proj = KinectProjector(1024, 768)
+    pw, ph = proj.proj_res
+    K = np.array([[1.4 * pw, 0, pw / 2], [0, 1.4 * pw, ph * 0.9], [0, 0, 1]])
+    R = cv2.Rodrigues(np.array([0.05, -0.03, 0.01]))[0]
+    t = np.array([50.0, -150.0, 40.0])
+    fx, fy, cx, cy = KINECT_INTRINSICS
+    vv, uu = np.mgrid[0:480, 0:640].astype(np.float64)
+    rays = np.stack([(uu - cx) / fx, (vv - cy) / fy, np.ones_like(uu)], axis=-1)
+
+    square = KinectProjector.pattern_square(300)
+    board_w, board_h = 7 * square, 6 * square
+    writer = SessionWriter(path, chunk_frames=4)
+    captures = []
+    for i in range(n_captures):
+        x0 = int(rng.uniform(40, pw - board_w - 40))
+        y0 = int(rng.uniform(40, ph - board_h - 40))
+        pattern = cv2.cvtColor(proj.generate_pattern(x0, y0, 300), cv2.COLOR_BGR2GRAY)
+
+        # Board plane n . X = d in Kinect space; every Kinect pixel's ray meets it
+        n = np.array([rng.uniform(-0.1, 0.1), rng.uniform(-0.1, 0.1), 1.0])
+        n /= np.linalg.norm(n)
+        d = rng.uniform(800, 1100)
+        X = rays * (d / (rays @ n))[..., None]
+        ph_ = (X @ R.T + t) @ K.T
+        map_x = (ph_[..., 0] / ph_[..., 2]).astype(np.float32)
+        map_y = (ph_[..., 1] / ph_[..., 2]).astype(np.float32)
+        gray = cv2.remap(pattern, map_x, map_y, cv2.INTER_LINEAR, borderValue=40)
+        gray = np.clip(gray * 0.8 + 20 + rng.normal(0, 3, gray.shape), 0, 255).astype(np.uint8)
+        depth = X[..., 2] + rng.normal(0, 1.5, X.shape[:2])
+        depth[rng.random(depth.shape) < 0.05] = 0 # Kinect holes
+        writer.write(depth.astype(np.uint16), cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB))
+        captures.append({"frame": i, "origin": [x0, y0], "square": square})
+    writer.close()
+    save_captures(path, captures)
+    return K
+
+def run(n_captures, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calibration.gbs")
+        K_true = record_session(path, n_captures)
+        frames = list(range(n_captures))
+
+        t0 = time.perf_counter()
+        detect_session(path, frames, workers=1)
+        t_serial = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        detect_session(path, frames, workers=workers)
+        t_pool = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        calibrator, report = calibrate_session(path, workers=workers)
+        t_total = time.perf_counter() - t0
+
+    found = sum(1 for n in report.values() if n)
+    focal_err = abs(calibrator.projector_matrix[0, 0] - K_true[0, 0]) / K_true[0, 0]
+    print(f"{n_captures} captures, boards found in {found}, {sum(report.values())} corner pairs")
+    print(f"  detect + sample, 1 worker     {1000 * t_serial:8.0f} ms")
+    print(f"  detect + sample, {workers} workers    {1000 * t_pool:8.0f} ms")
+    print(f"  full re-calibration           {1000 * t_total:8.0f} ms   focal error {focal_err:.2%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--captures", type=int, default=18)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    run(args.captures, args.workers)
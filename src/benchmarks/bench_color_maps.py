@@ -0,0 +1,87 @@
+"""Colour lookup cost: 3-channel merge + cv2.LUT vs single-channel lookups from cached tables.
+
+Times colouring one 640x480 index image, the legacy create_topo_map against
+TerrainProcessor's, what switching colour maps costs once the tables are
+cached, and a tide sweep: re-baking the table per sea level vs moving the
+index affine. Run from the repo root:
+
+    python src/benchmarks/bench_color_maps.py [--frames 200]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from core.processor import TerrainProcessor
+from modules.color_maps import ColorMapManager
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def legacy_topo_map(processor, elevation):
+    """The pre-cache TerrainProcessor.create_topo_map."""
+    norm = (np.clip(elevation / 254.0, 0, 1) * 255).astype(np.uint8)
+    return cv2.LUT(cv2.merge([norm, norm, norm]), processor.terrain_lut)
+
+def run(frames):
+    rng = np.random.default_rng(0)
+    index8 = rng.integers(0, 256, (480, 640), np.uint8)
+    index12 = rng.integers(0, 4096, (480, 640)).astype(np.uint16)
+    elevation = rng.uniform(-50, 300, (480, 640)).astype(np.float32)
+
+    cmap = ColorMapManager()
+    names = cmap.get_names()
+    cmap.set_map_by_name(names[-1]) # The XML tints
+    custom = cmap.custom_lut
+    processor = TerrainProcessor()
+
+    def switch_maps():
+        for name in names:
+            cmap.set_map_by_name(name)
+            cmap.get_lut()
+
+    def cold_tables():
+        cmap._tables.clear()
+        switch_maps()
+
+    print(f"{'path':>38}{'ms':>9}")
+    print(f"{'merge + cv2.LUT (uint8)':>38}{time_it(lambda: cv2.LUT(cv2.merge([index8] * 3), custom), frames):>9.3f}")
+    print(f"{'apply, 256-entry table (uint8)':>38}{time_it(lambda: cmap.apply(index8), frames):>9.3f}")
+    print(f"{'apply, 4096-entry table (uint16)':>38}{time_it(lambda: cmap.apply(index12), frames):>9.3f}")
+    print(f"{'legacy create_topo_map':>38}{time_it(lambda: legacy_topo_map(processor, elevation), frames):>9.3f}")
+    print(f"{'create_topo_map':>38}{time_it(lambda: processor.create_topo_map(elevation), frames):>9.3f}")
+    print(f"{f'switch through {len(names)} maps, cold':>38}{time_it(cold_tables, 10):>9.3f}")
+    print(f"{f'switch through {len(names)} maps, cached':>38}{time_it(switch_maps, frames):>9.3f}")
+
+    # Tide: a new sea level every frame, then colour the elevation
+    tide = [0]
+    map_key = cmap._map_key()
+
+    def baked_tide():
+        tide[0] = (tide[0] + 1) % 200
+        lut = cmap._build(map_key, tide[0] - 100.0, *cmap.table_range, 256).reshape(256, 1, 3)
+        alpha, beta = cmap.index_transform()
+        cv2.addWeighted(elevation, alpha, elevation, 0, beta, dst=index8, dtype=cv2.CV_8U)
+        return cv2.applyColorMap(index8, lut)
+
+    def affine_tide():
+        tide[0] = (tide[0] + 1) % 200
+        return cmap.apply_elevation(elevation, sea_level=tide[0] - 100.0)
+
+    print(f"{'tide: re-bake table + colour':>38}{time_it(baked_tide, frames):>9.3f}")
+    print(f"{'tide: index affine + colour':>38}{time_it(affine_tide, frames):>9.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+    run(args.frames)
@@ -0,0 +1,77 @@
+"""Contour matching: global RMSE + min/max-normalised heatmap vs the tiled match engine.
+
+Scores a synthetic live elevation against target DEMs: the legacy
+calculate_matching_guide, the engine's per-tile RMSE and cut/fill volumes
+with its fixed-scale heatmap, and several targets scored at once.
+Run from the repo root:
+
+    python src/benchmarks/bench_contour_match.py [--frames 200] [--targets 4] [--tile 32]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from modules.contour_match import ContourMatchEngine
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def legacy_guide(live, target):
+    """The pre-engine ContourMatchManager.calculate_matching_guide."""
+    diff = live.astype(np.float32) - target
+    score = np.sqrt(np.mean(diff**2))
+    norm_diff = cv2.normalize(diff, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    return cv2.applyColorMap(norm_diff, cv2.COLORMAP_JET), score
+
+def run(frames, n_targets, tile):
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:480, 0:640].astype(np.float32)
+    live = (100 * np.sin(xx / 70) * np.cos(yy / 50)).astype(np.float32)
+    targets = [(live + rng.normal(0, 10, live.shape) + 30 * np.sin(xx / (40 + 10 * i))).astype(np.float32)
+               for i in range(n_targets)]
+
+    engine = ContourMatchEngine(tile=tile)
+    for i, dem in enumerate(targets):
+        engine.set_target(i, dem)
+
+    # Engine vs a straight NumPy reduction
+    stats = engine.score(live, [0])[0]
+    diff = (live - targets[0]).astype(np.float64)
+    g = engine.grid
+    padded = np.zeros((g[0] * tile, g[1] * tile))
+    padded[:480, :640] = diff
+    net = padded.reshape(g[0], tile, g[1], tile).sum(axis=(1, 3)) * engine.pixel_ml
+    rmse_err = abs(stats.rmse - np.sqrt(np.mean(diff ** 2)))
+    vol_err = np.abs(stats.cut_ml - stats.fill_ml - net).max()
+
+    def engine_one():
+        engine.score(live, [0])
+        engine.heatmap(0)
+
+    print(f"640x480, {tile}px tiles ({g[0]}x{g[1]}), {frames} frames")
+    print(f"  check: |rmse - numpy| {rmse_err:.2e} mm, max |tile volume - numpy| {vol_err:.2e} ml")
+    print(f"{'path':>40}{'ms':>9}")
+    print(f"{'legacy guide (1 target)':>40}{time_it(lambda: legacy_guide(live, targets[0]), frames):>9.3f}")
+    print(f"{'engine score + heatmap (1 target)':>40}{time_it(engine_one, frames):>9.3f}")
+    print(f"{f'legacy guide x{n_targets}':>40}"
+          f"{time_it(lambda: [legacy_guide(live, t) for t in targets], frames):>9.3f}")
+    print(f"{f'engine score, {n_targets} targets':>40}{time_it(lambda: engine.score(live), frames):>9.3f}")
+    engine.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--targets", type=int, default=4)
+    parser.add_argument("--tile", type=int, default=32)
+    args = parser.parse_args()
+    run(args.frames, args.targets, args.tile)
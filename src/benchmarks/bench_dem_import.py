@@ -0,0 +1,67 @@
+"""DEM import: whole-file load + INTER_AREA vs the streaming area-average importer.
+
+Writes a synthetic square 16-bit heightmap (.r16) of --size pixels per
+side to a temporary directory, then converts it to a 640x480 target both
+ways, reporting time and peak Python-side memory (tracemalloc).
+Run from the repo root:
+
+    python src/benchmarks/bench_dem_import.py [--size 8000] [--chunk-mb 64]
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+import modules.dem_import as dem_import
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, 1000 * elapsed, peak / 2**20
+
+def whole_file(path, size):
+    """Load everything, resample once: what a plain np.fromfile / imread importer does."""
+    z = np.fromfile(path, dtype="<u2").astype(np.float32)
+    side = int(round(len(z) ** 0.5))
+    dem = cv2.resize(z.reshape(side, side), size[::-1], interpolation=cv2.INTER_AREA)
+    return dem_import.rescale_heights(dem, (0.0, 150.0))
+
+def run(size, chunk_mb):
+    dem_import.CHUNK_BYTES = chunk_mb << 20
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tile.r16")
+        src = np.memmap(path, dtype="<u2", mode="w+", shape=(size, size))
+        x = np.arange(size, dtype=np.float32)
+        for y0 in range(0, size, 512): # Written in bands: the generator must not need the RAM either
+            y = x[y0:y0 + 512, None]
+            src[y0:y0 + 512] = (3000 + 2000 * np.sin(x / 700) * np.cos(y / 500)).astype(np.uint16)
+        src.flush()
+        del src
+
+        target = (480, 640)
+        full, t_full, m_full = measure(lambda: whole_file(path, target))
+        streamed, t_stream, m_stream = measure(lambda: dem_import.import_dem(path, target))
+
+    print(f"{size}x{size} uint16 ({size * size * 2 / 2**20:.0f} MB) -> 640x480, {chunk_mb} MB chunks")
+    print(f"{'path':>24}{'ms':>9}{'peak MB':>10}")
+    print(f"{'whole file':>24}{t_full:>9.0f}{m_full:>10.0f}")
+    print(f"{'streamed':>24}{t_stream:>9.0f}{m_stream:>10.0f}")
+    print(f"  max |streamed - whole file| {np.abs(full - streamed).max():.4f} mm")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=8000)
+    parser.add_argument("--chunk-mb", type=int, default=64)
+    args = parser.parse_args()
+    run(args.size, args.chunk_mb)
@@ -0,0 +1,51 @@
+"""Operator-view conversion cost: tobytes/rgbSwapped/QPixmap.scaled vs FrameBridge.
+
+Times turning one rendered 640x480 frame into something a widget can paint
+at the operator view's size. Run from the repo root (works headless with
+QT_QPA_PLATFORM=offscreen):
+
+    python src/benchmarks/bench_frame_bridge.py [--frames 200] [--size 950x712]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtCore import Qt, QSize
+
+from ui.frame_bridge import FrameBridge
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def run(frames, size):
+    app = QApplication.instance() or QApplication(sys.argv)
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), np.uint8)
+    target = QSize(*size)
+
+    def legacy():
+        """The pre-bridge ARSMainWindow.update_frame step 4."""
+        h, w, ch = frame.shape
+        qt_img = QImage(frame.data.tobytes(), w, h, ch * w, QImage.Format_RGB888).rgbSwapped()
+        return QPixmap.fromImage(qt_img).scaled(target, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    bridge = FrameBridge(order="rgb")
+    print(f"{'path':>36}{'ms/frame':>10}")
+    print(f"{'tobytes + rgbSwapped + smooth scale':>36}{time_it(legacy, frames):>10.2f}")
+    print(f"{'FrameBridge.upload_scaled':>36}{time_it(lambda: bridge.upload_scaled(frame, size), frames):>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--size", default="950x712")
+    args = parser.parse_args()
+    run(args.frames, tuple(int(v) for v in args.size.split("x")))
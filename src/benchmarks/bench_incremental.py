@@ -0,0 +1,84 @@
+"""Full redraw vs dirty-tile redraw of the terrain colouring and projector warp.
+
+Simulates a hand digging in one corner of a still sandbox: each frame a
+small Gaussian bump moves a little, the rest of the elevation only carries
+sensor noise below the change threshold. Run from the repo root:
+
+    python src/benchmarks/bench_incremental.py [--frames 200] [--tile 32] [--radius 40]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from core.change_detector import ChangeDetector
+from core.projector_warp import ProjectorWarp
+from core.renderer import TerrainRenderer
+from modules.color_maps import ColorMapManager
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def run(frames, tile, radius):
+    homography = np.load("homography_matrix.npy") if os.path.exists("homography_matrix.npy") else np.eye(3)
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:480, 0:640].astype(np.float32)
+    base = 120 * np.sin(xx / 60) * np.cos(yy / 45)
+    noise = [rng.normal(0, 0.25, base.shape).astype(np.float32) for _ in range(8)]
+    lut = ColorMapManager().get_lut()
+    step = [0]
+
+    def next_elevation():
+        """A bump wandering around the top-left corner, plus sub-threshold noise."""
+        i = step[0] = step[0] + 1
+        cx, cy = 120 + 40 * np.cos(i / 10), 100 + 30 * np.sin(i / 10)
+        bump = 60 * np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * radius ** 2))
+        return (base + bump + noise[i % len(noise)]).astype(np.float32)
+
+    elevations = [next_elevation() for _ in range(64)]
+
+    def pipeline(detector, renderer, warp, incremental):
+        def frame():
+            elevation = elevations[step[0] % len(elevations)]
+            step[0] += 1
+            if incremental:
+                detector.update(elevation)
+                terrain = renderer.render(elevation, lut, detector.rects())
+                warp.warp(terrain, renderer.drawn_rects)
+            else:
+                terrain = renderer.render(elevation, lut)
+                warp.warp(terrain)
+        return frame
+
+    results = {}
+    for incremental in (False, True):
+        detector = ChangeDetector(tile=tile)
+        renderer = TerrainRenderer(use_numba=False)
+        warp = ProjectorWarp((1024, 768), scale=1.05)
+        warp.set_homography(homography)
+        step[0] = 0
+        results[incremental] = time_it(pipeline(detector, renderer, warp, incremental), frames)
+        if incremental:
+            dirty_src, dirty_dst = detector.dirty_fraction, warp.dirty_fraction
+
+    full, inc = results[False], results[True]
+    print(f"640x480 -> 1024x768, {tile}px tiles, {frames} frames")
+    print(f"  full render + warp       {full:6.2f} ms/frame")
+    print(f"  dirty tiles only         {inc:6.2f} ms/frame   x{full / inc:.1f}")
+    print(f"  last frame: {100 * dirty_src:.0f}% of source tiles, {100 * dirty_dst:.0f}% of projector tiles")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--tile", type=int, default=32)
+    parser.add_argument("--radius", type=float, default=40)
+    args = parser.parse_args()
+    run(args.frames, args.tile, args.radius)
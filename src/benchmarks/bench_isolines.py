@@ -0,0 +1,86 @@
+"""Contour cost: band-edge raster contours vs marching-squares isolines (full and per tile).
+
+Renders one synthetic sandbox frame with the TerrainRenderer's raster
+contours, then with an IsolineEngine: a full trace + draw, the incremental
+case where a single tile changed, and a stream of noisy frames through a
+ChangeDetector (the live path: only tiles whose level set moved are
+re-traced). Run from the repo root:
+
+    python src/benchmarks/bench_isolines.py [--frames 50] [--noise 0.5] [--interval 20]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from core.depth_source import SyntheticDepthSource
+from core.renderer import TerrainRenderer
+from core.change_detector import ChangeDetector
+from core.temporal_filter import EMAFilter
+from modules.color_maps import ColorMapManager
+from modules.isolines import IsolineEngine
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def run(frames, noise, interval):
+    source = SyntheticDepthSource(noise_mm=noise)
+    elevation = source.floor_mm - source.read()[0].astype(np.float32)
+    lut = ColorMapManager().get_lut()
+
+    raster = TerrainRenderer(contour_interval=interval, use_numba=False)
+    vector = TerrainRenderer(contour_interval=interval, use_numba=False, isolines=IsolineEngine(tile=32))
+    vector.render(elevation, lut)
+    engine = vector.isolines
+    polylines = sum(len(t.lengths) for t in engine._tiles.values())
+    vertices = sum(len(t.points) for t in engine._tiles.values())
+    one_tile = [(224, 256, 320, 352)]
+
+    t_raster = time_it(lambda: raster.render(elevation, lut), frames)
+    def full():
+        engine.invalidate() # Re-trace every tile, not just the ones whose level set moved
+        vector.render(elevation, lut)
+
+    t_full = time_it(full, frames)
+    t_tile = time_it(lambda: vector.render(elevation, lut, one_tile), frames)
+
+    print(f"640x480, interval {interval} mm, noise {noise} mm: {polylines} polylines, {vertices} vertices")
+    print(f"  band-edge raster contours   {t_raster:6.2f} ms/frame")
+    print(f"  isolines, full re-trace     {t_full:6.2f} ms/frame")
+    print(f"  isolines, one dirty tile    {t_tile:6.2f} ms/frame")
+
+    # Live stream: EMA-smoothed sensor frames, redrawn where the ChangeDetector says
+    for label, moving in (("still sand", False), ("drifting hills", True)):
+        stream = SyntheticDepthSource(noise_mm=max(noise, 2.0))
+        if not moving:
+            stream.speeds[:] = 0
+        smoother = EMAFilter(0.3, stream.height, stream.width)
+        seq = [stream.floor_mm - smoother.apply(stream.read()[0]).astype(np.float32) for _ in range(frames + 5)]
+        detector = ChangeDetector(tile=32, threshold_mm=2.0)
+        live = TerrainRenderer(contour_interval=interval, use_numba=False, isolines=IsolineEngine(tile=32))
+        retraced = 0
+        for i, frame in enumerate(seq):
+            if i == 5: # Past the first full frames
+                t0 = time.perf_counter()
+            detector.update(frame)
+            live.render(frame, lut, detector.rects())
+            retraced += live.isolines.retraced if i >= 5 else 0
+        t_live = 1000 * (time.perf_counter() - t0) / frames
+        tiles = np.prod(detector.mask.shape)
+        print(f"  isolines, {label + ',':<15} {t_live:6.2f} ms/frame   ({retraced / frames:.0f}/{tiles} tiles re-traced)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--interval", type=int, default=20)
+    args = parser.parse_args()
+    run(args.frames, args.noise, args.interval)
@@ -0,0 +1,50 @@
+"""Particle drawing cost: one cv2.circle per drop vs the batched ParticleCompositor.
+
+Run from the repo root:
+
+    python src/benchmarks/bench_particle_render.py [--frames 30]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from modules.particle_render import ParticleCompositor
+
+COUNTS = [300, 3_000, 30_000, 100_000, 300_000]
+
+def legacy_draw(frame, particles):
+    """The per-particle loop from the original rain window."""
+    for p in particles:
+        cv2.circle(frame, (int(p[0]), int(p[1])), 2, (255, 0, 0), -1)
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def run(frames):
+    rng = np.random.default_rng(0)
+    terrain = np.full((480, 640, 3), 90, np.uint8)
+    compositor = ParticleCompositor()
+    print(f"{'particles':>10}{'cv2.circle':>12}{'compositor':>12}   (ms/frame)")
+    for n in COUNTS:
+        x = rng.random(n, dtype=np.float32) * 639
+        y = rng.random(n, dtype=np.float32) * 479
+        frame = terrain.copy()
+        t_legacy = time_it(lambda: legacy_draw(frame, np.stack([x, y], 1)), frames)
+        t_batched = time_it(lambda: compositor.render(frame, x, y), frames)
+        print(f"{n:>10}{t_legacy:>12.2f}{t_batched:>12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+    run(args.frames)
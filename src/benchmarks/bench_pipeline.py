@@ -0,0 +1,75 @@
+"""Headless throughput benchmark for the per-frame pipeline.
+
+Feeds frames from a DepthSource (synthetic by default) through TerrainProcessor,
+ColorMapManager and the projector warp as fast as they will go, and prints the
+per-stage cost. Run from the repo root:
+
+    python src/benchmarks/bench_pipeline.py [--source synthetic|replay:file.npy] [--frames 300]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from core.depth_source import create_depth_source
+from core.frame import DepthFrame
+from core.processor import TerrainProcessor
+from core.temporal_filter import EMAFilter
+from modules.color_maps import ColorMapManager
+
+def run(source_spec, frames, proj_res=(1024, 768)):
+    source = create_depth_source(source_spec + "@max" if "@" not in source_spec else source_spec)
+    processor = TerrainProcessor()
+    cmap = ColorMapManager()
+    homography = np.load("homography_matrix.npy") if os.path.exists("homography_matrix.npy") else np.eye(3)
+
+    smoother = EMAFilter(0.3, source.height, source.width)
+    frame = DepthFrame.empty(source.height, source.width)
+
+    source.start()
+    base, _ = source.read()
+    processor.set_base_plane(smoother.apply(base))
+
+    timings = {"acquire": 0.0, "filter": 0.0, "elevation": 0.0, "colour": 0.0, "warp": 0.0}
+    t_start = time.perf_counter()
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        depth, _ = source.read()
+        if depth is None:
+            break
+        t1 = time.perf_counter()
+        frame.depth = smoother.apply(depth)
+        np.greater(frame.depth, 0, out=frame.valid)
+        tf = time.perf_counter()
+        elevation = cv2.GaussianBlur(processor.calculate_elevation(frame), (5, 5), 0)
+        t2 = time.perf_counter()
+        norm_for_lut = np.clip(((elevation + 250) / 500) * 255, 0, 255).astype(np.uint8)
+        color_terrain = cmap.apply(norm_for_lut)
+        t3 = time.perf_counter()
+        cv2.warpPerspective(color_terrain, homography, proj_res, flags=cv2.INTER_LINEAR)
+        t4 = time.perf_counter()
+
+        timings["acquire"] += t1 - t0
+        timings["filter"] += tf - t1
+        timings["elevation"] += t2 - tf
+        timings["colour"] += t3 - t2
+        timings["warp"] += t4 - t3
+    total = time.perf_counter() - t_start
+    source.stop()
+
+    print(f"source={source_spec} frames={frames}")
+    for stage, secs in timings.items():
+        print(f"  {stage:<10} {1000 * secs / frames:7.2f} ms/frame")
+    print(f"  {'total':<10} {1000 * total / frames:7.2f} ms/frame  ({frames / total:.1f} fps)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default="synthetic")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+    run(args.source, args.frames)
@@ -0,0 +1,90 @@
+"""Projector presentation cost: QLabel/QPixmap + repaint() vs the presenter backend.
+
+Times the GUI-thread work to get one 1024x768 BGR frame on screen, paint
+included, after checking that a pure red frame shows up red whatever
+layout it arrives in. Run from the repo root; uses whatever Qt platform is
+available (QT_QPA_PLATFORM=offscreen works headless and exercises the raster path):
+
+    python src/benchmarks/bench_present.py [--frames 200] [--backend raster|opengl]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from PySide6.QtWidgets import QApplication, QLabel
+from PySide6.QtGui import QImage, QPixmap
+
+from ui.presenter import create_presenter
+from ui.frame_bridge import qimage_view
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def check_red(app, backend):
+    """Presents pure red as a BGR array and as RGB888/BGR888 QImages; each must read back red."""
+    presenter = create_presenter(backend=backend)
+    presenter.resize(64, 48)
+    presenter.show()
+    rgb = np.zeros((48, 64, 3), np.uint8)
+    rgb[..., 0] = 255
+    bgr = np.ascontiguousarray(rgb[..., ::-1])
+    frames = {"BGR array": bgr, "RGB888 image": qimage_view(rgb, "rgb"), "BGR888 image": qimage_view(bgr, "bgr")}
+    failed = []
+    for name, frame in frames.items():
+        presenter.present(frame)
+        presenter.repaint()
+        app.processEvents()
+        shown = presenter.grabFramebuffer() if presenter.backend == "opengl" else presenter.grab().toImage()
+        color = shown.pixelColor(shown.width() // 2, shown.height() // 2)
+        rgb_shown = (color.red(), color.green(), color.blue())
+        print(f"{presenter.backend + ' ' + name:>28}  {'red' if rgb_shown == (255, 0, 0) else rgb_shown}")
+        if rgb_shown != (255, 0, 0):
+            failed.append(name)
+    presenter.close()
+    if failed:
+        sys.exit(f"Wrong colours on screen for: {', '.join(failed)}")
+
+def run(frames, backend):
+    app = QApplication.instance() or QApplication(sys.argv)
+    check_red(app, backend)
+    frame = np.random.default_rng(0).integers(0, 255, (768, 1024, 3), np.uint8)
+
+    label = QLabel()
+    label.resize(1024, 768)
+    label.show()
+
+    def legacy():
+        """The pre-presenter ProjectorWindow.display_pattern."""
+        pattern_img = np.ascontiguousarray(frame)
+        h, w, ch = pattern_img.shape
+        q_img = QImage(pattern_img.data, w, h, ch * w, QImage.Format_RGB888).rgbSwapped()
+        label.setPixmap(QPixmap.fromImage(q_img))
+        label.repaint()
+
+    presenter = create_presenter(backend=backend)
+    presenter.resize(1024, 768)
+    presenter.show()
+
+    def present():
+        presenter.present(frame)
+        presenter.repaint() # Force the paint here so both columns include it
+
+    app.processEvents()
+    print(f"{'path':>28}{'ms/frame':>10}")
+    print(f"{'QLabel + rgbSwapped + repaint':>28}{time_it(legacy, frames):>10.2f}")
+    print(f"{presenter.backend + ' presenter':>28}{time_it(present, frames):>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--backend", default=None)
+    args = parser.parse_args()
+    run(args.frames, args.backend)
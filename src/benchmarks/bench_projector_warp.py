@@ -0,0 +1,65 @@
+"""Projector warp cost: per-frame warpPerspective vs cached remap tables.
+
+Run from the repo root (uses homography_matrix.npy if present):
+
+    python src/benchmarks/bench_projector_warp.py [--frames 200]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from core.projector_warp import ProjectorWarp
+from core.renderer import TerrainRenderer
+from modules.color_maps import ColorMapManager
+
+def legacy_warp(color_terrain, homography, scale_factor=1.05):
+    """The pre-ProjectorWarp step 5 of ARSMainWindow.update_frame."""
+    M = homography.copy()
+    M[0, 0] *= scale_factor
+    M[1, 1] *= scale_factor
+    return cv2.warpPerspective(color_terrain, M, (1024, 768), flags=cv2.INTER_LINEAR)
+
+def time_it(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def run(frames):
+    homography = np.load("homography_matrix.npy") if os.path.exists("homography_matrix.npy") else np.eye(3)
+    yy, xx = np.mgrid[0:480, 0:640].astype(np.float32)
+    elevation = 120 * np.sin(xx / 60) * np.cos(yy / 45)
+
+    cmap = ColorMapManager()
+    lut = cmap.get_lut()
+    renderer = TerrainRenderer(use_numba=False)
+    color_terrain = renderer.render(elevation, lut).copy()
+    index = renderer.index.copy()
+
+    warp = ProjectorWarp((1024, 768), scale=1.05)
+    warp.set_homography(homography)
+    t0 = time.perf_counter()
+    warp._build_maps()
+    build_ms = 1000 * (time.perf_counter() - t0)
+
+    t_legacy = time_it(lambda: legacy_warp(color_terrain, homography), frames)
+    t_remap = time_it(lambda: warp.warp(color_terrain), frames)
+    t_indexed = time_it(lambda: warp.warp_indexed(index, lut), frames)
+
+    print(f"640x480 -> 1024x768, {frames} frames (one-off map build {build_ms:.1f} ms)")
+    print(f"  warpPerspective      {t_legacy:6.2f} ms/frame")
+    print(f"  cached remap (BGR)   {t_remap:6.2f} ms/frame   x{t_legacy / t_remap:.1f}")
+    print(f"  remap index + LUT    {t_indexed:6.2f} ms/frame   x{t_legacy / t_indexed:.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+    run(args.frames)
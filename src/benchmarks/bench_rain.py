@@ -0,0 +1,63 @@
+"""Rain engine throughput across particle counts.
+
+Compares the original per-particle Python loop (small counts only) with the
+vectorised RainSimulation and its optional Numba path. Run from the repo root:
+
+    python src/benchmarks/bench_rain.py [--steps 50]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from modules.rain_sim import RainSimulation, calculate_slopes, numba
+
+COUNTS = [1_000, 10_000, 100_000, 300_000, 1_000_000]
+LEGACY_MAX = 10_000
+
+def legacy_update(particles, dz_dx, dz_dy):
+    """The original RainSimulation.update loop."""
+    for i in range(len(particles)):
+        px = int(particles[i][0])
+        py = int(particles[i][1])
+        if 0 <= px < 639 and 0 <= py < 479:
+            particles[i][0] -= dz_dx[py, px] * 0.1
+            particles[i][1] -= dz_dy[py, px] * 0.1
+        else:
+            particles[i] = [np.random.uniform(0, 639), np.random.uniform(0, 479)]
+
+def time_steps(step, steps):
+    step()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        step()
+    return 1000 * (time.perf_counter() - t0) / steps
+
+def run(steps):
+    yy, xx = np.mgrid[0:480, 0:640].astype(np.float32)
+    terrain = 120 * np.sin(xx / 60) * np.cos(yy / 45)
+    dz_dx, dz_dy = calculate_slopes(terrain)
+
+    print(f"{'particles':>10}{'legacy':>10}{'vectorised':>12}{'numba':>10}   (ms/step, 33 ms = 30 fps budget)")
+    for n in COUNTS:
+        t_legacy = float("nan")
+        if n <= LEGACY_MAX:
+            particles = np.random.rand(n, 2) * [639, 479]
+            t_legacy = time_steps(lambda: legacy_update(particles, dz_dx, dz_dy), max(1, steps // 10))
+        vec = RainSimulation(n, seed=0)
+        t_vec = time_steps(lambda: vec.update(dz_dx, dz_dy), steps)
+        t_nb = float("nan")
+        if numba is not None:
+            nb = RainSimulation(n, use_numba=True, seed=0)
+            t_nb = time_steps(lambda: nb.update(dz_dx, dz_dy), steps)
+        print(f"{n:>10}{t_legacy:>10.2f}{t_vec:>12.2f}{t_nb:>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+    run(args.steps)
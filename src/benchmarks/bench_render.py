@@ -0,0 +1,64 @@
+"""Per-frame render cost: legacy update_frame chain vs the fused TerrainRenderer.
+
+Renders the same synthetic elevation at sensor resolution and at upscaled
+projector resolutions. Run from the repo root:
+
+    python src/benchmarks/bench_render.py [--frames 100]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import cv2
+
+from core.depth_source import SyntheticDepthSource
+from core.renderer import TerrainRenderer, numba
+from modules.color_maps import ColorMapManager
+
+RESOLUTIONS = [(640, 480), (1024, 768), (1920, 1080)]
+
+def legacy_render(elevation, cmap, contour_interval=20):
+    """The pre-renderer ARSMainWindow.update_frame steps 2-3."""
+    elevation_smooth = cv2.GaussianBlur(elevation, (5, 5), 0)
+    norm_for_lut = np.clip(((elevation_smooth + 250) / 500) * 255, 0, 255).astype(np.uint8)
+    color_terrain = cmap.apply(norm_for_lut)
+    quantized = (elevation_smooth // contour_interval) * contour_interval
+    contours = cv2.Canny(quantized.astype(np.uint8), 1, 1)
+    color_terrain[contours > 0] = [0, 0, 0]
+    return color_terrain
+
+def time_it(fn, frames):
+    fn() # Warm-up (and Numba compile)
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / frames
+
+def run(frames):
+    source = SyntheticDepthSource()
+    base = source.read()[0].astype(np.float32)
+    base[:] = source.floor_mm
+    elevation_sensor = base - source.read()[0].astype(np.float32)
+
+    cmap = ColorMapManager()
+    lut = cmap.get_lut()
+    vectorised = TerrainRenderer(use_numba=False)
+    fused = TerrainRenderer(use_numba=True) if numba is not None else None
+
+    print(f"{'resolution':<12}{'legacy':>10}{'vectorised':>12}{'numba':>10}   (ms/frame)")
+    for w, h in RESOLUTIONS:
+        elevation = cv2.resize(elevation_sensor, (w, h), interpolation=cv2.INTER_LINEAR)
+        t_legacy = time_it(lambda: legacy_render(elevation, cmap), frames)
+        t_vec = time_it(lambda: vectorised.render(elevation, lut), frames)
+        t_nb = time_it(lambda: fused.render(elevation, lut), frames) if fused else float("nan")
+        print(f"{w}x{h:<7}{t_legacy:>10.2f}{t_vec:>12.2f}{t_nb:>10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+    run(args.frames)
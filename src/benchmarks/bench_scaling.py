@@ -0,0 +1,62 @@
+"""Thread scaling of the water and rain simulations on a TiledExecutor.
+
+Times one WaterSim substep at 640x480 and one RainSimulation update with
+300k drops for 1, 2, 4, ... worker threads up to the core count. Run from
+the repo root:
+
+    python src/benchmarks/bench_scaling.py [--steps 30] [--max-workers N]
+"""
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from core.tiled_executor import TiledExecutor
+from modules.rain_sim import RainSimulation, calculate_slopes
+from modules.water_sim import WaterSim
+
+def time_it(fn, steps):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        fn()
+    return 1000 * (time.perf_counter() - t0) / steps
+
+def run(steps, max_workers):
+    yy, xx = np.mgrid[0:480, 0:640].astype(np.float32)
+    terrain = 40 * np.sin(xx / 50) * np.cos(yy / 40)
+    dz_dx, dz_dy = calculate_slopes(terrain)
+
+    workers = [1]
+    while workers[-1] * 2 <= max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != max_workers:
+        workers.append(max_workers)
+
+    print(f"cores available: {os.cpu_count()}")
+    print(f"{'workers':>8}{'water ms':>10}{'speed-up':>10}{'rain ms':>10}{'speed-up':>10}")
+    base = None
+    for n in workers:
+        executor = TiledExecutor(n) if n > 1 else None
+        water = WaterSim(executor=executor)
+        water.set_terrain(terrain)
+        water.rain(5.0)
+        rain = RainSimulation(300_000, seed=0, executor=executor)
+        t_water = time_it(lambda: water.update_simulation(0.02), steps)
+        t_rain = time_it(lambda: rain.update(dz_dx, dz_dy), steps)
+        if base is None:
+            base = (t_water, t_rain)
+        print(f"{n:>8}{t_water:>10.2f}{base[0] / t_water:>10.2f}{t_rain:>10.2f}{base[1] / t_rain:>10.2f}")
+        if executor is not None:
+            executor.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    run(args.steps, args.max_workers)
@@ -1,14 +1,18 @@
 import sys
-import cv2
+import time
 import numpy as np
 from PySide6.QtWidgets import (QApplication, QMainWindow, QLabel, QVBoxLayout, 
                              QPushButton, QProgressBar, QWidget)
 from PySide6.QtCore import Qt, QTimer, Slot
-from PySide6.QtGui import QImage, QPixmap
 
 from core.kinect import KinectWorker
 from core.KinectProjector import KinectProjector
 from core.processor import TerrainProcessor
+from core.session import SessionWriter
+from core.calibration_pipeline import process_frame, save_captures
+from ui.frame_view import FrameView
+from ui.frame_bridge import FrameBridge
+from ui.presenter import create_presenter
 
 class ProjectorWindow(QWidget):
     """Handles the secondary display on the projector."""
@@ -20,19 +24,15 @@ class ProjectorWindow(QWidget):
         target_screen = screens[screen_index] if len(screens) > screen_index else screens[0]
         self.setGeometry(target_screen.geometry())
         
-        self.label = QLabel(self)
-        self.label.setScaledContents(False)
-        self.label.setStyleSheet("background-color: black;")
+        self.presenter = create_presenter(self)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.label)
+        layout.addWidget(self.presenter)
         self.showFullScreen()
 
     def display_pattern(self, pattern):
-        h, w, ch = pattern.shape
-        # Use RGB888 and rgbSwapped for correct color rendering
-        q_img = QImage(pattern.data, w, h, ch * w, QImage.Format_RGB888)
-        self.label.setPixmap(QPixmap.fromImage(q_img))
+        # BGR (or greyscale) pattern: copied once into the presenter's buffer
+        self.presenter.present(pattern)
 
 class CalibrationUtility(QMainWindow):
     def __init__(self):
@@ -44,13 +44,19 @@ class CalibrationUtility(QMainWindow):
         self.calibrator = KinectProjector(*self.projector_res)
         self.processor = TerrainProcessor() # Used to help visualize depth
         
-        # State Management
-        self.positions = [
-            (50, 50), (450, 50), (850, 50),
-            (50, 350), (450, 350), (850, 350),
-            (50, 650), (450, 650), (850, 650)
-        ]
+        # State Management: a 3x3 grid of board positions that keeps the whole board on screen
+        self.pattern = (6, 5)
+        self.board_size = 300
+        self.square = KinectProjector.pattern_square(self.board_size, self.pattern[0])
+        board_w, board_h = (self.pattern[0] + 1) * self.square, (self.pattern[1] + 1) * self.square
+        xs = np.linspace(40, self.projector_res[0] - board_w - 40, 3).astype(int)
+        ys = np.linspace(40, self.projector_res[1] - board_h - 40, 3).astype(int)
+        self.positions = [(int(x), int(y)) for y in ys for x in xs]
         self.current_pos_idx = 0
+        # Every capture is recorded, so the calibration can be re-run offline (core.calibration_pipeline)
+        self.session_path = time.strftime("calibration_%Y%m%d_%H%M%S.gbs")
+        self.recorder = None
+        self.captures = []
         self.is_raised_round = False
         self.captured_at_current_pos = False
 
@@ -73,7 +79,9 @@ class CalibrationUtility(QMainWindow):
 
     def init_ui(self):
         self.label_status = QLabel("Ready to start...")
-        self.view_rgb = QLabel("Kinect RGB")
+        self.view_rgb = FrameView("Kinect RGB")
+        self.view_rgb.setMinimumSize(640, 480)
+        self.rgb_bridge = FrameBridge(order="rgb") # freenect delivers RGB: shown without a swap
         self.btn_capture = QPushButton("CAPTURE POSITION")
         self.btn_capture.clicked.connect(self.capture_current_frame)
         
@@ -87,12 +95,14 @@ class CalibrationUtility(QMainWindow):
         self.setCentralWidget(container)
 
     def on_depth_ready(self, depth_frame):
-        self.last_depth = depth_frame
+        # DepthFrame buffers are recycled by the worker, keep our own copy
+        self.last_depth = depth_frame.depth.copy()
 
     def update_pattern(self):
         x, y = self.positions[self.current_pos_idx]
         # Draw 7x6 chessboard pattern
-        pattern = self.calibrator.generate_pattern(x, y, size=300)
+        pattern = self.calibrator.generate_pattern(x, y, size=self.board_size, cols=self.pattern[0],
+                                                   rows=self.pattern[1])
         self.projector.display_pattern(pattern)
         self.label_status.setText(f"Position {self.current_pos_idx+1}/{len(self.positions)}")
 
@@ -104,20 +114,24 @@ class CalibrationUtility(QMainWindow):
         if rgb is None or depth is None:
             return
 
-        # Find 2D corners in RGB
-        ret, corners = cv2.findChessboardCorners(rgb, (6, 5))
-        if ret:
+        # Find 2D corners in RGB (sub-pixel), depth = median of the valid pixels around each
+        uvd = process_frame(rgb, depth, self.pattern)
+        if uvd is not None:
             # 1. Store the Projector's 2D target points
-            proj_pts = self.calibrator.get_target_pts_for_pos(self.current_pos_idx)
-            
-            # 2. Store the Kinect's 3D points (X, Y, Depth)
-            for i, corner in enumerate(corners):
-                cx, cy = corner.ravel()
-                # Crucial: Grab the depth at the corner coordinate
-                z = depth[int(cy), int(cx)]
-                if z > 0:
-                    self.calibrator.add_point_pair(proj_pts[i], (cx, cy, z))
-            
+            x, y = self.positions[self.current_pos_idx]
+            proj_pts = self.calibrator.get_target_pts_for_pos(x, y, sq_sz=self.square, cols=self.pattern[0],
+                                                              rows=self.pattern[1])
+
+            # 2. Store the Kinect's 3D points (X, Y, Depth), where the depth could be sampled
+            keep = np.isfinite(uvd[:, 2])
+            self.calibrator.add_point_pairs(proj_pts[keep], uvd[keep])
+
+            # 3. Record the frame for offline re-runs
+            if self.recorder is None:
+                self.recorder = SessionWriter(self.session_path, chunk_frames=4)
+            self.captures.append({"frame": len(self.recorder), "origin": [x, y], "square": self.square})
+            self.recorder.write(depth, rgb)
+
             self.advance_state()
         else:
             self.label_status.setText("FAILED: Could not find chessboard. Adjust sand.")
@@ -134,18 +148,21 @@ class CalibrationUtility(QMainWindow):
         self.update_pattern()
 
     def finalize(self):
-        self.calibrator.solve_matrix()
-        self.calibrator.save_to_file("calibration_data.json")
-        self.label_status.setText("CALIBRATION SAVED. You can close now.")
+        if self.recorder is not None:
+            self.recorder.close()
+            save_captures(self.session_path, self.captures, self.pattern)
+        if self.calibrator.solve_matrix():
+            self.calibrator.save_calibration("calibration.json")
+            self.label_status.setText("CALIBRATION SAVED. You can close now.")
+        else:
+            self.label_status.setText(f"CALIBRATION FAILED. Session kept in {self.session_path}.")
         self.timer.stop()
 
     def update_view(self):
         rgb = self.worker.get_latest_rgb()
         if rgb is not None:
-            # Display live preview with a status overlay
-            h, w, ch = rgb.shape
-            qimg = QImage(rgb.data, w, h, ch*w, QImage.Format_RGB888).rgbSwapped()
-            self.view_rgb.setPixmap(QPixmap.fromImage(qimg).scaled(640, 480))
+            # Display live preview: one resize into the bridge's buffer, painted as-is
+            self.view_rgb.set_image(self.rgb_bridge.upload_scaled(rgb, (640, 480)))
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -2,6 +2,8 @@ import numpy as np
 import cv2
 import json
 
+from core.calibration import solve_projector
+
 class KinectProjector:
     def __init__(self, proj_w=1024, proj_h=768):
         self.proj_res = (proj_w, proj_h)
@@ -20,14 +22,45 @@ class KinectProjector:
             [0, 0, 1]
         ], dtype=np.float32)
 
+        # Projector intrinsics: solved by solve_matrix (older calibrations assumed the Kinect's)
+        self.projector_matrix = self.camera_matrix.copy()
+
         # The result: The Projection Matrix
         self.projection_matrix = None
+        self.reprojection_errors = None # Per point pair (px), from the last solve
+        self.inliers = None             # Point pairs the last solve kept
 
     def add_point_pair(self, proj_pt, kinect_pt_uvd):
         """Adds a matched pair from the Calibration App."""
         self.proj_2d_pts.append(proj_pt)
         self.kinect_3d_pts.append(kinect_pt_uvd)
 
+    def add_point_pairs(self, proj_pts, kinect_pts_uvd):
+        """Adds all matched pairs of one board capture: (N, 2) projector and (N, 3) Kinect (u, v, d)."""
+        self.proj_2d_pts.extend(np.asarray(proj_pts, np.float64).reshape(-1, 2).tolist())
+        self.kinect_3d_pts.extend(np.asarray(kinect_pts_uvd, np.float64).reshape(-1, 3).tolist())
+
+    def generate_pattern(self, x_off, y_off, size=300, cols=6, rows=5):
+        """Projector frame (BGR) with a chessboard whose inner corners are get_target_pts_for_pos(...).
+
+        The board is (cols + 1) x (rows + 1) squares of size // (cols + 1) px,
+        its top-left at (x_off, y_off), on a white surround for the detector.
+        """
+        sq = self.pattern_square(size, cols)
+        w, h = self.proj_res
+        pattern = np.full((h, w, 3), 255, np.uint8)
+        for r in range(rows + 1):
+            for c in range(cols + 1):
+                if (r + c) % 2 == 0:
+                    x0, y0 = x_off + c * sq, y_off + r * sq
+                    pattern[y0:y0 + sq, x0:x0 + sq] = 0
+        return pattern
+
+    @staticmethod
+    def pattern_square(size=300, cols=6):
+        """Square edge (px) of a generate_pattern board `size` px wide."""
+        return size // (cols + 1)
+
     def get_target_pts_for_pos(self, x_off, y_off, sq_sz=80, cols=6, rows=5):
         """Generates the 2D coordinates of the chessboard corners on the projector."""
         targets = []
@@ -36,63 +69,72 @@ class KinectProjector:
                 targets.append((x_off + x * sq_sz, y_off + y * sq_sz))
         return np.array(targets, dtype=np.float32)
 
-    def solve_matrix(self):
+    def solve_matrix(self, threshold_px=4.0):
         """
         Calculates the transformation matrix.
         Converts Kinect (u,v,d) -> World (X,Y,Z) -> Projector (x,y)
+
+        All point pairs from every board position are solved together
+        (core.calibration.solve_projector): the projector's own intrinsics
+        and pose, with pairs further than threshold_px from the fit rejected
+        as outliers.
         """
         if len(self.kinect_3d_pts) < 10:
             return False
 
-        # 1. Convert Kinect pixels + depth into 3D Camera Space (Object Points)
-        obj_pts = []
-        for u, v, d in self.kinect_3d_pts:
-            z = float(d)
-            x = (u - self.cx) * z / self.fx
-            y = (v - self.cy) * z / self.fy
-            obj_pts.append([x, y, z])
-        
-        obj_pts = np.array(obj_pts, dtype=np.float32)
-        img_pts = np.array(self.proj_2d_pts, dtype=np.float32)
-
-        # 2. Use solvePnP to find the Projector's position and rotation
-        # We assume the Projector acts like a camera in reverse
-        success, rvec, tvec = cv2.solvePnP(obj_pts, img_pts, self.camera_matrix, None)
-
-        if success:
-            # 3. Build a combined matrix for fast lookups
-            rmat, _ = cv2.Rodrigues(rvec)
-            # Create a 3x4 projection matrix
-            self.projection_matrix = np.hstack((rmat, tvec))
-            return True
-        return False
+        try:
+            result = solve_projector(self.kinect_3d_pts, self.proj_2d_pts, self.proj_res,
+                                     (self.fx, self.fy, self.cx, self.cy), threshold_px)
+        except (ValueError, cv2.error) as e:
+            print(f"Calibration failed: {e}")
+            return False
 
-    def project_point(self, u, v, d):
-        """The 'Translator': Converts a Kinect pixel to a Projector pixel."""
-        if self.projection_matrix is None or d <= 0:
-            return None
+        self.projector_matrix = result.K
+        self.projection_matrix = result.extrinsics
+        self.reprojection_errors = result.errors
+        self.inliers = result.inliers
+        print(f"Calibration: {result.inliers.sum()}/{len(result.inliers)} point pairs kept, "
+              f"RMS reprojection error {result.rms:.2f} px")
+        return True
+
+    def full_projection_matrix(self):
+        """3x4 matrix taking Kinect camera-space (X, Y, Z, 1) to projector pixels (homogeneous)."""
+        return self.projector_matrix @ self.projection_matrix
+
+    def project_points(self, u, v, d):
+        """Vectorised 'Translator': arrays of Kinect (u, v, depth mm) -> projector (x, y) floats.
+
+        Points with no depth (d <= 0) come back as NaN.
+        """
+        u = np.asarray(u, np.float64)
+        v = np.asarray(v, np.float64)
+        z = np.asarray(d, np.float64)
+        P = self.full_projection_matrix()
 
         # Convert to 3D Camera Space
-        z = float(d)
         x = (u - self.cx) * z / self.fx
         y = (v - self.cy) * z / self.fy
-        
-        # Multiply by Projection Matrix
-        world_pt = np.array([x, y, z, 1.0])
-        # Result is in Projector-space coordinates
-        proj_pt_h = self.camera_matrix @ (self.projection_matrix @ world_pt)
-        
-        # Perspective divide
-        px = proj_pt_h[0] / proj_pt_h[2]
-        py = proj_pt_h[1] / proj_pt_h[2]
-        
+
+        # Multiply by Projection Matrix, then perspective divide
+        ph = [P[r, 0] * x + P[r, 1] * y + P[r, 2] * z + P[r, 3] for r in range(3)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            px = np.where(z > 0, ph[0] / ph[2], np.nan)
+            py = np.where(z > 0, ph[1] / ph[2], np.nan)
+        return px, py
+
+    def project_point(self, u, v, d):
+        """The 'Translator': Converts a Kinect pixel to a Projector pixel."""
+        if self.projection_matrix is None or d <= 0:
+            return None
+        px, py = self.project_points(u, v, d)
         return int(px), int(py)
 
     def save_calibration(self, filename="calibration.json"):
         if self.projection_matrix is not None:
             data = {
                 "projection_matrix": self.projection_matrix.tolist(),
-                "camera_matrix": self.camera_matrix.tolist()
+                "camera_matrix": self.camera_matrix.tolist(),
+                "projector_matrix": self.projector_matrix.tolist()
             }
             with open(filename, 'w') as f:
                 json.dump(data, f)
@@ -103,6 +145,8 @@ class KinectProjector:
                 data = json.load(f)
                 self.projection_matrix = np.array(data["projection_matrix"])
                 self.camera_matrix = np.array(data["camera_matrix"])
+                # Files from before the projector intrinsics were solved used the Kinect's
+                self.projector_matrix = np.array(data.get("projector_matrix", data["camera_matrix"]))
             return True
         except:
             return False
\ No newline at end of file
@@ -0,0 +1,224 @@
+import numpy as np
+import cv2
+
+# Kinect v1 depth camera (typical values), as in KinectProjector
+KINECT_INTRINSICS = (580.0, 580.0, 320.0, 240.0) # fx, fy, cx, cy
+
+def back_project(uvd, intrinsics=KINECT_INTRINSICS):
+    """(N, 3) Kinect (u, v, depth mm) -> (N, 3) camera-space (X, Y, Z) mm, in one vectorised pass."""
+    fx, fy, cx, cy = intrinsics
+    uvd = np.asarray(uvd, np.float64).reshape(-1, 3)
+    z = uvd[:, 2]
+    return np.column_stack(((uvd[:, 0] - cx) * z / fx, (uvd[:, 1] - cy) * z / fy, z))
+
+def _normalizer(pts):
+    """Similarity moving pts to the origin with mean distance sqrt(dim) (Hartley normalisation)."""
+    dim = pts.shape[1]
+    mean = pts.mean(axis=0)
+    scale = np.sqrt(dim) / max(np.linalg.norm(pts - mean, axis=1).mean(), 1e-12)
+    T = np.eye(dim + 1)
+    T[:dim, :dim] *= scale
+    T[:dim, dim] = -scale * mean
+    return T
+
+def _dlt_rows(X, x):
+    """(..., n, 3) / (..., n, 2) normalised points -> (..., 2n, 12) DLT design matrices."""
+    Xh = np.concatenate([X, np.ones(X.shape[:-1] + (1,))], axis=-1)
+    zero = np.zeros_like(Xh)
+    r0 = np.concatenate([Xh, zero, -x[..., :1] * Xh], axis=-1)
+    r1 = np.concatenate([zero, Xh, -x[..., 1:] * Xh], axis=-1)
+    return np.stack([r0, r1], axis=-2).reshape(X.shape[:-2] + (-1, 12))
+
+def _project(P, Xh):
+    """(k, 3, 4) matrices, (4, N) homogeneous points -> (k, N, 2) pixels."""
+    ph = P @ Xh
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.moveaxis(ph[:, :2] / ph[:, 2:], 1, 2)
+
+def ransac_dlt(X, x, threshold_px=4.0, iterations=512, batch=64, confidence=0.999, min_inliers=8, seed=0):
+    """Robust 3x4 camera matrix from 3D-2D pairs: batched 6-point DLT hypotheses, best consensus.
+
+    Every hypothesis of a batch is solved with one stacked SVD and scored
+    against all points at once. Stops early once an all-inlier sample has
+    been drawn with `confidence`, given the best inlier ratio so far (at
+    most `iterations` hypotheses). Returns (P, inlier mask), with P refitted
+    to all inliers. Raises ValueError if fewer than 6 points are given, or
+    if no matrix is backed by `min_inliers` of them (all of them, when
+    fewer): a 6-point sample of pure noise can fit itself, so consensus
+    has to reach past the sample.
+    """
+    X, x = np.asarray(X, np.float64), np.asarray(x, np.float64)
+    n = len(X)
+    if n < 6:
+        raise ValueError(f"Need at least 6 point pairs, got {n}")
+    T3, T2 = _normalizer(X), _normalizer(x)
+    Xn = X @ T3[:3, :3].T + T3[:3, 3]
+    xn = x @ T2[:2, :2].T + T2[:2, 2]
+    Xh = np.vstack([X.T, np.ones(n)])
+    T2inv = np.linalg.inv(T2)
+    rng = np.random.default_rng(seed)
+
+    def denormalize(Pn):
+        return T2inv @ Pn @ T3
+
+    best, best_count = None, -1
+    for start in range(0, iterations, batch):
+        k = min(batch, iterations - start)
+        sample = np.argpartition(rng.random((k, n)), 5, axis=1)[:, :6]
+        A = _dlt_rows(Xn[sample], xn[sample])
+        P = denormalize(np.linalg.svd(A)[2][:, -1].reshape(k, 3, 4))
+        err = np.linalg.norm(_project(P, Xh) - x, axis=-1)
+        count = (err < threshold_px).sum(axis=1)
+        i = int(np.argmax(count))
+        if count[i] > best_count:
+            best, best_count = err[i] < threshold_px, count[i]
+        all_inliers = (best_count / n) ** 6 # Chance that one 6-point sample is clean
+        if all_inliers == 0.0: # No consensus yet: nothing to base a stop on
+            continue
+        if all_inliers >= 1.0 or start + k >= np.log(1 - confidence) / np.log(1 - all_inliers):
+            break
+    need = min(n, max(6, min_inliers))
+    if best_count < need:
+        raise ValueError(f"No consistent camera matrix: best hypothesis has {best_count} inliers of {n}")
+
+    # Refit on the consensus set, then take every point that agrees with the refit
+    for _ in range(2):
+        Pn = np.linalg.svd(_dlt_rows(Xn[best], xn[best]), full_matrices=False)[2][-1].reshape(3, 4)
+        P = denormalize(Pn)
+        best = np.linalg.norm(_project(P[None], Xh)[0] - x, axis=-1) < threshold_px
+        if best.sum() < need:
+            raise ValueError(f"Refit kept only {best.sum()} of {n} point pairs")
+    return P, best
+
+def decompose(P):
+    """3x4 camera matrix -> (K, R, t) with positive focal lengths and K[2, 2] = 1."""
+    K, R, C = cv2.decomposeProjectionMatrix(P)[:3]
+    # decomposeProjectionMatrix may return a negative diagonal: move the signs into R
+    S = np.diag(np.sign(np.diag(K)))
+    K, R = K @ S, S @ R
+    if np.linalg.det(R) < 0: # P was only known up to sign
+        R = -R
+    t = -R @ (C[:3, 0] / C[3, 0])
+    return K / K[2, 2], R, t
+
+class CalibrationResult:
+    """Projector model from a calibration: x ~ K [R | t] X for Kinect camera-space X (mm)."""
+    def __init__(self, K, dist, rvec, tvec, errors, inliers):
+        self.K = K                  # 3x3 projector intrinsics
+        self.dist = dist            # Distortion (zeros unless solved with distortion=True)
+        self.rvec = rvec            # Kinect -> projector rotation (Rodrigues)
+        self.tvec = tvec            # Kinect -> projector translation (mm)
+        self.errors = errors        # Reprojection error of every input point (px)
+        self.inliers = inliers      # Points the fit used
+
+    @property
+    def R(self):
+        return cv2.Rodrigues(self.rvec)[0]
+
+    @property
+    def extrinsics(self):
+        """3x4 [R | t]."""
+        return np.hstack([self.R, self.tvec.reshape(3, 1)])
+
+    @property
+    def rms(self):
+        """RMS reprojection error over the inliers (px)."""
+        return float(np.sqrt(np.mean(self.errors[self.inliers] ** 2)))
+
+def solve_projector(uvd, proj_pts, proj_size=(1024, 768), intrinsics=KINECT_INTRINSICS, threshold_px=4.0,
+                    iterations=512, distortion=False, seed=0):
+    """Projector intrinsics and pose from every captured (Kinect u, v, depth) <-> projector (x, y) pair.
+
+    The pairs of all board positions are solved together: they share one
+    projector, and boards at different heights make the 3D points
+    non-coplanar, which is what pins down the intrinsics. Steps:
+      1. back-project all Kinect points at once
+      2. RANSAC over batched DLT hypotheses (no intrinsics needed up front)
+      3. decompose the consensus matrix into K, R, t
+      4. Levenberg-Marquardt refinement of K and the pose on the inliers
+         (cv2.calibrateCamera seeded with step 3; lens distortion only if asked:
+         the renderer's lookups use the linear model)
+    Returns a CalibrationResult with the error of every input point.
+    """
+    # 1. Object points
+    X = back_project(uvd, intrinsics)
+    x = np.asarray(proj_pts, np.float64).reshape(-1, 2)
+    valid = X[:, 2] > 0
+    if valid.sum() < 6:
+        raise ValueError("Need at least 6 correspondences with depth")
+
+    # 2-3. Robust linear estimate
+    P, inliers = ransac_dlt(X[valid], x[valid], threshold_px, iterations, seed=seed)
+    K, R, t = decompose(P)
+    K[0, 1] = 0.0 # The refinement models no skew
+
+    # 4. Refine the full model on the inliers
+    flags = cv2.CALIB_USE_INTRINSIC_GUESS
+    if not distortion:
+        flags |= cv2.CALIB_ZERO_TANGENT_DIST | cv2.CALIB_FIX_K1 | cv2.CALIB_FIX_K2 | cv2.CALIB_FIX_K3
+    Xi = X[valid][inliers].astype(np.float32)
+    xi = x[valid][inliers].astype(np.float32)
+    _, K, dist, rvecs, tvecs = cv2.calibrateCamera([Xi], [xi], tuple(proj_size), K, np.zeros(5), flags=flags)
+    rvec, tvec = rvecs[0].ravel(), tvecs[0].ravel()
+
+    # Per-point errors of every input (NaN where there was no depth)
+    errors = np.full(len(X), np.nan)
+    projected = cv2.projectPoints(X[valid], rvec, tvec, K, dist)[0].reshape(-1, 2)
+    errors[valid] = np.linalg.norm(projected - x[valid], axis=1)
+    refined = np.zeros(len(X), bool)
+    refined[valid] = errors[valid] < threshold_px
+    return CalibrationResult(K, dist.ravel(), rvec, tvec, errors, refined)
+
+def synthetic_correspondences(poses=6, cols=6, rows=5, noise_px=0.3, depth_noise_mm=1.5, outliers=0.05,
+                              proj_size=(1024, 768), seed=0):
+    """Fake calibration captures with a known answer, for testing and benchmarking offline.
+
+    A projector (K_true, R_true, t_true) above the sandbox shows a cols x rows
+    grid of corners at `poses` random board positions; each position lands
+    on a randomly tilted board 800-1100 mm below the Kinect. Returns
+    (uvd (N, 3), proj_pts (N, 2), truth dict), with Kinect pixel and depth
+    noise and a fraction of `outliers` replaced by garbage matches.
+    Raises ValueError if any corner lands outside the 640x480 Kinect image.
+    """
+    rng = np.random.default_rng(seed)
+    pw, ph = proj_size
+    K_true = np.array([[1.4 * pw, 0, pw / 2], [0, 1.4 * pw, ph * 0.9], [0, 0, 1]])
+    rvec_true = np.array([0.05, -0.03, 0.01])
+    t_true = np.array([50.0, -150.0, 40.0]) # Projector image roughly centred in the Kinect view
+    R_true = cv2.Rodrigues(rvec_true)[0]
+    fx, fy, cx, cy = KINECT_INTRINSICS
+
+    uvd, proj = [], []
+    for _ in range(poses):
+        # 1. Corners on the projector: a grid at a random offset
+        step = rng.uniform(0.06, 0.12) * pw
+        x0 = rng.uniform(0, pw - (cols + 1) * step)
+        y0 = rng.uniform(0, ph - (rows + 1) * step)
+        gx, gy = np.meshgrid(x0 + step * np.arange(1, cols + 1), y0 + step * np.arange(1, rows + 1))
+        px = np.column_stack([gx.ravel(), gy.ravel()])
+
+        # 2. Each projector ray meets the tilted board n . X = d (Kinect frame)
+        n = np.array([rng.uniform(-0.15, 0.15), rng.uniform(-0.15, 0.15), 1.0])
+        n /= np.linalg.norm(n)
+        d = rng.uniform(800, 1100)
+        rays = np.linalg.solve(K_true, np.vstack([px.T, np.ones(len(px))])) # Projector frame
+        origin = -R_true.T @ t_true                                         # Projector centre, Kinect frame
+        dirs = (R_true.T @ rays).T
+        s = (d - n @ origin) / (dirs @ n)
+        X = origin + s[:, None] * dirs
+
+        # 3. What the Kinect sees, with noise
+        u = fx * X[:, 0] / X[:, 2] + cx + rng.normal(0, noise_px, len(X))
+        v = fy * X[:, 1] / X[:, 2] + cy + rng.normal(0, noise_px, len(X))
+        uvd.append(np.column_stack([u, v, X[:, 2] + rng.normal(0, depth_noise_mm, len(X))]))
+        proj.append(px)
+
+    uvd, proj = np.vstack(uvd), np.vstack(proj)
+    # Fixtures the Kinect could never have seen would validate the solver against nothing
+    u, v = uvd[:, 0], uvd[:, 1]
+    if not ((u >= 0) & (u < 640) & (v >= 0) & (v < 480)).all():
+        raise ValueError("synthetic projector image falls outside the 640x480 Kinect view")
+    bad = rng.random(len(uvd)) < outliers
+    uvd[bad, :2] = rng.uniform([0, 0], [640, 480], (bad.sum(), 2))
+    truth = {"K": K_true, "R": R_true, "t": t_true, "outliers": bad}
+    return uvd, proj, truth
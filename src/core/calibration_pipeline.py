@@ -0,0 +1,151 @@
+"""Headless projector calibration from recorded captures.
+
+A calibration session is a .gbs recording (core.session) of the Kinect
+RGB + depth stream plus a "<session>.captures.json" sidecar listing which
+frames show a projected chessboard, and where on the projector that board
+was drawn:
+
+    {"pattern": [6, 5],
+     "captures": [{"frame": 12, "origin": [40, 40], "square": 42}, ...]}
+
+Corners are found in parallel across a process pool (findChessboardCorners
++ cornerSubPix per frame), the depth under each corner is the median of the
+valid pixels around it, and all pairs go to KinectProjector.solve_matrix.
+Re-running a calibration from a saved session:
+
+    cd src && python -m core.calibration_pipeline session.gbs [--out calibration.json]
+"""
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cv2
+
+from core.session import SessionReader
+from core.KinectProjector import KinectProjector
+
+_SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+
+def captures_path(session_path):
+    return os.path.splitext(session_path)[0] + ".captures.json"
+
+def save_captures(session_path, captures, pattern=(6, 5)):
+    """Writes the sidecar: captures = [{"frame": i, "origin": (x, y), "square": px}, ...]."""
+    with open(captures_path(session_path), "w") as f:
+        json.dump({"pattern": list(pattern), "captures": captures}, f, indent=1)
+
+def load_captures(session_path):
+    """(captures, pattern) from the session's sidecar."""
+    with open(captures_path(session_path), "r") as f:
+        data = json.load(f)
+    return data["captures"], tuple(data.get("pattern", (6, 5)))
+
+def detect_corners(rgb, pattern=(6, 5), window=5):
+    """(N, 2) float32 sub-pixel chessboard corners in an RGB frame, or None if not found."""
+    gray = rgb if rgb.ndim == 2 else cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE | cv2.CALIB_CB_FAST_CHECK
+    found, corners = cv2.findChessboardCorners(gray, pattern, flags=flags)
+    if not found:
+        return None
+    cv2.cornerSubPix(gray, corners, (window, window), (-1, -1), _SUBPIX_CRITERIA)
+    return corners.reshape(-1, 2)
+
+def sample_depth(depth, pts, radius=3, min_valid=4):
+    """Median depth of the valid (> 0) pixels in a (2r+1)² window around each point.
+
+    One gather for all points; NaN where fewer than `min_valid` pixels had depth.
+    """
+    h, w = depth.shape
+    offsets = np.arange(-radius, radius + 1)
+    cx = np.rint(pts[:, 0]).astype(np.intp)
+    cy = np.rint(pts[:, 1]).astype(np.intp)
+    ys = np.clip(cy[:, None, None] + offsets[None, :, None], 0, h - 1)
+    xs = np.clip(cx[:, None, None] + offsets[None, None, :], 0, w - 1)
+    window = depth[ys, xs].reshape(len(pts), -1).astype(np.float32)
+    valid = window > 0
+    window[~valid] = np.nan
+    med = np.full(len(pts), np.nan, np.float32)
+    enough = valid.sum(axis=1) >= min_valid # (nanmedian warns on all-NaN rows)
+    med[enough] = np.nanmedian(window[enough], axis=1)
+    return med
+
+def process_frame(rgb, depth, pattern=(6, 5), radius=3):
+    """(N, 3) Kinect (u, v, depth mm) of the board corners in one frame, or None."""
+    corners = detect_corners(rgb, pattern)
+    if corners is None:
+        return None
+    return np.column_stack([corners, sample_depth(depth, corners, radius)])
+
+def _process_session_frames(path, frames, pattern, radius):
+    """Pool task: opens the session itself (only frame numbers cross the process boundary)."""
+    reader = SessionReader(path)
+    try:
+        out = []
+        for i in frames:
+            depth, rgb, _ = reader.frame(i)
+            out.append((i, process_frame(rgb, depth, pattern, radius)))
+        return out
+    finally:
+        reader.close()
+
+def detect_session(path, frames, pattern=(6, 5), radius=3, workers=None):
+    """{frame: (N, 3) uvd or None} for the given frames of a session, on a process pool."""
+    frames = sorted(set(int(i) for i in frames))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(frames)))
+    if workers == 1:
+        return dict(_process_session_frames(path, frames, pattern, radius))
+    # Neighbouring frames share a chunk: give each worker a contiguous run to decode
+    batches = [b.tolist() for b in np.array_split(frames, workers)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_process_session_frames, [path] * workers, batches, [pattern] * workers,
+                             [radius] * workers):
+            results.update(part)
+    return results
+
+def calibrate_session(path, calibrator=None, captures=None, pattern=None, radius=3, workers=None,
+                      threshold_px=4.0):
+    """Detects, samples and solves a recorded session; returns (calibrator, report).
+
+    captures/pattern default to the session's sidecar. report maps each
+    capture's frame to the number of corner pairs it contributed (0 when
+    the board was not found).
+    """
+    if captures is None:
+        captures, saved_pattern = load_captures(path)
+        pattern = pattern or saved_pattern
+    pattern = tuple(pattern or (6, 5))
+    calibrator = calibrator or KinectProjector()
+    cols, rows = pattern
+
+    detections = detect_session(path, [c["frame"] for c in captures], pattern, radius, workers)
+    report = {}
+    for capture in captures:
+        uvd = detections.get(capture["frame"])
+        if uvd is None:
+            report[capture["frame"]] = 0
+            continue
+        x, y = capture["origin"]
+        proj = calibrator.get_target_pts_for_pos(x, y, sq_sz=capture["square"], cols=cols, rows=rows)
+        keep = np.isfinite(uvd[:, 2])
+        calibrator.add_point_pairs(proj[keep], uvd[keep])
+        report[capture["frame"]] = int(keep.sum())
+    calibrator.solve_matrix(threshold_px)
+    return calibrator, report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("session", help=".gbs recording with a .captures.json sidecar")
+    parser.add_argument("--out", default="calibration.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--radius", type=int, default=3, help="depth median window radius (px)")
+    args = parser.parse_args()
+
+    calibrator, report = calibrate_session(args.session, radius=args.radius, workers=args.workers)
+    missed = [frame for frame, n in report.items() if n == 0]
+    print(f"{len(report) - len(missed)}/{len(report)} captures usable" + (f", no board in {missed}" if missed else ""))
+    if calibrator.projection_matrix is not None:
+        calibrator.save_calibration(args.out)
+        print(f"Saved to {args.out}")
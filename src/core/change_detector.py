@@ -0,0 +1,110 @@
+import numpy as np
+import cv2
+
+class ChangeDetector:
+    """Tracks which tiles of the elevation map moved enough to be worth redrawing.
+
+    The sandbox is split into tile x tile blocks. Each frame, a tile is dirty
+    when any of its pixels differs from the elevation it was last drawn with
+    by more than `threshold_mm`. Dirty tiles take the new elevation as their
+    reference, clean tiles keep the old one. So what is on screen never lags
+    the sand by more than the threshold, and slow drift eventually triggers
+    a redraw too.
+
+    Consumers (TerrainRenderer, ProjectorWarp) take `mask` / `rects()` and
+    recompute only those areas; invalidate() forces a full redraw (e.g.
+    after a colour map or contour interval change).
+    """
+    def __init__(self, tile=32, threshold_mm=2.0):
+        self.tile = tile
+        self.threshold_mm = threshold_mm
+        self.reference = None
+        self.mask = None
+        self.dirty_fraction = 1.0
+        self._diff = None
+        self._row_max = None
+        self._tile_max = None
+        self._force = True
+
+    def invalidate(self):
+        """Everything is dirty on the next update()."""
+        self._force = True
+
+    def _alloc(self, shape):
+        h, w = shape
+        t = self.tile
+        rows, cols = -(-h // t), -(-w // t)
+        self.reference = np.zeros(shape, np.float32)
+        self.mask = np.ones((rows, cols), bool)
+        # Padded to whole tiles so the per-tile max is two reshaped reductions
+        self._diff = np.zeros((rows * t, cols * t), np.float32)
+        self._row_max = np.zeros((rows, cols * t), np.float32)
+        self._tile_max = np.zeros((rows, cols), np.float32)
+
+    def update(self, elevation):
+        """Marks tiles that moved past the threshold and adopts their new elevation. Returns `mask`."""
+        if self.reference is None or self.reference.shape != elevation.shape:
+            self._alloc(elevation.shape)
+            self._force = True
+        if self._force:
+            np.copyto(self.reference, elevation)
+            self.mask.fill(True)
+            self.dirty_fraction = 1.0
+            self._force = False
+            return self.mask
+
+        # 1. Largest |change| per tile
+        h, w = elevation.shape
+        rows, cols = self.mask.shape
+        t = self.tile
+        cv2.absdiff(elevation, self.reference, dst=self._diff[:h, :w])
+        # Two single-axis reductions are ~5x faster than one over axes (1, 3)
+        np.max(self._diff.reshape(rows, t, cols * t), axis=1, out=self._row_max)
+        np.max(self._row_max.reshape(rows, cols, t), axis=2, out=self._tile_max)
+        np.greater(self._tile_max, self.threshold_mm, out=self.mask)
+        self.dirty_fraction = float(self.mask.mean())
+
+        # 2. Dirty tiles will be redrawn from this frame: make it their reference
+        for y0, y1, x0, x1 in self.rects():
+            self.reference[y0:y1, x0:x1] = elevation[y0:y1, x0:x1]
+        return self.mask
+
+    def rects(self):
+        """Dirty tiles as pixel rectangles (y0, y1, x0, x1), neighbouring runs merged (see tile_rects)."""
+        return tile_rects(self.mask, self.tile, self.reference.shape)
+
+def tile_rects(mask, tile, shape):
+    """(rows, cols) tile mask -> pixel rectangles (y0, y1, x0, x1) clipped to shape (h, w).
+
+    Consecutive marked tiles in a row become one rectangle, and a run
+    directly below one with the same columns extends it, so callers make
+    one OpenCV call per block instead of one per tile.
+    """
+    h, w = shape
+    rects = []
+    open_runs = {} # (x0, x1) -> index in rects of the run ending on the previous tile row
+    for r in range(mask.shape[0]):
+        if not mask[r].any():
+            open_runs = {}
+            continue
+        # Runs of consecutive marked tiles: edges of the 0/1 signal
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], mask[r].view(np.int8), [0]))))
+        y0, y1 = r * tile, min(h, (r + 1) * tile)
+        runs = {}
+        for c0, c1 in zip(edges[::2], edges[1::2]):
+            span = (int(c0) * tile, min(w, int(c1) * tile))
+            i = open_runs.get(span)
+            if i is None:
+                i = len(rects)
+                rects.append((y0, y1) + span)
+            else:
+                rects[i] = (rects[i][0], y1) + span
+            runs[span] = i
+        open_runs = runs
+    return rects
+
+def mark_tiles(mask, tile, rects):
+    """Sets every tile of `mask` that any pixel rectangle (y0, y1, x0, x1) touches."""
+    for y0, y1, x0, x1 in rects:
+        mask[y0 // tile:(y1 - 1) // tile + 1, x0 // tile:(x1 - 1) // tile + 1] = True
+    return mask
@@ -0,0 +1,180 @@
+import os
+import time
+import numpy as np
+
+from core.session import SessionReader, is_session_file
+
+class DepthSource:
+    """Base class for anything that can feed depth (and RGB) frames into the pipeline.
+
+    Subclasses implement `read()` which returns a (depth, rgb) pair:
+    depth is a 480x640 uint16 array in millimetres (0 = no reading),
+    rgb is a 480x640x3 uint8 array or None. A finite source that has run
+    out returns (None, None) and sets `exhausted`.
+    """
+    width, height = 640, 480
+
+    def __init__(self, fps=None):
+        # fps=None means "as fast as the consumer can pull"
+        self.fps = fps
+        self.exhausted = False # End of stream: read() will never return a frame again
+        self._next_deadline = None
+
+    def start(self):
+        self._next_deadline = None
+
+    def stop(self):
+        pass
+
+    def read(self):
+        raise NotImplementedError
+
+    def _throttle(self):
+        """Sleeps just long enough to hold the configured frame rate."""
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        delay = self._next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Fell behind: re-anchor instead of bursting to catch up
+            self._next_deadline = now
+        self._next_deadline += 1.0 / self.fps
+
+class FreenectDepthSource(DepthSource):
+    """Live Kinect v1 through libfreenect's sync API."""
+    def __init__(self):
+        super().__init__(fps=None) # The sensor paces itself
+        import freenect # Only needed when a Kinect is actually attached
+        self.freenect = freenect
+
+    def stop(self):
+        self.freenect.sync_stop()
+
+    def read(self):
+        # Get registered depth (metric mm aligned to RGB/Projector space)
+        depth, _ = self.freenect.sync_get_depth(format=self.freenect.DEPTH_REGISTERED)
+        rgb, _ = self.freenect.sync_get_video()
+        return depth, rgb
+
+class SyntheticDepthSource(DepthSource):
+    """Procedural sandbox: a few slowly drifting hills over a flat floor, plus sensor noise.
+
+    All heavy lifting (bump shapes, noise bank, dropout mask) is precomputed so that
+    generating a frame costs a handful of in-place array ops.
+    """
+    def __init__(self, fps=None, floor_mm=900, relief_mm=150, noise_mm=2.0,
+                 dropout=0.002, hills=4, seed=0):
+        super().__init__(fps)
+        self.floor_mm = floor_mm
+        rng = np.random.default_rng(seed)
+        h, w = self.height, self.width
+        yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+
+        # 1. Gaussian hills with random centre, radius, phase and speed
+        self.bumps = np.empty((hills, h, w), np.float32)
+        for k in range(hills):
+            cx, cy = rng.uniform(0.2, 0.8) * w, rng.uniform(0.2, 0.8) * h
+            r = rng.uniform(0.08, 0.2) * w
+            self.bumps[k] = relief_mm * np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * r * r))
+        self.phases = rng.uniform(0, 2 * np.pi, hills).astype(np.float32)
+        self.speeds = rng.uniform(0.2, 0.6, hills).astype(np.float32)
+
+        # 2. Small bank of noise frames and a dropout mask (Kinect shadows read as 0)
+        self.noise_bank = rng.normal(0, noise_mm, (8, h, w)).astype(np.float32)
+        self.dropout_mask = rng.random((h, w)) < dropout
+
+        # 3. Preallocated output buffers
+        self._surface = np.empty((h, w), np.float32)
+        self._depth = np.empty((h, w), np.uint16)
+        self._rgb = np.full((h, w, 3), 128, np.uint8)
+        self.frame_idx = 0
+
+    def read(self):
+        self._throttle()
+        t = self.frame_idx / 30.0 # Animate in "sensor time" so runs are reproducible
+        weights = 0.5 + 0.5 * np.sin(self.phases + self.speeds * t)
+
+        np.copyto(self._surface, self.floor_mm)
+        for k, wk in enumerate(weights):
+            # surface -= wk * bump, without a temporary
+            self._surface -= self.bumps[k] * np.float32(wk)
+        self._surface += self.noise_bank[self.frame_idx % len(self.noise_bank)]
+
+        np.copyto(self._depth, self._surface, casting='unsafe')
+        self._depth[self.dropout_mask] = 0
+        self.frame_idx += 1
+        return self._depth, self._rgb
+
+class ReplayDepthSource(DepthSource):
+    """Plays back a recorded stack of depth frames.
+
+    Accepts a .gbs session (see core.session), a .npy of shape (N, 480, 640) or
+    a .npz with a 'depth' array and an optional 'rgb' array. Frames are
+    memory-mapped where possible, so long recordings are not pulled into RAM up front.
+    """
+    def __init__(self, path, fps=30.0, loop=True):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.rgb = None
+        self.session = None
+        if is_session_file(path):
+            self.session = SessionReader(path)
+            self.depth = None
+        elif path.endswith(".npz"):
+            data = np.load(path)
+            self.depth = data["depth"]
+            self.rgb = data["rgb"] if "rgb" in data.files else None
+        else:
+            self.depth = np.load(path, mmap_mode='r')
+        if self.depth is not None and self.depth.ndim == 2:
+            self.depth = self.depth[None] # Single snapshot, e.g. a saved DEM
+        self.frame_idx = 0
+
+    def __len__(self):
+        return len(self.session) if self.session is not None else len(self.depth)
+
+    def seek(self, frame_idx):
+        self.frame_idx = frame_idx
+        self.exhausted = False
+
+    def read(self):
+        if self.frame_idx >= len(self):
+            if not self.loop:
+                self.exhausted = True
+                return None, None
+            self.frame_idx = 0
+        self._throttle()
+        i = self.frame_idx
+        self.frame_idx += 1
+        if self.session is not None:
+            depth, rgb, _ = self.session.frame(i)
+            return depth, rgb
+        rgb = self.rgb[i] if self.rgb is not None else None
+        return self.depth[i], rgb
+
+def create_depth_source(spec=None):
+    """Builds a source from a short spec string.
+
+    'kinect' (default), 'synthetic', 'synthetic@30' or 'replay:path/to/session.gbs@max'.
+    The spec falls back to the GEOBOX_DEPTH_SOURCE environment variable so the
+    GUI can be started on a machine without a sensor attached.
+    """
+    spec = spec or os.environ.get("GEOBOX_DEPTH_SOURCE", "kinect")
+    kwargs = {}
+    if "@" in spec:
+        # '@max' (or '@0') removes throttling entirely
+        spec, rate = spec.rsplit("@", 1)
+        kwargs["fps"] = None if rate in ("", "0", "max") else float(rate)
+
+    if spec == "kinect":
+        return FreenectDepthSource()
+    if spec == "synthetic":
+        return SyntheticDepthSource(**kwargs)
+    if spec.startswith("replay:"):
+        return ReplayDepthSource(spec[len("replay:"):], **kwargs)
+    raise ValueError(f"Unknown depth source '{spec}'")
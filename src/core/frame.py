@@ -0,0 +1,35 @@
+import numpy as np
+
+class DepthFrame:
+    """One filtered depth frame as it travels through the pipeline.
+
+    Holds the float32 depth in millimetres, a validity mask (False where the
+    sensor had no reading), the capture timestamp (time.perf_counter seconds)
+    and the capture sequence number. Frames are passed by reference and their
+    buffers are recycled by the producer, so consumers that need to keep one
+    around should call copy().
+    """
+    __slots__ = ("depth", "valid", "timestamp", "seq")
+
+    def __init__(self, depth, valid=None, timestamp=0.0, seq=-1):
+        self.depth = depth
+        self.valid = valid if valid is not None else depth > 0
+        self.timestamp = timestamp
+        self.seq = seq
+
+    @classmethod
+    def empty(cls, height=480, width=640):
+        return cls(np.zeros((height, width), np.float32), np.zeros((height, width), bool))
+
+    @property
+    def shape(self):
+        return self.depth.shape
+
+    def copy(self):
+        return DepthFrame(self.depth.copy(), self.valid.copy(), self.timestamp, self.seq)
+
+def as_depth(frame):
+    """Accepts a DepthFrame or a bare depth array, returns (depth, valid or None)."""
+    if isinstance(frame, DepthFrame):
+        return frame.depth, frame.valid
+    return frame, None
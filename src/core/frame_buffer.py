@@ -0,0 +1,81 @@
+import threading
+import time
+import numpy as np
+
+class FrameRingBuffer:
+    """Fixed set of preallocated frame slots shared by a producer and a consumer.
+
+    The producer (capture thread) always writes into the oldest slot that is not
+    pinned by the consumer. The consumer only ever asks for the newest frame, so
+    anything it was too slow to pick up is overwritten and counted as dropped
+    instead of piling up in a queue.
+    """
+    def __init__(self, capacity=4, height=480, width=640, with_rgb=True):
+        if capacity < 3:
+            raise ValueError("Need at least 3 slots (writing, newest, pinned)")
+        self.capacity = capacity
+        self.depth = np.zeros((capacity, height, width), np.uint16)
+        self.rgb = np.zeros((capacity, height, width, 3), np.uint8) if with_rgb else None
+        self.seq = np.full(capacity, -1, np.int64)
+        self.timestamps = np.zeros(capacity, np.float64)
+
+        self._cond = threading.Condition()
+        self._newest = -1  # slot holding the most recent complete frame
+        self._pinned = -1  # slot currently being read by the consumer
+        self._next_seq = 0
+        self.written = 0
+        self.dropped = 0
+
+    def _free_slot(self):
+        """Oldest slot that is neither pinned nor the newest complete frame."""
+        candidates = [i for i in range(self.capacity) if i != self._pinned and i != self._newest]
+        return min(candidates, key=lambda i: self.seq[i])
+
+    def write(self, depth, rgb=None, timestamp=None):
+        """Copies a frame into the ring. Returns its sequence number."""
+        with self._cond:
+            slot = self._free_slot()
+            self.seq[slot] = -1 # Invalid while being filled
+        # Copy outside the lock: no one else can touch a slot that is neither newest nor pinned
+        np.copyto(self.depth[slot], depth, casting='unsafe')
+        if self.rgb is not None and rgb is not None:
+            np.copyto(self.rgb[slot], rgb)
+        with self._cond:
+            self.seq[slot] = self._next_seq
+            self.timestamps[slot] = time.perf_counter() if timestamp is None else timestamp
+            self._next_seq += 1
+            self._newest = slot
+            self.written += 1
+            self._cond.notify_all()
+            return int(self.seq[slot])
+
+    def acquire_latest(self, last_seq=-1, timeout=None):
+        """Pins and returns (seq, slot) of the newest frame newer than last_seq.
+
+        Returns None on timeout. Frames between last_seq and the returned one
+        were never seen by the consumer and are added to `dropped`.
+        Call release() when done with the slot.
+        """
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._newest >= 0 and self.seq[self._newest] > last_seq, timeout)
+            if not ready:
+                return None
+            slot = self._newest
+            seq = int(self.seq[slot])
+            if last_seq >= 0:
+                self.dropped += seq - last_seq - 1
+            self._pinned = slot
+            return seq, slot
+
+    def release(self, slot):
+        with self._cond:
+            if self._pinned == slot:
+                self._pinned = -1
+
+    def latest_rgb(self):
+        """Copy of the newest RGB frame, or None before the first frame."""
+        with self._cond:
+            if self.rgb is None or self._newest < 0:
+                return None
+            return self.rgb[self._newest].copy()
@@ -1,51 +1,199 @@
 import os
+import threading
+import time
 current_folder = os.getcwd()
-os.add_dll_directory(current_folder)
+if hasattr(os, "add_dll_directory"): # Windows only: freenect DLLs ship in the repo root
+    os.add_dll_directory(current_folder)
 
-import freenect
 import numpy as np
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import Qt, QThread, Signal
+
+from core.depth_source import create_depth_source
+from core.frame import DepthFrame
+from core.frame_buffer import FrameRingBuffer
+from core.temporal_filter import EMAFilter
+from core.session import SessionWriter
 
 class KinectWorker(QThread):
-    depth_frame_ready = Signal(np.ndarray)
+    """Kinect acquisition and temporal smoothing.
+
+    A plain capture thread pulls frames from the DepthSource into a FrameRingBuffer;
+    this QThread's run() smooths whatever frame is newest and publishes it as a
+    DepthFrame (float32 mm + validity mask + timestamp).
+    At most one depth_frame_ready emission is ever queued on the GUI side:
+    while the previous one is undelivered, new frames are only published to
+    latest_frame() and counted as coalesced. A slow consumer therefore sees
+    the freshest frame rather than a growing backlog.
+
+    Output buffers are never rewritten while someone may hold them: the
+    newest, the queued and the last delivered frame are skipped when
+    picking the next one to write. Listeners and latest_frame() get copies.
+    """
+    depth_frame_ready = Signal(object) # DepthFrame
     #rgb_frame = Signal(np.ndarray)
 
-    def __init__(self, alpha=0.3):
+    def __init__(self, alpha=0.3, source=None, temporal_filter=None, ring_size=4, max_latency_ms=66.0):
         super().__init__()
         self.alpha = alpha
         self.running = True
-        self.accumulator = None
+        # Anything implementing DepthSource.read(); defaults to the live Kinect
+        # (or whatever GEOBOX_DEPTH_SOURCE points at, e.g. 'synthetic')
+        self.source = source if source is not None else create_depth_source()
+        # In-place temporal smoothing (EMA by default, see core.temporal_filter)
+        self.temporal_filter = temporal_filter if temporal_filter is not None else \
+            EMAFilter(alpha, self.source.height, self.source.width)
         # # Define the physical workspace in mm
         # self.min_depth = 762   # Closest distance to sand (mm)
         # self.max_depth = 914  # Furthest distance (bottom of box) (mm)
-        self.latest_rgb = None
-        
+        self.recorder = None # SessionWriter while a recording is running
+        self._record_lock = threading.Lock()
+
+        # Capture -> smoothing hand-off
+        self.ring = FrameRingBuffer(ring_size, self.source.height, self.source.width)
+        self._capture_thread = None
+
+        # Smoothing -> consumer hand-off: four output buffers (one being written, the newest,
+        # one queued in a signal, one held by the GUI consumer since its delivery)
+        # Frames stay float32 millimetres end to end (no uint8 truncation)
+        self._out = [DepthFrame.empty(self.source.height, self.source.width) for _ in range(4)]
+        self._latest = None
+        self._queued = None    # Emitted, not yet delivered
+        self._delivered = None # Delivered last: the GUI slot may still be using it
+        self._publish_lock = threading.Lock()
+        self._in_flight = False
+        self._listeners = [] # Called on the smoothing thread for every frame (see add_listener)
+        # Connected before any consumer, so it runs as soon as the GUI thread picks up the emission
+        self.depth_frame_ready.connect(self._on_delivered, Qt.QueuedConnection)
+
+        # Counters
+        self.max_latency_ms = max_latency_ms
+        self.late_frames = 0
+        self.coalesced_frames = 0
+        self.last_latency_ms = 0.0
+
         # Todo: DO WE NEED TO ADD THE ROI LOGIC HERE or in PROCESSOR.py?
 
+    def _capture_loop(self):
+        """Blocking sensor reads only: no maths, no Qt."""
+        self.source.start()
+        while self.running:
+            try:
+                depth, rgb = self.source.read()
+                if depth is None:
+                    if self.source.exhausted: # Replay finished: the last frame stays on screen
+                        break
+                    time.sleep(0.005) # No frame this time: don't spin on the source
+                    continue
+                with self._record_lock:
+                    if self.recorder is not None:
+                        self.recorder.write(depth, rgb)
+                self.ring.write(depth, rgb)
+
+            except Exception as e:
+                print(f"Kinect Sync Error: {e}")
+                time.sleep(0.5)
+        self.source.stop()
+
     def run(self):
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
+        last_seq = -1
         while self.running:
+            got = self.ring.acquire_latest(last_seq, timeout=0.1)
+            if got is None:
+                continue
+            last_seq, slot = got
             try:
-                # Get registered depth (metric mm aligned to RGB/Projector space)
-                depth, _ = freenect.sync_get_depth(format=freenect.DEPTH_REGISTERED)
-                rgb, _ = freenect.sync_get_video()
-                if depth is None: continue
-                
+                captured_at = self.ring.timestamps[slot]
                 # np.clip(depth, 0, 1023, out=depth) # Clipping not recommended
                 # depth >>= 2
-                current_frame = depth.astype(np.float32)
+                # 3. Temporal Smoothing, straight from the ring slot into the filter's buffers
+                smoothed = self.temporal_filter.apply(self.ring.depth[slot])
+            finally:
+                self.ring.release(slot)
 
-                # 3. Temporal Smoothing (EMA)
-                if self.accumulator is None:
-                    self.accumulator = current_frame
-                else:
-                    self.accumulator = (self.alpha * current_frame) + ((1.0 - self.alpha) * self.accumulator)
+            self._publish(last_seq, smoothed, captured_at)
+        self._capture_thread.join()
 
-                self.depth_frame_ready.emit(self.accumulator.astype(np.uint8))
-                self.latest_rgb = rgb
+    def _free_buffer(self):
+        """An output buffer that is neither the newest, queued, nor held by the GUI."""
+        with self._publish_lock:
+            held = (self._latest, self._queued, self._delivered)
+        return next(f for f in self._out if all(f is not h for h in held))
 
-            except Exception as e:
-                print(f"Kinect Sync Error: {e}")
-                self.msleep(500)
+    def _publish(self, seq, depth, captured_at):
+        out = self._free_buffer()
+        np.copyto(out.depth, depth)
+        np.greater(out.depth, 0, out=out.valid)
+        out.timestamp = captured_at
+        out.seq = seq
+
+        self.last_latency_ms = float(time.perf_counter() - captured_at) * 1000.0
+        if self.last_latency_ms > self.max_latency_ms:
+            self.late_frames += 1
+
+        if self._listeners:
+            shared = out.copy() # Listeners may keep it: never one of the recycled buffers
+            for listener in self._listeners:
+                listener(shared)
+
+        with self._publish_lock:
+            self._latest = out
+            if self._in_flight:
+                self.coalesced_frames += 1
+                return
+            self._in_flight = True
+            self._queued = out
+        self.depth_frame_ready.emit(out)
+
+    def _on_delivered(self, frame):
+        with self._publish_lock:
+            self._in_flight = False
+            self._queued = None
+            self._delivered = frame
+
+    def add_listener(self, fn):
+        """Push API for other worker threads: fn(DepthFrame) runs on this thread for every frame.
+
+        Unlike depth_frame_ready it doesn't go through the GUI event loop, so a
+        busy GUI can't starve the listener. fn gets a copy it may keep, but must
+        be quick: it holds up the next frame.
+        """
+        self._listeners.append(fn)
+
+    def latest_frame(self):
+        """Pull API: a copy of the newest smoothed DepthFrame, or None before the first one."""
+        with self._publish_lock:
+            latest = self._latest
+            # Copied under the lock: _free_buffer() can't pick the newest frame meanwhile
+            return latest.copy() if latest is not None else None
+
+    def stats(self):
+        return {
+            "captured": self.ring.written,
+            "dropped": self.ring.dropped,
+            "coalesced": self.coalesced_frames,
+            "late": self.late_frames,
+            "latency_ms": self.last_latency_ms,
+        }
+
+    def stop(self):
+        self.running = False
+        self.wait()
+        self.stop_recording()
+
+    def start_recording(self, path, **kwargs):
+        """Records the raw (unsmoothed) depth + RGB stream to a .gbs session file."""
+        self.stop_recording()
+        with self._record_lock:
+            self.recorder = SessionWriter(path, **kwargs)
+
+    def stop_recording(self):
+        with self._record_lock:
+            recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
 
     def get_latest_rgb(self):
-        return self.latest_rgb if self.latest_rgb is not None else np.zeros((480, 640, 3), np.uint8)
\ No newline at end of file
+        rgb = self.ring.latest_rgb()
+        return rgb if rgb is not None else np.zeros((480, 640, 3), np.uint8)
\ No newline at end of file
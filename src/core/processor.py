@@ -1,11 +1,21 @@
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
+
+from core.frame import as_depth
+
 class TerrainProcessor:
     def __init__(self):
         self.base_depth = None  # Stores the "Empty Box" snapshot
         self.roi = None         # (x, y, w, h)
 
+        # Full-precision path: float32 mm in, float32 mm out, buffers reused every frame
+        self.elevation = None   # Output buffer of calculate_elevation
+        self._invalid = None    # Scratch mask
+        self._outside = None    # True outside the ROI (None = no ROI)
+        self._topo_index = None # create_topo_map buffers
+        self._topo_color = None
+
         #for the terrain colormap
         colormap = plt.get_cmap('terrain')
         colors = colormap(np.linspace(0,1, 256))[:, :3]
@@ -14,7 +24,54 @@ class TerrainProcessor:
         
     def set_base_depth(self, frame):
         """Take a snapshot of the flat sand to use as 'Sea Level'"""
-        self.base_depth = frame.astype(np.float32)
+        self.set_base_plane(frame)
+
+    def set_base_plane(self, frame):
+        """Snapshot of the empty/flat sand (DepthFrame or depth array), kept at full precision."""
+        depth, _ = as_depth(frame)
+        self.base_depth = np.array(depth, dtype=np.float32) # Own copy: frame buffers are recycled
+        h, w = self.base_depth.shape
+        self.elevation = np.zeros((h, w), np.float32)
+        self._invalid = np.zeros((h, w), bool)
+        self._base_invalid = self.base_depth <= 0
+        self._rebuild_roi_mask()
+
+    def update_roi(self, x, y, w, h):
+        """Restricts elevation to a sensor-space rectangle; everything outside reads as 0."""
+        self.roi = (x, y, w, h)
+        self._rebuild_roi_mask()
+
+    def _rebuild_roi_mask(self):
+        if self.roi is None or self.base_depth is None:
+            self._outside = None
+            return
+        x, y, w, h = self.roi
+        self._outside = np.ones(self.base_depth.shape, bool)
+        self._outside[y:y + h, x:x + w] = False
+
+    def calculate_elevation(self, frame):
+        """Signed height above the base plane in mm (positive = sand piled up).
+
+        Accepts a DepthFrame (uses its validity mask) or a bare depth array.
+        Pixels without a reading, with no base reading, or outside the ROI are 0.
+        Returns the processor's own float32 buffer, overwritten on the next call.
+        """
+        depth, valid = as_depth(frame)
+        if self.base_depth is None:
+            return np.zeros(depth.shape, np.float32)
+
+        # Height = Floor Depth - Current Depth, without any dtype round trips for float32 input
+        np.subtract(self.base_depth, depth, out=self.elevation, casting='unsafe')
+
+        if valid is not None:
+            np.logical_not(valid, out=self._invalid)
+        else:
+            np.less_equal(depth, 0, out=self._invalid)
+        np.logical_or(self._invalid, self._base_invalid, out=self._invalid)
+        if self._outside is not None:
+            np.logical_or(self._invalid, self._outside, out=self._invalid)
+        np.copyto(self.elevation, 0, where=self._invalid)
+        return self.elevation
 
     def get_elevation(self, current_frame):
         """Calculates height by subtracting current sand from the floor."""
@@ -48,22 +105,25 @@ class TerrainProcessor:
         return color_map
 
     def create_topo_map(self, elevation):
-        """Turns millimeters into a 0-255 image for the projector"""
+        """Turns millimeters into a 0-255 image for the projector.
+
+        Returns the processor's own BGR buffer, overwritten on the next call.
+        """
         # Assume max sand height is 254
         max_h = 254.0
-        norm = np.clip(elevation / max_h, 0, 1) * 255
-        norm = norm.astype(np.uint8)
-        
-        # Apply a 'Terrain' color palette (Blue -> Green -> Brown -> White)
-        # COLORMAP_TURBO or COLORMAP_terrain look great for sandboxes
-        colored = cv2.LUT(cv2.merge([norm, norm, norm]), self.terrain_lut)
+        h, w = elevation.shape[:2]
+        if self._topo_index is None or self._topo_index.shape != (h, w):
+            self._topo_index = np.empty((h, w), np.uint8)
+            self._topo_color = np.empty((h, w, 3), np.uint8)
 
-        # Alternative: If norm is a single channel, cv2.LUT needs a specific trick:
-        # # colored = cv2.applyColorMap(norm, self.terrain_lut) 
-        # # (OpenCV allows passing a custom LUT directly into applyColorMap too!)
-        # colored = cv2.applyColorMap(norm, self.terrain_lut)
+        # Scale, clip and cast in one saturating pass (negative -> 0, above max_h -> 255;
+        # -0.5 turns the rounding into the truncation astype(np.uint8) did)
+        cv2.addWeighted(elevation, 255.0 / max_h, elevation, 0, -0.5, dst=self._topo_index, dtype=cv2.CV_8U)
         
-        return colored
+        # Apply a 'Terrain' color palette (Blue -> Green -> Brown -> White)
+        # applyColorMap with a user table looks up straight from the single channel (no 3-channel merge)
+        cv2.applyColorMap(self._topo_index, self.terrain_lut, dst=self._topo_color)
+        return self._topo_color
     
 #     def get_clean_contours(self, elevation_map, interval=50):
 #         """Creates sharp topographic lines via quantization."""
@@ -77,4 +137,17 @@ class TerrainProcessor:
 #         """Calculates gradients for rain physics."""
 #         dx = cv2.Sobel(elevation, cv2.CV_32F, 1, 0, ksize=3)
 #         dy = cv2.Sobel(elevation, cv2.CV_32F, 0, 1, ksize=3)
-#         return dx, dy
\ No newline at end of file
+#         return dx, dy
+
+class TerrainProcessor_Smoothened(TerrainProcessor):
+    """TerrainProcessor with a spatial (Gaussian) filter on the elevation output."""
+    def __init__(self, ksize=7):
+        super().__init__()
+        self.ksize = (ksize, ksize)
+        self._smoothed = None
+
+    def calculate_elevation(self, frame):
+        elevation = super().calculate_elevation(frame)
+        if self._smoothed is None or self._smoothed.shape != elevation.shape:
+            self._smoothed = np.empty_like(elevation)
+        return cv2.GaussianBlur(elevation, self.ksize, 0, dst=self._smoothed)
\ No newline at end of file
@@ -0,0 +1,268 @@
+from collections import OrderedDict
+
+import numpy as np
+import cv2
+
+from core.change_detector import tile_rects, mark_tiles
+
+class ProjectorWarp:
+    """Kinect-space frame -> projector frame through cached cv2.remap tables.
+
+    cv2.warpPerspective re-derives the inverse mapping for every output pixel
+    on every call. The mapping only changes when the calibration or the
+    over-fill scale changes, so we build it once, convert it to OpenCV's
+    fixed-point CV_16SC2 format (the fastest remap input) and keep a few
+    recent tables around so toggling between scales is free.
+
+    warp() can also take the source rectangles that changed since the last
+    call (TerrainRenderer.drawn_rects): each tile x tile block of the
+    projector frame knows which source tiles it samples from, so only blocks
+    fed by a changed area are remapped.
+    """
+    def __init__(self, out_size=(1024, 768), scale=1.05, cache_size=4, tile=32, src_tile=16):
+        self.out_size = out_size # (w, h)
+        self.scale = scale
+        self.homography = None
+        self.src_size = (640, 480)
+        self.maps = None
+        self._cache = OrderedDict()
+        self.cache_size = cache_size
+        self.out = None
+        self._index_out = None
+        self.tile = tile
+        self.src_tile = src_tile
+        self.dirty_fraction = 1.0 # Share of projector tiles remapped by the last warp()
+        self._full = True         # Next warp() must redraw everything
+
+    @property
+    def ready(self):
+        return self.homography is not None
+
+    def set_homography(self, homography, src_size=(640, 480)):
+        self.homography = np.asarray(homography, np.float64)
+        self.src_size = src_size
+        self.maps = None
+
+    def set_scale(self, scale):
+        if scale != self.scale:
+            self.scale = scale
+            self.maps = None
+
+    def _key(self):
+        return (self.homography.tobytes(), self.scale, self.src_size, self.out_size)
+
+    def _build_maps(self):
+        """Inverse-maps every projector pixel back into Kinect space once."""
+        key = self._key()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.maps = self._cache[key]
+            return
+
+        # Magic-Sand often uses a 1.05x or 1.1x scale factor
+        # to "over-fill" the sandbox and hide black borders
+        M = self.homography.copy()
+        M[0, 0] *= self.scale
+        M[1, 1] *= self.scale
+        M_inv = np.linalg.inv(M)
+
+        w, h = self.out_size
+        xs, ys = np.meshgrid(np.arange(w, dtype=np.float64), np.arange(h, dtype=np.float64))
+        denom = M_inv[2, 0] * xs + M_inv[2, 1] * ys + M_inv[2, 2]
+        map_x = ((M_inv[0, 0] * xs + M_inv[0, 1] * ys + M_inv[0, 2]) / denom).astype(np.float32)
+        map_y = ((M_inv[1, 0] * xs + M_inv[1, 1] * ys + M_inv[1, 2]) / denom).astype(np.float32)
+        src_w, src_h = self.src_size
+        outside = (map_x < 0) | (map_y < 0) | (map_x > src_w - 1) | (map_y > src_h - 1)
+        self.maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2) + (outside.astype(np.uint8),
+                                                                   self._tile_sources(map_x, map_y, outside))
+
+        self._cache[key] = self.maps
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _tile_sources(self, map_x, map_y, outside):
+        """Per projector tile: the [y0, y1) x [x0, x1) range of source tiles its pixels sample."""
+        t, s = self.tile, self.src_tile
+        h, w = map_x.shape
+        rows, cols = -(-h // t), -(-w // t)
+        src_w, src_h = self.src_size
+        ranges = []
+        for m, limit in ((map_y, src_h), (map_x, src_w)):
+            # Bilinear taps reach floor(v) .. floor(v) + 1, plus a pixel of slack for the
+            # fixed-point map rounding; pixels outside the source sample nothing
+            lo = np.full((rows * t, cols * t), np.inf, np.float32)
+            hi = np.full((rows * t, cols * t), -np.inf, np.float32)
+            lo[:h, :w] = np.where(outside, np.inf, m - 1)
+            hi[:h, :w] = np.where(outside, -np.inf, m + 2)
+            lo = lo.reshape(rows, t, cols, t).min(axis=(1, 3))
+            hi = hi.reshape(rows, t, cols, t).max(axis=(1, 3))
+            empty = ~np.isfinite(lo)
+            first = np.clip(np.floor(np.where(empty, 0, lo)), 0, limit - 1).astype(np.intp) // s
+            last = np.clip(np.floor(np.where(empty, 0, hi)), 0, limit - 1).astype(np.intp) // s + 1
+            last[empty] = first[empty] # Empty range: never dirty
+            ranges += [first, last]
+        return ranges # [y0, y1, x0, x1], each (rows, cols) in source tiles
+
+    def _dirty_rects(self, rects):
+        """Projector rectangles fed by any of the changed source rectangles."""
+        src_w, src_h = self.src_size
+        s = self.src_tile
+        changed = mark_tiles(np.zeros((-(-src_h // s), -(-src_w // s)), bool), s, rects)
+        # Summed-area table: changed source tiles inside each projector tile's range, all tiles at once
+        sat = np.zeros((changed.shape[0] + 1, changed.shape[1] + 1), np.int32)
+        np.cumsum(np.cumsum(changed, axis=0), axis=1, out=sat[1:, 1:])
+        y0, y1, x0, x1 = self.maps[3]
+        dirty = (sat[y1, x1] - sat[y0, x1] - sat[y1, x0] + sat[y0, x0]) > 0
+        self.dirty_fraction = float(dirty.mean())
+        w, h = self.out_size
+        return tile_rects(dirty, self.tile, (h, w))
+
+    def warp(self, frame, rects=None):
+        """Warps a (H, W, 3) BGR frame. Returns a reused (out_h, out_w, 3) buffer.
+
+        rects: source areas (y0, y1, x0, x1) that changed since the previous
+        call; None means the whole frame may have changed.
+        """
+        if self.maps is None:
+            self._build_maps()
+            self._full = True
+        w, h = self.out_size
+        if self.out is None or self.out.shape[2:] != frame.shape[2:]:
+            self.out = np.zeros((h, w) + frame.shape[2:], frame.dtype)
+            self._full = True
+        if rects is None or self._full:
+            cv2.remap(frame, self.maps[0], self.maps[1], cv2.INTER_LINEAR, dst=self.out,
+                      borderMode=cv2.BORDER_CONSTANT)
+            self._full = False
+            self.dirty_fraction = 1.0
+            return self.out
+
+        for y0, y1, x0, x1 in self._dirty_rects(rects):
+            cv2.remap(frame, self.maps[0][y0:y1, x0:x1], self.maps[1][y0:y1, x0:x1], cv2.INTER_LINEAR,
+                      dst=self.out[y0:y1, x0:x1], borderMode=cv2.BORDER_CONSTANT)
+        return self.out
+
+    def warp_indexed(self, index_img, lut):
+        """Warps a single-channel uint8 colour index, then applies the (256, 3) LUT.
+
+        Remapping one channel instead of three cuts the warp cost roughly by
+        three; the LUT gather afterwards is a single cheap pass. Pixels that
+        fall outside the Kinect frame are painted black rather than LUT[0].
+        """
+        if self.maps is None:
+            self._build_maps()
+        w, h = self.out_size
+        if self._index_out is None:
+            self._index_out = np.zeros((h, w), np.uint8)
+            self.out = np.zeros((h, w, 3), np.uint8)
+            self._full = True
+        cv2.remap(index_img, self.maps[0], self.maps[1], cv2.INTER_LINEAR, dst=self._index_out,
+                  borderMode=cv2.BORDER_CONSTANT)
+        # applyColorMap with a user table is OpenCV's single-channel LUT fast path
+        cv2.applyColorMap(self._index_out, lut.reshape(256, 1, 3), dst=self.out)
+        cv2.subtract(self.out, (255, 255, 255, 0), dst=self.out, mask=self.maps[2])
+        self._full = True # self.out no longer holds the last warp() result
+        return self.out
+
+class DepthAwareWarp:
+    """Per-pixel projector warp that follows the sand height.
+
+    For a fixed depth d, Kinect pixel k = (u, v, 1) lands on the projector at
+    s * (x, y, 1) = d * M k + t, where M = P[:, :3] @ K^-1 and t = P[:, 3]
+    (P = full 3x4 projection). Solving for k gives a closed form per projector
+    pixel p:  k = (s * a - b) / d  with  a = M^-1 (x, y, 1),  b = M^-1 t,
+    s = (d + b_z) / a_z.  So the inverse map for the whole projector frame is a
+    few array ops once we know which depth each projector pixel sees.
+
+    That depth is found by fixed-point iteration (guess depth -> map -> sample
+    the depth image there -> repeat). Each new frame only re-solves projector
+    pixels whose sampled depth moved by more than `threshold_mm`, so static
+    sand costs one remap of the depth image per frame.
+    """
+    def __init__(self, calibrator, out_size=(1024, 768), threshold_mm=4.0, iterations=3):
+        self.calibrator = calibrator
+        self.out_size = out_size
+        self.threshold_mm = threshold_mm
+        self.iterations = iterations
+        self.map_x = None
+        self.dirty_fraction = 1.0 # Share of projector pixels re-solved last frame
+        self.out = None
+
+    def _setup(self):
+        c = self.calibrator
+        P = c.full_projection_matrix()
+        K_inv = np.linalg.inv(np.asarray(c.camera_matrix, np.float64))
+        M_inv = np.linalg.inv(P[:, :3] @ K_inv)
+        b = M_inv @ P[:, 3]
+
+        w, h = self.out_size
+        xs, ys = np.meshgrid(np.arange(w, dtype=np.float64), np.arange(h, dtype=np.float64))
+        self._a = np.stack([M_inv[r, 0] * xs + M_inv[r, 1] * ys + M_inv[r, 2] for r in range(3)]).astype(np.float32)
+        self._b = b.astype(np.float32)
+        self.map_x = np.full((h, w), -1, np.float32)
+        self.map_y = np.full((h, w), -1, np.float32)
+        self.map_depth = np.zeros((h, w), np.float32) # Depth each projector pixel was solved for
+        self._sampled = np.zeros((h, w), np.float32)
+        self._key = (P.tobytes(), self.out_size)
+
+    def _solve(self, d, sel=None):
+        """Closed-form inverse for depths d (all pixels, or the flat indices in sel)."""
+        a, b = self._a, self._b
+        if sel is not None:
+            a = a.reshape(3, -1)[:, sel]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = (d + b[2]) / a[2]
+            mx = (s * a[0] - b[0]) / d
+            my = (s * a[1] - b[1]) / d
+        return mx, my
+
+    def _sample_depth(self, depth):
+        cv2.remap(depth, self.map_x, self.map_y, cv2.INTER_NEAREST, dst=self._sampled,
+                  borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+        return self._sampled
+
+    def update(self, depth):
+        """Brings the inverse map up to date with a (H, W) float32 depth frame."""
+        c = self.calibrator
+        P = c.full_projection_matrix()
+        if self.map_x is None or self._key != (P.tobytes(), self.out_size):
+            self._setup()
+            # Cold start: the whole frame at the median sand depth, then iterate
+            valid = depth[depth > 0]
+            self.map_depth.fill(float(np.median(valid)) if valid.size else 1000.0)
+            self.map_x[:], self.map_y[:] = self._solve(self.map_depth)
+            for _ in range(self.iterations):
+                sampled = self._sample_depth(depth)
+                np.copyto(self.map_depth, sampled, where=sampled > 0)
+                self.map_x[:], self.map_y[:] = self._solve(self.map_depth)
+            self.dirty_fraction = 1.0
+            return
+
+        # Incremental: only pixels whose sampled depth moved past the threshold
+        sampled = self._sample_depth(depth)
+        changed = (sampled > 0) & (np.abs(sampled - self.map_depth) > self.threshold_mm)
+        sel = np.flatnonzero(changed)
+        self.dirty_fraction = sel.size / changed.size
+        if sel.size == 0:
+            return
+        mx_flat, my_flat, d_flat = self.map_x.reshape(-1), self.map_y.reshape(-1), self.map_depth.reshape(-1)
+        d = sampled.reshape(-1)[sel]
+        for _ in range(self.iterations - 1):
+            mx, my = self._solve(d, sel)
+            # Refine: depth under the new guess (nearest pixel, invalid keeps the old depth)
+            ui = np.clip(np.rint(mx), 0, depth.shape[1] - 1).astype(np.intp)
+            vi = np.clip(np.rint(my), 0, depth.shape[0] - 1).astype(np.intp)
+            d_new = depth[vi, ui]
+            d = np.where(d_new > 0, d_new, d)
+        mx_flat[sel], my_flat[sel] = self._solve(d, sel)
+        d_flat[sel] = d
+
+    def warp(self, frame, depth):
+        """Warps a Kinect-space BGR frame onto the projector, following `depth`."""
+        self.update(depth)
+        w, h = self.out_size
+        if self.out is None:
+            self.out = np.zeros((h, w) + frame.shape[2:], frame.dtype)
+        cv2.remap(frame, self.map_x, self.map_y, cv2.INTER_LINEAR, dst=self.out,
+                  borderMode=cv2.BORDER_CONSTANT)
+        return self.out
@@ -0,0 +1,175 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+
+from core.frame import DepthFrame
+from ui.frame_bridge import FrameBridge
+
+class StageTimer:
+    """Per-stage wall-clock timings in ms (last value and a smoothed average)."""
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.last = {}
+        self.avg = {}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, 1000 * (time.perf_counter() - t0))
+
+    def record(self, name, ms):
+        self.last[name] = ms
+        prev = self.avg.get(name)
+        self.avg[name] = ms if prev is None else prev + self.smoothing * (ms - prev)
+
+class _Slot:
+    """One set of display-ready images, each backed by its own FrameBridge buffer."""
+    def __init__(self, order):
+        self.operator = FrameBridge(order)
+        self.operator_img = None
+        self.projector = FrameBridge(order)
+        self.projector_img = None
+
+class RenderWorker(QThread):
+    """Runs the per-frame pipeline off the GUI thread and hands out ready-to-paint QImages.
+
+    Depth frames come in through submit() (hooked to KinectWorker.add_listener,
+    so a busy GUI never holds them up); only the newest waiting frame is kept.
+    For each one run() calls pipeline(frame, timer) -> (operator_bgr, projector_bgr),
+    scales the operator view to the widget size and hands both out as
+    QImages sharing memory with FrameBridge buffers. `order` is the channel
+    order the pipeline renders in ('rgb' or 'bgr'), so Qt never swaps.
+
+    The buffers form a triple-buffered mailbox: one slot is being written,
+    one holds the newest published images, one is held by the GUI. The GUI
+    gets images_ready (at most one queued at a time), calls take() and just
+    paints what it got: no conversion, scaling or copying on its side.
+    """
+    images_ready = Signal()
+
+    def __init__(self, pipeline, operator_size=(640, 480), order="bgr"):
+        super().__init__()
+        self.pipeline = pipeline
+        self.operator_size = operator_size
+        self.timer = StageTimer()
+        self.running = True
+
+        self._cond = threading.Condition()
+        self._inbox = None         # Newest submitted frame (worker-owned copy)
+        self._work = None          # Frame being processed
+        self._has_frame = False
+        self._commands = []        # post()ed calls, run on this thread between frames
+
+        self._slots = [_Slot(order) for _ in range(3)]
+        self._latest = -1          # Slot with the newest published images
+        self._held = -1            # Slot the GUI took last
+        self._in_flight = False
+
+        self.submitted = 0
+        self.rendered = 0
+        self.skipped_frames = 0    # Input frames replaced before they were processed
+        self.coalesced_images = 0  # Published images replaced before the GUI took them
+
+    # --- Producer side (Kinect smoothing thread) ------------------------------
+    def submit(self, frame):
+        """Copies a DepthFrame into the inbox; replaces any frame still waiting."""
+        with self._cond:
+            if self._inbox is None or self._inbox.shape != frame.shape:
+                self._inbox = DepthFrame.empty(*frame.shape)
+            np.copyto(self._inbox.depth, frame.depth)
+            np.copyto(self._inbox.valid, frame.valid)
+            self._inbox.timestamp, self._inbox.seq = frame.timestamp, frame.seq
+            if self._has_frame:
+                self.skipped_frames += 1
+            self._has_frame = True
+            self.submitted += 1
+            self._cond.notify()
+
+    def post(self, fn, *args):
+        """Runs fn(*args) on the render thread before the next frame (e.g. ROI changes)."""
+        with self._cond:
+            self._commands.append((fn, args))
+
+    def set_operator_size(self, width, height):
+        """Size (px) the operator view is scaled to; keeps the frame's aspect ratio."""
+        self.operator_size = (max(1, width), max(1, height))
+
+    # --- Consumer side (GUI thread) -------------------------------------------
+    def take(self):
+        """Newest (operator QImage, projector QImage or None); (None, None) before the first frame.
+
+        The images stay valid until the next take().
+        """
+        with self._cond:
+            self._in_flight = False
+            if self._latest < 0:
+                return None, None
+            self._held = self._latest
+            slot = self._slots[self._held]
+            return slot.operator_img, slot.projector_img
+
+    def stats(self):
+        with self._cond:
+            queue_depth = int(self._has_frame) + int(self._in_flight)
+        return {
+            "queue_depth": queue_depth,
+            "submitted": self.submitted,
+            "rendered": self.rendered,
+            "skipped": self.skipped_frames,
+            "coalesced": self.coalesced_images,
+            "stage_ms": dict(self.timer.avg),
+        }
+
+    # --- Render thread --------------------------------------------------------
+    def run(self):
+        while self.running:
+            with self._cond:
+                if not self._has_frame and not self._commands:
+                    self._cond.wait(0.1)
+                commands, self._commands = self._commands, []
+                frame = None
+                if self._has_frame:
+                    self._inbox, self._work = self._work, self._inbox
+                    self._has_frame = False
+                    frame = self._work
+            for fn, args in commands:
+                fn(*args)
+            if frame is not None:
+                self._render(frame)
+
+    def _render(self, frame):
+        t0 = time.perf_counter()
+        operator, projector = self.pipeline(frame, self.timer)
+        if operator is None: # e.g. the frame was captured as the base plane
+            return
+
+        # 1. Fill a slot that is neither the newest published one nor the GUI's
+        with self._cond:
+            idx = next(i for i in range(len(self._slots)) if i not in (self._latest, self._held))
+        slot = self._slots[idx]
+        with self.timer.stage("present"):
+            slot.operator_img = slot.operator.upload_scaled(operator, self.operator_size)
+            slot.projector_img = slot.projector.upload(projector) if projector is not None else None
+
+        # 2. Publish; signal the GUI unless it already has a wake-up pending
+        with self._cond:
+            self._latest = idx
+            if self._in_flight:
+                self.coalesced_images += 1
+                notify = False
+            else:
+                self._in_flight = notify = True
+        self.rendered += 1
+        self.timer.record("total", 1000 * (time.perf_counter() - t0))
+        if notify:
+            self.images_ready.emit()
+
+    def stop(self):
+        self.running = False
+        self.wait()
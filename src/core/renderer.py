@@ -0,0 +1,205 @@
+import numpy as np
+import cv2
+
+try:
+    import numba
+except ImportError: # Optional: the vectorised path below needs only OpenCV/NumPy
+    numba = None
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _render_kernel(smooth, lut, alpha, beta, inv_interval, out):
+        """Single pass: elevation -> LUT index -> BGR, with band-edge contour lines."""
+        h, w = smooth.shape
+        for y in numba.prange(h):
+            for x in range(w):
+                e = smooth[y, x]
+                band = np.floor(e * inv_interval)
+                edge = False
+                if x + 1 < w and np.floor(smooth[y, x + 1] * inv_interval) != band:
+                    edge = True
+                elif y + 1 < h and np.floor(smooth[y + 1, x] * inv_interval) != band:
+                    edge = True
+                if edge:
+                    out[y, x, 0] = 0
+                    out[y, x, 1] = 0
+                    out[y, x, 2] = 0
+                    continue
+                idx = int(e * alpha + beta + 0.5)
+                idx = min(max(idx, 0), lut.shape[0] - 1)
+                out[y, x, 0] = lut[idx, 0]
+                out[y, x, 1] = lut[idx, 1]
+                out[y, x, 2] = lut[idx, 2]
+
+class TerrainRenderer:
+    """Turns an elevation map (float32 mm) into a coloured BGR frame with contour lines.
+
+    Replaces the blur -> clip/scale -> merge+LUT -> quantize -> Canny -> mask
+    chain with a couple of passes over preallocated buffers:
+      1. Gaussian blur into a reused buffer
+      2. either the vectorised path: affine+saturate to uint8 (addWeighted), a
+         single-channel LUT (applyColorMap with a user table), band index
+         (addWeighted) and a morphological gradient that marks band edges,
+         which are blacked out with one masked subtract; or, with use_numba=True,
+         one parallel Numba kernel with index, LUT and contour test fused
+         (worth it on many-core machines, OpenCV's path wins on few cores).
+    Given the changed areas from a ChangeDetector, the vectorised path
+    redraws only those (plus the few pixels of blur/contour halo they need).
+    With an IsolineEngine (modules.isolines), contours are anti-aliased,
+    labelled polylines traced from the blurred elevation instead of band
+    edges; the tiles around changed areas are redrawn, and only those whose
+    level set moved are re-traced (IsolineEngine.update).
+
+    Sea level and elevation range are part of the affine elevation -> index
+    step: the colour table spans [min_h, max_h] above the sea level, so
+    moving either one changes two scalars, never the table (and contour
+    lines stay where they are: they measure height above the base plane).
+    """
+    def __init__(self, min_h=-250.0, max_h=250.0, contour_interval=20, blur_ksize=5, use_numba=False,
+                 channel_order="bgr", isolines=None):
+        self.min_h, self.max_h = float(min_h), float(max_h)
+        self.sea_level = 0.0
+        self.contour_interval = contour_interval
+        self.blur_ksize = (blur_ksize, blur_ksize)
+        self.use_numba = use_numba and numba is not None
+        self.contours_enabled = True
+        self._shape = None
+        self._edge_kernel = np.ones((2, 2), np.uint8)
+        # 'rgb' renders straight into Qt's RGB888 order by flipping the (tiny) LUT, not the frame
+        self.channel_order = channel_order
+        self._lut_src = None
+        self._lut_rgb = None
+        self._drawn_lut = None
+        self._drawn_key = None
+        self._trace_key = None
+        self.drawn_rects = None # Areas the last render() changed; None = the whole frame
+        self.isolines = isolines
+
+    def _alloc(self, shape):
+        h, w = shape
+        self._shape = shape
+        self.smooth = np.empty((h, w), np.float32)
+        self.index = np.empty((h, w), np.uint8)
+        self.band = np.empty((h, w), np.uint8)
+        self.edges = np.empty((h, w), np.uint8)
+        self.bgr = np.empty((h, w, 3), np.uint8)
+        self._scratch = np.empty((h, w), np.float32)
+        self._edge_scratch = np.empty((h, w), np.uint8)
+        self._drawn_key = None
+
+    def set_contour_interval(self, interval):
+        self.contour_interval = max(1, interval)
+
+    def set_sea_level(self, sea_level):
+        """Elevation (mm) shown with the colour at the map's 0 (the coastline)."""
+        self.sea_level = float(sea_level)
+
+    def set_range(self, min_h, max_h):
+        """Elevations (mm, relative to sea level) the colour table is stretched over."""
+        if max_h > min_h:
+            self.min_h, self.max_h = float(min_h), float(max_h)
+
+    def _rgb_lut(self, lut):
+        """BGR table -> RGB table, re-flipped only when a different table is passed."""
+        if lut is not self._lut_src:
+            self._lut_src = lut
+            self._lut_rgb = np.ascontiguousarray(lut.reshape(-1, 3)[:, ::-1])
+        return self._lut_rgb
+
+    def render(self, elevation, lut, rects=None):
+        """elevation: float32 (H, W) in mm. lut: (N, 3) or (N, 1, 3) uint8 BGR table.
+
+        Tables are told apart by identity (ColorMapManager hands out cached,
+        read-only ones): pass a new array rather than editing one in place.
+
+        rects: optional list of (y0, y1, x0, x1) areas that changed (see
+        core.change_detector); only those are redrawn, the rest of the
+        buffer keeps the previous frame. Ignored (full redraw) on the first
+        frame or after any setting changed.
+        Returns the renderer's own (H, W, 3) buffer in `channel_order`, overwritten on the next call.
+        """
+        resized = full = elevation.shape != self._shape
+        if resized:
+            self._alloc(elevation.shape)
+        if lut is not self._drawn_lut:
+            self._drawn_lut = lut
+            full = True
+        lut = self._rgb_lut(lut) if self.channel_order == "rgb" else lut.reshape(-1, 3)
+        n = len(lut)
+
+        # Anything else that changes how every pixel looks invalidates the previous frame
+        key = (self.min_h, self.max_h, self.sea_level, self.contour_interval, self.contours_enabled,
+               self.blur_ksize, self.isolines)
+        if key != self._drawn_key:
+            self._drawn_key = key
+            full = True
+        # Colour-only changes (table, sea level, range) keep the traced isolines
+        trace_key = (self.contour_interval, self.blur_ksize, self.isolines)
+        retrace = resized or trace_key != self._trace_key or rects is None
+        self._trace_key = trace_key
+
+        # Index = (h - sea - min) / (max - min) * (n - 1), clamped to the table: sea level and
+        # range only move alpha/beta of the one saturating affine pass that makes the index
+        alpha = (n - 1) / (self.max_h - self.min_h)
+        beta = -(self.sea_level + self.min_h) * alpha
+
+        vector = self.contours_enabled and self.isolines is not None
+        if self.use_numba and self.contours_enabled and not vector:
+            # 1. Smooth the sand; 2-3. fused kernel (always full frame)
+            self.drawn_rects = None
+            cv2.GaussianBlur(elevation, self.blur_ksize, 0, dst=self.smooth)
+            _render_kernel(self.smooth, lut, alpha, beta, 1.0 / self.contour_interval, self.bgr)
+            return self.bgr
+
+        h, w = elevation.shape
+        if vector and rects is not None: # A change moves isolines in the neighbouring tiles as well
+            rects = self.isolines.redraw_rects(rects, (h, w))
+        if full or rects is None:
+            self._render_region(elevation, lut, alpha, beta, 0, h, 0, w)
+            self.drawn_rects = None
+        else:
+            self.drawn_rects = [self._render_region(elevation, lut, alpha, beta, *rect) for rect in rects]
+
+        # 4. Isolines over the freshly coloured areas
+        if vector:
+            self.isolines.update(self.smooth, self.contour_interval, None if retrace else rects)
+            self.isolines.draw(self.bgr, self.drawn_rects)
+        return self.bgr
+
+    def _render_region(self, elevation, lut, alpha, beta, y0, y1, x0, x1):
+        """Redraws what elevation[y0:y1, x0:x1] affects, exactly as a full-frame render would."""
+        h, w = elevation.shape
+        # A pixel's colour depends on elevations up to ksize // 2 (blur) + 1 (contours) away:
+        # grow the output area by that, and the work areas behind it likewise
+        r = self.blur_ksize[0] // 2
+        y0, y1, x0, x1 = max(0, y0 - r - 1), min(h, y1 + r + 1), max(0, x0 - r - 1), min(w, x1 + r + 1)
+        b0, b1, a0, a1 = max(0, y0 - 1), min(h, y1 + 1), max(0, x0 - 1), min(w, x1 + 1)
+        e0, e1, d0, d1 = max(0, b0 - r), min(h, b1 + r), max(0, a0 - r), min(w, a1 + r)
+
+        # 1. Smooth the sand (into scratch: the outer r pixels see a fake border)
+        cv2.GaussianBlur(elevation[e0:e1, d0:d1], self.blur_ksize, 0, dst=self._scratch[e0:e1, d0:d1])
+        self.smooth[b0:b1, a0:a1] = self._scratch[b0:b1, a0:a1]
+        smooth = self.smooth[y0:y1, x0:x1]
+        bgr = self.bgr[y0:y1, x0:x1]
+
+        # 2. Colour: one affine+saturate pass, one lookup straight from the single channel
+        if len(lut) == 256:
+            index = self.index[y0:y1, x0:x1]
+            cv2.addWeighted(smooth, alpha, smooth, 0, beta, dst=index, dtype=cv2.CV_8U)
+            # applyColorMap with a user table is OpenCV's single-channel LUT fast path
+            cv2.applyColorMap(index, lut.reshape(256, 1, 3), dst=bgr)
+        else:
+            idx = np.clip(smooth * alpha + beta, 0, len(lut) - 1).astype(np.intp)
+            np.take(lut, idx, axis=0, out=bgr)
+
+        # 3. Contours: band number as uint8 (floor via -0.5 before rounding, offset keeps
+        #    negative elevations in range), then any 2x2 neighbourhood spanning two bands is a line
+        if self.contours_enabled and self.isolines is None:
+            inv = 1.0 / self.contour_interval
+            smooth_b, band = self.smooth[b0:b1, a0:a1], self.band[b0:b1, a0:a1]
+            cv2.addWeighted(smooth_b, inv, smooth_b, 0, 128 - 0.5, dst=band, dtype=cv2.CV_8U)
+            # Edges of the grown area's rim are incomplete: keep only the inner part
+            cv2.morphologyEx(band, cv2.MORPH_GRADIENT, self._edge_kernel, dst=self._edge_scratch[b0:b1, a0:a1])
+            self.edges[y0:y1, x0:x1] = self._edge_scratch[y0:y1, x0:x1]
+            cv2.subtract(bgr, (255, 255, 255, 0), dst=bgr, mask=self.edges[y0:y1, x0:x1])
+        return y0, y1, x0, x1
@@ -0,0 +1,234 @@
+import threading
+import time
+
+import numpy as np
+
+from modules.rain_sim import calculate_slopes
+
+class SimulationScheduler:
+    """Runs WaterSim / RainSimulation at a fixed timestep on their own thread.
+
+    Classic fixed-step loop: real time is accumulated and consumed in whole
+    ticks of 1 / tick_hz, so the physics advances at the same rate however
+    fast the Kinect delivers or the projector draws. If the thread falls
+    behind by more than max_catchup ticks the excess time is dropped
+    (slow motion) instead of spiralling.
+
+    Terrain arrives asynchronously through submit_terrain(): the newest
+    elevation wins and is picked up at the start of the next tick. After
+    every tick the previous and current water depth / drop positions are
+    published, and sample() blends between them by how far real time has
+    moved into the next tick, so rendering at any rate looks smooth. Ticks
+    with neither simulation enabled do nothing (no physics, no publish).
+    """
+    def __init__(self, water=None, rain=None, tick_hz=60.0, max_catchup=4, rain_rate=30.0):
+        self.water = water
+        self.rain = rain
+        self.tick_dt = 1.0 / tick_hz
+        self.max_catchup = max_catchup
+        # RainSimulation velocities are tuned per sensor frame; this many frames = 1 s
+        self.rain_rate = rain_rate
+        self.water_enabled = water is not None
+        self.rain_enabled = rain is not None
+        # Drops that moved further than this in one tick were respawned: don't blend them
+        self.max_jump = 8.0
+
+        self._lock = threading.Lock()
+        self._pending = None        # Latest submitted elevation (scheduler-owned copy)
+        self._spare = None          # Recycled elevation buffer for the next submit
+        self._has_terrain = False
+        self._commands = []         # post()ed calls, run on the physics thread before a tick
+        self._dz_dx = self._dz_dy = None
+
+        # Published states: [previous tick, current tick], swapped under the lock, plus a
+        # spare of each that only the physics thread touches (filled outside the lock)
+        self._water_pub = [None, None]
+        self._rain_pub = [None, None]
+        self._water_spare = None
+        self._rain_spare = None
+        self._reading = ()          # Published buffers sample() is blending from (outside the lock)
+        self._tick_time = 0.0       # perf_counter() when the current state was published
+        self._water_out = None      # sample() buffers, owned by the consumer thread
+        self._rain_out = None
+
+        self.ticks = 0
+        self.terrain_updates = 0
+        self.dropped_ticks = 0
+        self.last_tick_ms = 0.0
+        self.running = False
+        self._thread = None
+
+    # --- Producer side (GUI / processing thread) -------------------------------
+    def submit_terrain(self, elevation):
+        """Hands a new elevation map (float32 mm) to the physics. Never blocks on a tick."""
+        with self._lock:
+            buf = self._spare if self._spare is not None and self._spare.shape == elevation.shape else None
+            self._spare = None
+        if buf is None:
+            buf = np.empty(elevation.shape, np.float32)
+        np.copyto(buf, elevation)
+        with self._lock:
+            if self._pending is not None:
+                self._spare = self._pending # Superseded before the physics saw it
+            self._pending = buf
+
+    def post(self, fn, *args):
+        """Runs fn(*args) on the physics thread before the next tick (e.g. water.add_water)."""
+        with self._lock:
+            self._commands.append((fn, args))
+
+    # --- Thread control -------------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        accumulator = 0.0
+        last = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            accumulator += now - last
+            last = now
+
+            # 1. Bound the catch-up work; anything beyond it is dropped
+            limit = self.max_catchup * self.tick_dt
+            if accumulator > limit:
+                self.dropped_ticks += int((accumulator - limit) / self.tick_dt)
+                accumulator = limit
+
+            # 2. Consume real time in whole ticks
+            while accumulator >= self.tick_dt and self.running:
+                self.tick()
+                accumulator -= self.tick_dt
+
+            # 3. Sleep until the next tick is due
+            time.sleep(max(0.0, self.tick_dt - accumulator))
+
+    # --- Physics --------------------------------------------------------------
+    def _take_terrain(self):
+        with self._lock:
+            terrain, self._pending = self._pending, None
+        if terrain is None:
+            return
+        if self.water is not None:
+            self.water.set_terrain(terrain)
+        if self.rain is not None:
+            self._dz_dx, self._dz_dy = calculate_slopes(terrain)
+        self._has_terrain = True
+        self.terrain_updates += 1
+        with self._lock:
+            if self._spare is None:
+                self._spare = terrain
+
+    def tick(self):
+        """Advances every enabled simulation by exactly one tick_dt and publishes the result."""
+        t0 = time.perf_counter()
+        with self._lock:
+            commands, self._commands = self._commands, []
+        for fn, args in commands:
+            fn(*args)
+        self._take_terrain()
+        if not self._has_terrain or not (self.water_enabled or self.rain_enabled):
+            return
+
+        if self.water is not None and self.water_enabled:
+            self.water.step(self.tick_dt)
+        if self.rain is not None and self.rain_enabled:
+            self.rain.update(self._dz_dx, self._dz_dy, dt=self.tick_dt * self.rain_rate)
+        self._publish()
+        self.ticks += 1
+        self.last_tick_ms = 1000 * (time.perf_counter() - t0)
+
+    def _publish(self):
+        """Fills the spare buffers with the new state, then rotates them in under the lock.
+
+        A buffer is only ever written while nothing published points at it;
+        one retired while sample() is still blending from it is dropped
+        rather than recycled.
+        """
+        water = self._water_spare
+        if self.water is not None:
+            if water is None or water.shape != self.water.water_h.shape:
+                water = np.empty_like(self.water.water_h)
+            np.copyto(water, self.water.water_h)
+        drops = self._rain_spare
+        if self.rain is not None:
+            pos = self.rain.positions
+            if drops is None or drops.shape != pos.shape:
+                drops = np.empty_like(pos)
+            np.copyto(drops, pos)
+
+        spares = []
+        with self._lock:
+            for pub, new in ((self._water_pub, water), (self._rain_pub, drops)):
+                # First state: previous = current, so sample() has something to blend
+                retired = pub[0]
+                pub[0] = pub[1] if pub[1] is not None else new.copy() if new is not None else None
+                pub[1] = new
+                spares.append(None if any(retired is held for held in self._reading) else retired)
+            self._tick_time = time.perf_counter()
+        # Retired from the published pair: free to be written next tick
+        self._water_spare, self._rain_spare = spares
+
+    # --- Consumer side (render thread) ----------------------------------------
+    def interpolation_alpha(self, now=None):
+        """0 at the moment the current state was published, 1 one tick later."""
+        now = time.perf_counter() if now is None else now
+        return min(1.0, max(0.0, (now - self._tick_time) / self.tick_dt))
+
+    def sample(self, now=None):
+        """Interpolated (water depth (H, W), drop positions (2, N)) for rendering.
+
+        Either is None when that simulation doesn't exist or hasn't ticked yet.
+        The returned arrays are reused by the next sample() call.
+        Only the references are taken under the lock; the blend runs outside
+        it, on buffers _publish() won't recycle until the blend is done.
+        """
+        with self._lock:
+            alpha = np.float32(self.interpolation_alpha(now))
+            water_pair = tuple(self._water_pub) if self._water_pub[1] is not None else None
+            rain_pair = tuple(self._rain_pub) if self._rain_pub[1] is not None else None
+            self._reading = (water_pair or ()) + (rain_pair or ())
+
+        water = drops = None
+        if water_pair is not None:
+            prev, cur = water_pair
+            if self._water_out is None or self._water_out.shape != cur.shape:
+                self._water_out = np.empty_like(cur)
+            water = self._water_out
+            # prev + alpha * (cur - prev)
+            np.subtract(cur, prev, out=water)
+            water *= alpha
+            water += prev
+        if rain_pair is not None:
+            prev, cur = rain_pair
+            if self._rain_out is None or self._rain_out.shape != cur.shape:
+                self._rain_out = np.empty_like(cur)
+            drops = self._rain_out
+            np.subtract(cur, prev, out=drops)
+            # Respawned drops jump across the box; show them where they are now
+            jumped = np.abs(drops).max(axis=0) > self.max_jump
+            drops *= alpha
+            drops += prev
+            drops[:, jumped] = cur[:, jumped]
+
+        with self._lock:
+            self._reading = ()
+        return water, drops
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "terrain_updates": self.terrain_updates,
+            "dropped_ticks": self.dropped_ticks,
+            "last_tick_ms": self.last_tick_ms,
+        }
@@ -0,0 +1,253 @@
+"""Chunked depth/RGB session recordings.
+
+Layout of a .gbs file (all little-endian):
+
+    header   64 bytes   magic, version, width, height, chunk_frames, codec, has_rgb, start time
+    chunks   ...        one blob per chunk: depth payload followed by rgb payload
+    frames   n * 16     per-frame (chunk index, seconds since start)
+    chunks   n * 32     per-chunk (offset, depth bytes, rgb bytes, first frame, frame count)
+    trailer  32 bytes   offsets/counts of the two tables above, magic
+
+With the 'delta' codec each chunk stores its first frame as-is and every other
+frame as the wrapping difference to its predecessor, then zlib-compresses the
+lot. The 'raw' codec stores frames uncompressed so playback can hand out
+zero-copy views straight into the memory map.
+"""
+import os
+import struct
+import threading
+import queue
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SESSION_EXT = ".gbs"
+MAGIC = b"GBXSESS1"
+VERSION = 1
+CODECS = {"raw": 0, "delta": 1}
+
+_HEADER = struct.Struct("<8sIIIIIId24x")
+_TRAILER = struct.Struct("<QQII8s")
+FRAME_DTYPE = np.dtype([("chunk", "<u4"), ("pad", "<u4"), ("timestamp", "<f8")])
+CHUNK_DTYPE = np.dtype([("offset", "<u8"), ("depth_len", "<u8"), ("rgb_len", "<u8"),
+                        ("first_frame", "<u4"), ("n_frames", "<u4")])
+
+def _encode(frames, codec, level):
+    """Packs a (n, ...) block of frames into bytes."""
+    if codec == CODECS["raw"]:
+        return frames.tobytes()
+    # Wrapping subtraction in the native dtype is exactly reversible with cumsum
+    delta = np.empty_like(frames)
+    delta[0] = frames[0]
+    np.subtract(frames[1:], frames[:-1], out=delta[1:])
+    return zlib.compress(delta.data, level)
+
+def _decode(blob, codec, shape, dtype):
+    """Inverse of _encode. `blob` may be a memoryview into the file map."""
+    if codec == CODECS["raw"]:
+        return np.frombuffer(blob, dtype).reshape(shape)
+    delta = np.frombuffer(zlib.decompress(blob), dtype).reshape(shape)
+    frames = np.cumsum(delta, axis=0, dtype=dtype)
+    frames.flags.writeable = False # Shared through the chunk cache, like the raw views of the map
+    return frames
+
+class SessionWriter:
+    """Records frames to a session file without blocking the capture loop.
+
+    Frames are copied into a preallocated chunk buffer; full chunks are handed
+    to a background thread that compresses and writes them.
+    """
+    def __init__(self, path, width=640, height=480, chunk_frames=30, codec="delta",
+                 record_rgb=True, level=1):
+        self.path = path
+        self.size = (height, width)
+        self.chunk_frames = chunk_frames
+        self.codec = CODECS[codec]
+        self.record_rgb = record_rgb
+        self.level = level
+        self.start_time = time.time()
+        self._t0 = time.perf_counter()
+
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, VERSION, width, height, chunk_frames,
+                                     self.codec, int(record_rgb), self.start_time))
+
+        # Two chunk buffers: one filling, one being compressed
+        self._buffers = [self._alloc_chunk() for _ in range(2)]
+        self._free = queue.Queue()
+        self._free.put(self._buffers[1])
+        self._depth, self._rgb = self._buffers[0]
+        self._fill = 0
+
+        self.frames = []
+        self.chunks = []
+        self._written = 0
+        self._jobs = queue.Queue()
+        self._error = None # First exception of the compressor thread, re-raised by close()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _alloc_chunk(self):
+        h, w = self.size
+        depth = np.empty((self.chunk_frames, h, w), np.uint16)
+        rgb = np.empty((self.chunk_frames, h, w, 3), np.uint8) if self.record_rgb else None
+        return depth, rgb
+
+    def write(self, depth, rgb=None, timestamp=None):
+        if timestamp is None:
+            timestamp = time.perf_counter() - self._t0
+        np.copyto(self._depth[self._fill], depth, casting='unsafe')
+        if self.record_rgb:
+            if rgb is None:
+                self._rgb[self._fill] = 0
+            else:
+                np.copyto(self._rgb[self._fill], rgb)
+        self.frames.append((0, 0, timestamp))
+        self._fill += 1
+        if self._fill == self.chunk_frames:
+            self._flush_chunk()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _flush_chunk(self):
+        if self._fill == 0:
+            return
+        self._jobs.put((self._depth, self._rgb, self._fill))
+        # Blocks only if the compressor is a full chunk behind
+        self._depth, self._rgb = self._free.get()
+        self._fill = 0
+
+    def _drain(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            depth, rgb, n = job
+            try:
+                if self._error is None:
+                    depth_blob = _encode(depth[:n], self.codec, self.level)
+                    rgb_blob = _encode(rgb[:n], self.codec, self.level) if rgb is not None else b""
+                    offset = self.file.tell()
+                    self.file.write(depth_blob)
+                    self.file.write(rgb_blob)
+                    self.chunks.append((offset, len(depth_blob), len(rgb_blob), self._written, n))
+                    self._written += n
+            except Exception as e:
+                self._error = e
+            # Always hand the buffer back, or write() and close() would wait for it forever
+            self._free.put((depth, rgb))
+
+    def close(self):
+        if self.file is None:
+            return
+        self._flush_chunk()
+        self._jobs.put(None)
+        self._thread.join()
+        if self._error is not None: # Chunks are missing: don't finalize a recording that lies
+            self.file.close()
+            self.file = None
+            raise self._error
+
+        # Frame -> chunk mapping is fixed by chunk_frames
+        frames = np.array(self.frames, FRAME_DTYPE)
+        frames["chunk"] = np.arange(len(frames)) // self.chunk_frames
+        chunks = np.array(self.chunks, CHUNK_DTYPE)
+
+        frames_offset = self.file.tell()
+        self.file.write(frames.tobytes())
+        chunks_offset = self.file.tell()
+        self.file.write(chunks.tobytes())
+        self.file.write(_TRAILER.pack(frames_offset, chunks_offset, len(frames), len(chunks), MAGIC))
+        self.file.close()
+        self.file = None
+        print(f"Session recorded: {len(frames)} frames saved to {self.path}")
+
+class SessionReader:
+    """Random access into a session file through a memory map.
+
+    Only the chunk that holds the requested frame is touched, and a small LRU
+    of decoded chunks keeps sequential playback and short scrubs cheap.
+    `frame_async` decodes on a worker thread so a GUI can seek without stalling.
+    """
+    def __init__(self, path, cache_chunks=4):
+        self.path = path
+        self.map = np.memmap(path, np.uint8, mode="r")
+        magic, version, width, height, chunk_frames, codec, has_rgb, start = \
+            _HEADER.unpack(self.map[:_HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a GeoBox session file")
+        tail = _TRAILER.unpack(self.map[-_TRAILER.size:].tobytes())
+        frames_offset, chunks_offset, n_frames, n_chunks, tail_magic = tail
+        if tail_magic != MAGIC:
+            raise ValueError(f"{path} is truncated (recording not closed?)")
+
+        self.size = (height, width)
+        self.chunk_frames = chunk_frames
+        self.codec = codec
+        self.has_rgb = bool(has_rgb)
+        self.start_time = start
+        self.frames = np.ndarray((n_frames,), FRAME_DTYPE, self.map, frames_offset)
+        self.chunks = np.ndarray((n_chunks,), CHUNK_DTYPE, self.map, chunks_offset)
+        self.timestamps = self.frames["timestamp"]
+
+        self.cache_chunks = cache_chunks
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def duration(self):
+        return float(self.timestamps[-1]) if len(self) else 0.0
+
+    def index_at(self, seconds):
+        """Frame index shown at `seconds` into the recording."""
+        i = int(np.searchsorted(self.timestamps, seconds, side="right")) - 1
+        return min(max(i, 0), len(self) - 1)
+
+    def _load_chunk(self, c):
+        with self._lock:
+            if c in self._cache:
+                self._cache.move_to_end(c)
+                return self._cache[c]
+        offset, depth_len, rgb_len, _, n = (int(v) for v in self.chunks[c])
+        h, w = self.size
+        depth = _decode(self.map[offset:offset + depth_len].data, self.codec, (n, h, w), np.uint16)
+        rgb = None
+        if self.has_rgb:
+            start = offset + depth_len
+            rgb = _decode(self.map[start:start + rgb_len].data, self.codec, (n, h, w, 3), np.uint8)
+        with self._lock:
+            self._cache[c] = (depth, rgb)
+            while len(self._cache) > self.cache_chunks:
+                self._cache.popitem(last=False)
+        return depth, rgb
+
+    def frame(self, i):
+        """Returns (depth, rgb, timestamp) for frame i. Arrays are read-only views."""
+        c = int(self.frames["chunk"][i])
+        depth, rgb = self._load_chunk(c)
+        j = i - int(self.chunks["first_frame"][c])
+        return depth[j], (rgb[j] if rgb is not None else None), float(self.timestamps[i])
+
+    def frame_async(self, i):
+        """Decodes frame i on a background thread, returns a Future."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1)
+        return self._pool.submit(self.frame, i)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._cache.clear()
+        # Dropping the views lets the OS unmap the file
+        self.frames = self.chunks = self.timestamps = self.map = None
+
+def is_session_file(path):
+    return os.path.splitext(path)[1] == SESSION_EXT
@@ -0,0 +1,158 @@
+import numpy as np
+
+class TemporalFilter:
+    """Base class for per-pixel temporal depth filters.
+
+    Filters work on preallocated float32 buffers only: after construction,
+    apply() performs no full-frame allocations. Depth 0 means "no reading"
+    (shadow, out of range) and never pulls the output towards zero; such
+    pixels keep their last good value. The result stays in millimetres.
+    """
+    def __init__(self, height=480, width=640):
+        self.shape = (height, width)
+        self.out = np.zeros(self.shape, np.float32)       # Filtered depth (mm, 0 = never seen)
+        self._cur = np.empty(self.shape, np.float32)      # Current frame as float
+        self._tmp = np.empty(self.shape, np.float32)
+        self._valid = np.empty(self.shape, bool)          # Current frame has a reading
+        self._mask = np.empty(self.shape, bool)
+        self.primed = False
+
+    def reset(self):
+        self.out.fill(0)
+        self.primed = False
+
+    @property
+    def valid_mask(self):
+        """Pixels that have had at least one good reading."""
+        return self.out > 0
+
+    def _load(self, depth):
+        np.copyto(self._cur, depth, casting='unsafe')
+        np.not_equal(depth, 0, out=self._valid)
+
+    def _seed_unseen(self):
+        """Pixels with no history yet take the current reading as-is."""
+        np.equal(self.out, 0, out=self._mask)
+        np.logical_and(self._mask, self._valid, out=self._mask)
+        np.copyto(self.out, self._cur, where=self._mask)
+
+    def apply(self, depth):
+        """Feeds one raw depth frame (any numeric dtype), returns the filtered float32 frame.
+
+        The returned array is the filter's own buffer and is overwritten on the next call.
+        """
+        raise NotImplementedError
+
+class EMAFilter(TemporalFilter):
+    """Exponential moving average: out += alpha * (current - out) on valid pixels."""
+    def __init__(self, alpha=0.3, height=480, width=640):
+        super().__init__(height, width)
+        self.alpha = np.float32(alpha)
+
+    def apply(self, depth):
+        self._load(depth)
+        self._seed_unseen()
+        np.subtract(self._cur, self.out, out=self._tmp)
+        self._tmp *= self.alpha
+        np.add(self.out, self._tmp, out=self.out, where=self._valid)
+        self.primed = True
+        return self.out
+
+class MedianFilter(TemporalFilter):
+    """Per-pixel median of the last n frames.
+
+    The median comes from an odd-even transposition sort run plane-by-plane with
+    np.minimum/np.maximum, which is allocation-free and far faster than
+    np.median along axis 0 for the small n used here.
+    """
+    def __init__(self, n=5, height=480, width=640):
+        super().__init__(height, width)
+        if n < 1 or n % 2 == 0:
+            raise ValueError("Median window must be odd")
+        self.n = n
+        self.history = np.zeros((n,) + self.shape, np.float32)
+        self._sorted = np.empty_like(self.history)
+        self._idx = 0
+
+    def reset(self):
+        super().reset()
+        self._idx = 0
+
+    def apply(self, depth):
+        self._load(depth)
+        self._seed_unseen()
+        slot = self.history[self._idx]
+        np.copyto(slot, self._cur)
+        # Invalid readings repeat the last output instead of voting for 0
+        np.logical_not(self._valid, out=self._mask)
+        np.copyto(slot, self.out, where=self._mask)
+        if not self.primed:
+            self.history[:] = slot
+            self.primed = True
+        self._idx = (self._idx + 1) % self.n
+
+        s = self._sorted
+        np.copyto(s, self.history)
+        for p in range(self.n):
+            for i in range(p % 2, self.n - 1, 2):
+                # Compare-exchange planes i and i+1
+                np.minimum(s[i], s[i + 1], out=self._tmp)
+                np.maximum(s[i], s[i + 1], out=s[i + 1])
+                np.copyto(s[i], self._tmp)
+        np.copyto(self.out, s[self.n // 2])
+        return self.out
+
+class StabilityFilter(TemporalFilter):
+    """Magic-Sand-style stability filter.
+
+    Keeps a running mean and variance per pixel and only moves the output
+    when the pixel has settled (variance below max_variance) and the settled
+    value differs from the output by more than `hysteresis` mm. Hands moving
+    over the sand are therefore ignored, and flicker on static sand is held flat.
+    """
+    def __init__(self, alpha=0.2, max_variance=25.0, hysteresis=1.5, height=480, width=640):
+        super().__init__(height, width)
+        self.alpha = np.float32(alpha)
+        self.max_variance = np.float32(max_variance)
+        self.hysteresis = np.float32(hysteresis)
+        self.mean = np.zeros(self.shape, np.float32)
+        self.var = np.zeros(self.shape, np.float32)
+        self._delta = np.empty(self.shape, np.float32)
+
+    def reset(self):
+        super().reset()
+        self.mean.fill(0)
+        self.var.fill(0)
+
+    def apply(self, depth):
+        self._load(depth)
+        # Unseen pixels start their statistics at the current value
+        np.equal(self.mean, 0, out=self._mask)
+        np.logical_and(self._mask, self._valid, out=self._mask)
+        np.copyto(self.mean, self._cur, where=self._mask)
+        self._seed_unseen()
+
+        # Welford-style exponential mean/variance, valid pixels only
+        d = self._delta
+        np.subtract(self._cur, self.mean, out=d)
+        np.multiply(d, self.alpha, out=self._tmp)
+        np.add(self.mean, self._tmp, out=self.mean, where=self._valid)
+        np.multiply(self._tmp, d, out=self._tmp)             # alpha * delta^2
+        np.add(self.var, self._tmp, out=self._tmp)
+        self._tmp *= (1 - self.alpha)
+        np.copyto(self.var, self._tmp, where=self._valid)
+
+        # Accept the mean where the pixel is stable and has really moved
+        np.subtract(self.mean, self.out, out=d)
+        np.abs(d, out=d)
+        np.greater(d, self.hysteresis, out=self._mask)
+        np.less(self.var, self.max_variance, out=self._valid)
+        np.logical_and(self._mask, self._valid, out=self._mask)
+        np.copyto(self.out, self.mean, where=self._mask)
+        self.primed = True
+        return self.out
+
+FILTERS = {"ema": EMAFilter, "median": MedianFilter, "stability": StabilityFilter}
+
+def create_filter(name="ema", **kwargs):
+    return FILTERS[name](**kwargs)
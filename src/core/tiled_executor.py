@@ -0,0 +1,43 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+class TiledExecutor:
+    """Runs a grid kernel over horizontal strips on a thread pool.
+
+    The grid is split into one strip of rows per worker. Kernels get the
+    (y0, y1) row range they own and may read up to `halo` rows beyond it, but
+    must only write inside it, so strips never race. Each map_rows() call is
+    a barrier: it returns once every strip is done, which is how multi-phase
+    stencils (e.g. "update fluxes" then "move water") stay consistent.
+
+    NumPy ufuncs and OpenCV release the GIL on large arrays, so plain
+    vectorised kernels run truly in parallel across strips.
+    """
+    def __init__(self, workers=None, min_rows=16):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._strips = {}
+
+    def strips(self, height):
+        """[(y0, y1), ...] covering range(height), at most one per worker."""
+        if height not in self._strips:
+            n = max(1, min(self.workers, height // self.min_rows))
+            bounds = [height * i // n for i in range(n + 1)]
+            self._strips[height] = list(zip(bounds[:-1], bounds[1:]))
+        return self._strips[height]
+
+    def map_rows(self, fn, height, *args):
+        """Calls fn(y0, y1, *args) for every strip and waits for all of them."""
+        strips = self.strips(height)
+        if self._pool is None or len(strips) == 1:
+            for y0, y1 in strips:
+                fn(y0, y1, *args)
+            return
+        futures = [self._pool.submit(fn, y0, y1, *args) for y0, y1 in strips]
+        for f in futures:
+            f.result() # Re-raises kernel exceptions here
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
@@ -2,29 +2,59 @@ import cv2
 import numpy as np
 import xml.etree.ElementTree as ET
 import os
+from collections import OrderedDict
 
 class ColorMapManager:
-    def __init__(self):
+    """Colour maps as cached BGR lookup tables over a working elevation range.
+
+    Every map (all OpenCV COLORMAP_* presets and the XML hypsometric tints)
+    is a colour function of elevation in mm. A table of `size` entries
+    (256 for uint8 indices, 4096 for finer ones) samples it evenly over the
+    range given at construction. Tables are built once per (map, sea level,
+    range, size) and kept in a small LRU cache, so switching maps is a dict
+    lookup; the 256-entry tables of all maps are built up front.
+
+    Sea level and range are not kept here: they belong to whoever makes
+    the index (TerrainRenderer owns the live ones) and enter as the affine
+    elevation -> index step (index_transform), so the table stays the same.
+    """
+    def __init__(self, min_h=-250.0, max_h=250.0, cache_size=64):
         # 1. Initialize original OpenCV maps
         self.available_maps = {
             name.replace("COLORMAP_", "").capitalize(): getattr(cv2, name)
             for name in dir(cv2) if name.startswith("COLORMAP_")
         }
-        self.sea_level_offset = 0.0
-        
+        self.table_range = (float(min_h), float(max_h)) # Elevations the tables themselves sample
+
         # 2. Set hard fallbacks to prevent AttributeErrors
         self.current_map_id = cv2.COLORMAP_JET
         self.use_custom = False
         self.custom_lut = None
+        self.custom_stops = None      # (heights, (n, 3) BGR colours) from the XML
+        self.cache_size = cache_size
+        self._tables = OrderedDict()  # (map, sea level, min_h, max_h, size) -> (size, 3) BGR table
+        self._current = {}            # size -> table of the current map
+        self._preset_ramps = {}       # OpenCV colormap id -> its native (256, 3) BGR table
+        self._out = None
+        self._index = None
 
         # 3. Load the XML (This will update the default if successful)
         # Ensure this path matches your project structure exactly
         xml_path = "src/modules/hypsometric_tints.xml" 
         self.load_custom_xml(xml_path)
+        self.precompute(256)
+
+    def index_transform(self, sea_level=0.0, min_h=None, max_h=None, size=256):
+        """(alpha, beta) with index = elevation * alpha + beta for a `size`-entry table.
 
-    def set_sea_level(self, value):
-        """Sets the sea level offset in mm."""
-        self.sea_level_offset = float(value)
+        Places sea level + min_h on the first entry and sea level + max_h on
+        the last (range defaults to the table range); feed it to one
+        cv2.addWeighted / cv2.convertScaleAbs pass.
+        """
+        min_h = self.table_range[0] if min_h is None else float(min_h)
+        max_h = self.table_range[1] if max_h is None else float(max_h)
+        alpha = (size - 1) / (max_h - min_h)
+        return alpha, -(sea_level + min_h) * alpha
 
     def load_custom_xml(self, path):
         if not os.path.exists(path):
@@ -40,19 +70,12 @@ class ColorMapManager:
             # Store as BGR for OpenCV compatibility
             colors.append([int(step.get('b')), int(step.get('g')), int(step.get('r'))])
 
-        # Define the "Working Window" of your sandbox
-        # This range should encompass your lowest and highest XML keys
-        min_h, max_h = -250, 250 
-        lut_range = np.linspace(min_h, max_h, 256)
-        
-        lut = np.zeros((256, 3), dtype=np.uint8)
-        for i in range(3): # For B, G, R channels
-            fp = [c[i] for c in colors]
-            # Interpolate the XML colors across the 256-step LUT
-            lut[:, i] = np.interp(lut_range, heights, fp)
-        
-        self.custom_lut = lut.reshape((256, 1, 3)).astype(np.uint8)
-        self.available_maps[root.get('name', 'Custom')] = "CUSTOM"        
+        # Colours are interpolated between the XML keys when a table is built
+        self.custom_stops = (np.array(heights), np.array(colors, np.float64))
+        self.custom_lut = self._build("CUSTOM", 0.0, *self.table_range, 256).reshape((256, 1, 3))
+        self.available_maps[root.get('name', 'Custom')] = "CUSTOM"
+        self._current.clear()
+
     def get_names(self):
         return list(self.available_maps.keys())
 
@@ -64,16 +87,94 @@ class ColorMapManager:
         else:
             self.use_custom = False
             self.current_map_id = val
+        self._current.clear()
 
-    def apply(self, elevation_8bit):
-        """Applies the color logic to the 8-bit depth frame."""
-        if self.use_custom and self.custom_lut is not None:
-            # cv2.LUT requires a 3-channel input to apply a 3-channel LUT
-            # We merge the grayscale frame into 3 channels first
-            merge_img = cv2.merge([elevation_8bit, elevation_8bit, elevation_8bit])
-            return cv2.LUT(merge_img, self.custom_lut)
+    def _map_key(self):
+        return "CUSTOM" if self.use_custom and self.custom_stops is not None else self.current_map_id
+
+    def _build(self, map_key, sea_level, min_h, max_h, size):
+        """Samples one map at `size` elevations evenly spread over [min_h, max_h]."""
+        heights = np.linspace(min_h, max_h, size) - sea_level
+        table = np.empty((size, 3), np.uint8)
+        if map_key == "CUSTOM":
+            xp, fp = self.custom_stops
         else:
-            return cv2.applyColorMap(elevation_8bit, self.current_map_id)
+            ramp = self._preset_ramps.get(map_key)
+            if ramp is None:
+                ramp = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), map_key).reshape(256, 3)
+                self._preset_ramps[map_key] = ramp
+            # A preset spans the working range; at sea level 0 and 256 entries this is the preset itself
+            xp, fp = np.linspace(min_h, max_h, 256), ramp
+        for i in range(3): # For B, G, R channels
+            table[:, i] = np.rint(np.interp(heights, xp, fp[:, i]))
+        return table
+
+    def table(self, map_key, sea_level=0.0, min_h=None, max_h=None, size=256):
+        """Cached (size, 3) BGR table for any map (OpenCV colormap id or 'CUSTOM').
+
+        Defaults to the manager's table range; a sea level or range given
+        here is baked into the colours (for callers without index_transform).
+        """
+        min_h = self.table_range[0] if min_h is None else float(min_h)
+        max_h = self.table_range[1] if max_h is None else float(max_h)
+        key = (map_key, float(sea_level), min_h, max_h, size)
+        table = self._tables.get(key)
+        if table is not None:
+            self._tables.move_to_end(key)
+            return table
+        table = self._build(map_key, float(sea_level), min_h, max_h, size)
+        table.setflags(write=False) # Shared by every caller
+        self._tables[key] = table
+        while len(self._tables) > self.cache_size:
+            self._tables.popitem(last=False)
+        return table
+
+    def precompute(self, size=256):
+        """Builds the tables of every map."""
+        for val in self.available_maps.values():
+            if val != "CUSTOM" or self.custom_stops is not None:
+                self.table(val, size=size)
+
+    def get_lut(self, size=256):
+        """Current map as a (size, 3) BGR table, indexed through index_transform(size).
+
+        The same table for every sea level and range, so renderers that
+        cache per table keep their cache while the tide moves.
+        """
+        lut = self._current.get(size)
+        if lut is None:
+            lut = self._current[size] = self.table(self._map_key(), size=size)
+        return lut
+
+    def apply(self, elevation_index, out=None):
+        """Colours a single-channel index image (uint8 -> 256-entry table, uint16 -> 4096).
+
+        Looks the colours up straight from the one channel (no 3-channel
+        merge) into `out` or a reused buffer, which is returned.
+        """
+        if out is None:
+            shape = elevation_index.shape[:2] + (3,)
+            if self._out is None or self._out.shape != shape:
+                self._out = np.empty(shape, np.uint8)
+            out = self._out
+        if elevation_index.dtype == np.uint8:
+            # applyColorMap with a user table is OpenCV's single-channel LUT fast path
+            cv2.applyColorMap(elevation_index, self.get_lut(256).reshape(256, 1, 3), dst=out)
+        else:
+            np.take(self.get_lut(4096), elevation_index, axis=0, out=out, mode='clip')
+        return out
+
+    def apply_elevation(self, elevation, sea_level=0.0, min_h=None, max_h=None, out=None):
+        """Colours a float32 elevation map (mm) at the given sea level and range.
+
+        One saturating affine pass to a uint8 index (clamped to the table
+        ends), then the single-channel lookup of apply().
+        """
+        if self._index is None or self._index.shape != elevation.shape:
+            self._index = np.empty(elevation.shape, np.uint8)
+        alpha, beta = self.index_transform(sea_level, min_h, max_h, 256)
+        cv2.addWeighted(elevation, alpha, elevation, 0, beta, dst=self._index, dtype=cv2.CV_8U)
+        return self.apply(self._index, out)
 
 ## Code to include slider to change colours to different heights - does not work well yet    
     # def __init__(self):
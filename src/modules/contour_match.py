@@ -1,13 +1,195 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import cv2
 
+from modules.dem_import import register_importers
+from modules.dem_library import DEMLibrary, DEM_DIR
+
+def diverging_lut(size=256):
+    """(size, 3) BGR table: blue (too low, add sand) -> green (on target) -> red (too high, remove)."""
+    x = np.linspace(-1.0, 1.0, size)
+    stops = np.array([-1.0, -0.5, 0.0, 0.5, 1.0])
+    colors = np.array([[128, 0, 0], [255, 160, 0], [0, 200, 0], [0, 160, 255], [0, 0, 160]], np.float64)
+    lut = np.empty((size, 3), np.uint8)
+    for i in range(3):
+        lut[:, i] = np.rint(np.interp(x, stops, colors[:, i]))
+    return lut
+
+class MatchStats:
+    """One target's score for one frame. Tile grids are (rows, cols) over `tile`-pixel tiles.
+
+    diff is live - target: positive means too much sand (cut), negative too
+    little (fill). Volumes are in ml.
+    """
+    def __init__(self, rmse, mean, rmse_tiles, cut_ml, fill_ml):
+        self.rmse = rmse              # Whole-frame RMSE (mm)
+        self.mean = mean              # Mean diff per tile (mm)
+        self.rmse_tiles = rmse_tiles  # RMSE per tile (mm)
+        self.cut_ml = cut_ml          # Sand to remove per tile
+        self.fill_ml = fill_ml        # Sand to add per tile
+
+    @property
+    def cut_total(self):
+        return float(self.cut_ml.sum())
+
+    @property
+    def fill_total(self):
+        return float(self.fill_ml.sum())
+
+class _Target:
+    """A target DEM with its own diff/reduction buffers, so targets can be scored concurrently."""
+    def __init__(self, dem, padded):
+        self.dem = np.ascontiguousarray(dem, np.float32)
+        h, w = self.dem.shape
+        # Zero padding up to whole tiles: pads add nothing to the tile sums
+        self.diff_full = np.zeros(padded, np.float32)
+        self.sq_full = np.zeros(padded, np.float32)
+        self.pos_full = np.zeros(padded, np.float32)
+        self.diff = self.diff_full[:h, :w]
+        self.sq = self.sq_full[:h, :w]
+        self.pos = self.pos_full[:h, :w]
+
+class ContourMatchEngine:
+    """Scores live elevation against one or more target DEMs, per tile, at camera rate.
+
+    Per target and frame: three full-resolution passes (diff, diff², positive
+    part) into reused buffers, then one INTER_AREA resize of each to the tile
+    grid, which is an exact strided mean per tile. From those come the
+    per-tile RMSE and signed volume (cut/fill in ml, "remove 40 ml here"),
+    and the whole-frame RMSE, with no per-frame allocation of image-sized
+    arrays. Several targets are scored in parallel on a thread pool (OpenCV
+    releases the GIL).
+
+    The heatmap uses a fixed scale (±scale_mm spans the diverging table),
+    so colours mean the same height error every frame instead of
+    flickering with a per-frame min/max. It is coloured at 1/heatmap_step
+    resolution and scaled back up.
+    """
+    def __init__(self, shape=(480, 640), tile=32, pixel_mm=1.5, scale_mm=50.0, heatmap_step=4, workers=None):
+        self.shape = tuple(shape)
+        self.tile = tile
+        self.pixel_ml = pixel_mm * pixel_mm / 1000.0 # Volume of 1 mm of sand over one pixel
+        self.scale_mm = float(scale_mm)
+        self.heatmap_step = heatmap_step
+        self.lut = diverging_lut().reshape(256, 1, 3)
+        self.targets = {}
+
+        h, w = self.shape
+        self.grid = (-(-h // tile), -(-w // tile))
+        self._padded = (self.grid[0] * tile, self.grid[1] * tile)
+        # Pixels per tile (edge tiles are partial), to turn padded means back into sums
+        rows = np.minimum(tile, h - tile * np.arange(self.grid[0]))
+        cols = np.minimum(tile, w - tile * np.arange(self.grid[1]))
+        self._count = np.outer(rows, cols).astype(np.float32)
+        self._area = float(tile * tile)
+
+        small = (-(-h // heatmap_step), -(-w // heatmap_step))
+        self._small_diff = np.empty(small, np.float32)
+        self._small_index = np.empty(small, np.uint8)
+        self._small_bgr = np.empty(small + (3,), np.uint8)
+        self._heatmap = np.empty((h, w, 3), np.uint8)
+
+        workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def set_target(self, name, dem):
+        """Adds (or replaces) a target DEM, same shape and units (mm) as the live elevation."""
+        if dem.shape != self.shape:
+            dem = cv2.resize(dem.astype(np.float32), self.shape[::-1], interpolation=cv2.INTER_AREA)
+        self.targets[name] = _Target(dem, self._padded)
+
+    def remove_target(self, name):
+        self.targets.pop(name, None)
+
+    def _tile_sums(self, src):
+        """Sum of src over every tile (src is a zero-padded full buffer)."""
+        means = cv2.resize(src, self.grid[::-1], interpolation=cv2.INTER_AREA)
+        return means * self._area
+
+    def _score(self, target, live):
+        # 1. Full-resolution passes into the target's own buffers
+        cv2.subtract(live, target.dem, dst=target.diff)
+        cv2.multiply(target.diff, target.diff, dst=target.sq)
+        cv2.max(target.diff, 0.0, dst=target.pos)
+
+        # 2. Strided reductions down to the tile grid
+        net = self._tile_sums(target.diff_full)
+        sq = self._tile_sums(target.sq_full)
+        cut = self._tile_sums(target.pos_full)
+        rmse = float(np.sqrt(sq.sum() / live.size))
+        return MatchStats(rmse, net / self._count, np.sqrt(sq / self._count),
+                          cut * self.pixel_ml, (cut - net) * self.pixel_ml)
+
+    def score(self, live, names=None):
+        """{name: MatchStats} for the given (default: all) targets. live: float32 (H, W) mm."""
+        live = np.asarray(live, np.float32)
+        names = list(self.targets) if names is None else names
+        if self._pool is None or len(names) < 2:
+            return {name: self._score(self.targets[name], live) for name in names}
+        futures = {name: self._pool.submit(self._score, self.targets[name], live) for name in names}
+        return {name: f.result() for name, f in futures.items()}
+
+    def heatmap(self, name, full_size=True):
+        """BGR heatmap of the last scored diff for `name` (reused buffer, overwritten next call).
+
+        full_size=False returns the 1/heatmap_step one as coloured, for
+        callers that scale it themselves (e.g. straight into the projector warp).
+        """
+        target = self.targets[name]
+        cv2.resize(target.diff, self._small_diff.shape[::-1], dst=self._small_diff, interpolation=cv2.INTER_AREA)
+        # Fixed scale: -scale_mm -> 0, on target -> 127.5, +scale_mm -> 255 (saturating)
+        alpha = 127.5 / self.scale_mm
+        cv2.addWeighted(self._small_diff, alpha, self._small_diff, 0, 127.5, dst=self._small_index,
+                        dtype=cv2.CV_8U)
+        cv2.applyColorMap(self._small_index, self.lut, dst=self._small_bgr)
+        if not full_size:
+            return self._small_bgr
+        cv2.resize(self._small_bgr, self.shape[::-1], dst=self._heatmap, interpolation=cv2.INTER_LINEAR)
+        return self._heatmap
+
+    def guidance(self, stats, min_ml=5.0, top=8):
+        """[(y0, y1, x0, x1, ml), ...] tiles needing the most sand moved; ml > 0 = remove, < 0 = add."""
+        net = stats.cut_ml - stats.fill_ml
+        order = np.argsort(-np.abs(net), axis=None)[:top]
+        h, w = self.shape
+        out = []
+        for r, c in zip(*np.unravel_index(order, net.shape)):
+            ml = float(net[r, c])
+            if abs(ml) < min_ml:
+                break
+            y0, x0 = r * self.tile, c * self.tile
+            out.append((y0, min(h, y0 + self.tile), x0, min(w, x0 + self.tile), ml))
+        return out
+
+    def draw_guidance(self, img, stats, min_ml=5.0, top=8, color=(255, 255, 255)):
+        """Writes "+40 ml" / "-25 ml" over the tiles that need the most sand moved."""
+        for y0, y1, x0, x1, ml in self.guidance(stats, min_ml, top):
+            text = f"{'-' if ml > 0 else '+'}{abs(ml):.0f} ml"
+            (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)
+            org = ((x0 + x1 - tw) // 2, (y0 + y1 + th) // 2)
+            cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
+        return img
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
 class ContourMatchManager:
-    def __init__(self, resolution=(480, 640)): # TODO: Is the resolution correct?
+    def __init__(self, resolution=(480, 640), dem_dir=DEM_DIR, box_height_mm=(0.0, 150.0)): # TODO: Is the resolution correct?
         self.resolution = resolution
         self.target_dem = None
+        self.target_name = None
         self.is_matching_mode = False
+        self.engine = ContourMatchEngine(resolution)
+        self.library = DEMLibrary(dem_dir, shape=resolution)
+        # Real-world rasters (.asc/.xyz/.tif/.raw) are stretched onto the box's height range
+        register_importers(self.library, box_height_mm)
+        self.library.index()
+        self.last_stats = None
 
-    def save_current_sand_as_dem(self, depth_frame, filename="src/modules/ContourMatch/dems/custom_terrain.dem"):
+    def save_current_sand_as_dem(self, depth_frame, filename=os.path.join(DEM_DIR, "custom_terrain.dem")):
         "Captures current sand state and saves it as a Numpy binary file"
         dem_data = depth_frame.astype(np.float32)
         np.save(filename, dem_data)
@@ -16,25 +198,37 @@ class ContourMatchManager:
     def load_dem(self, filename):
         "Loads a pre-recorded DEM file into the matching engine"
         try:
-            self.target_dem = np.load(filename)
-            self.is_matching_mode = True
+            self.select_dem(self.library.add(filename))
             print(f"Target DEM {filename} loaded successfully.")
         except FileNotFoundError:
             print("Error: DEM file not found.")
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    def select_dem(self, name):
+        "Switches to a library target (fitted to the sensor/ROI) and preloads the next one"
+        self.target_dem = self.library.get(name)[0]
+        self.target_name = name
+        self.engine.set_target("active", self.target_dem)
+        self.is_matching_mode = True
+        self.library.preload_next(name)
+
+    def set_roi(self, x, y, w, h):
+        "Re-fits targets to a new sandbox ROI (sensor pixels)"
+        self.library.set_geometry(self.resolution, (x, y, w, h))
+        if self.target_name is not None:
+            self.select_dem(self.target_name)
 
     def calculate_matching_guide(self, live_depth):
         "Computes the difference map and a quantitative matching score"
         if self.target_dem is None:
             return None, 0.0
-        
-        # Postive means sand is too high (remove), Negative means too low (add)
-        diff = live_depth.astype(np.float32) - self.target_dem
 
-        # Calculate RMSE (Root Mean Square Error) for a matching score #TODO: is this needed?
-        score = np.sqrt(np.mean(diff**2))
+        # Postive means sand is too high (remove), Negative means too low (add).
+        # Per-tile RMSE and cut/fill volumes are kept in last_stats for guidance overlays.
+        self.last_stats = self.engine.score(live_depth, ["active"])["active"]
 
-        # Visual heatmap: Red (high), Blue (low), Green (correct)
-        norm_diff = cv2.normalize(diff, None, 0,255, cv2.NORM_MINMAX).astype(np.uint8)
-        heatmap = cv2.applyColorMap(norm_diff, cv2.COLORMAP_JET)
+        # Visual heatmap: Red (high), Blue (low), Green (correct), on a fixed scale
+        heatmap = self.engine.heatmap("active")
 
-        return heatmap, score
\ No newline at end of file
+        return heatmap, self.last_stats.rmse
@@ -0,0 +1,231 @@
+import os
+import itertools
+from functools import partial
+
+import numpy as np
+import cv2
+
+try:
+    import tifffile
+except ImportError: # Optional: GeoTIFFs fall back to OpenCV (whole file in RAM)
+    tifffile = None
+
+CHUNK_BYTES = 64 << 20 # Target size of one streamed block of source rows
+
+class AreaDownsampler:
+    """Box-averages a raster, fed in blocks of rows, down to a small grid.
+
+    Source pixel (y, x) lands in cell (y * h // H, x * w // W); each cell
+    keeps a sum and a count of valid (non-NaN) values, so only the output
+    grid is ever held in memory, whatever the size of the source. With
+    whole ratios this is exactly INTER_AREA. Axes where the source is
+    smaller than the output are binned at source size and enlarged at the end.
+    """
+    def __init__(self, src_shape, dst_shape):
+        self.src_shape, self.dst_shape = tuple(src_shape), tuple(dst_shape)
+        (H, W), (h, w) = self.src_shape, self.dst_shape
+        self.grid = (min(h, H), min(w, W))
+        self._row_bin = np.arange(H) * self.grid[0] // H
+        self._col_starts = np.searchsorted(np.arange(W) * self.grid[1] // W, np.arange(self.grid[1]))
+        self._col_sizes = np.diff(np.r_[self._col_starts, W])
+        self.sum = np.zeros(self.grid, np.float64)
+        self.count = np.zeros(self.grid, np.float64)
+
+    def add_rows(self, y0, rows):
+        """rows: (n, W) float32 block starting at source row y0, NaN = no data (zeroed in place)."""
+        bins = self._row_bin[y0:y0 + len(rows)]
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        cells = bins[starts]
+        missing = np.isnan(rows)
+        if missing.any():
+            rows[missing] = 0
+            valid = np.add.reduceat(~missing, starts, axis=0, dtype=np.int32).astype(np.float64)
+            self.count[cells] += np.add.reduceat(valid, self._col_starts, axis=1)
+        else: # Every pixel counts: rows per cell x columns per cell
+            self.count[cells] += np.outer(np.diff(np.r_[starts, len(rows)]), self._col_sizes)
+        # Rows of a cell are few: sum them in float32 (a float64 reduce would cast the whole block)
+        block = np.add.reduceat(rows, starts, axis=0).astype(np.float64)
+        self.sum[cells] += np.add.reduceat(block, self._col_starts, axis=1)
+
+    def add_points(self, rows, cols, values):
+        """Scattered samples at integer output cells (rows, cols), e.g. binned XYZ points."""
+        flat = rows * self.grid[1] + cols
+        n = self.grid[0] * self.grid[1]
+        self.sum += np.bincount(flat, weights=values, minlength=n).reshape(self.grid)
+        self.count += np.bincount(flat, minlength=n).reshape(self.grid)
+
+    def result(self, fill_passes=8):
+        """float32 output grid. Holes are grown over from their neighbours, the rest set to the minimum."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dem = (self.sum / self.count).astype(np.float32)
+        holes = self.count == 0
+        if holes.all():
+            raise ValueError("DEM has no valid samples")
+        # 1. Small gaps (sparse points, dropouts): average of the valid neighbours, a ring at a time
+        for _ in range(fill_passes):
+            if not holes.any():
+                break
+            valid = (~holes).astype(np.float32)
+            s = cv2.boxFilter(np.where(holes, 0, dem), -1, (3, 3), normalize=False)
+            c = cv2.boxFilter(valid, -1, (3, 3), normalize=False)
+            grow = holes & (c > 0)
+            dem[grow] = s[grow] / c[grow]
+            holes &= ~grow
+        # 2. Large no-data areas (open sea, outside the survey) sit at the lowest level
+        dem[holes] = dem[~holes].min()
+        if self.grid != self.dst_shape:
+            dem = cv2.resize(dem, self.dst_shape[::-1], interpolation=cv2.INTER_LINEAR)
+        return dem
+
+def _chunk_rows(width, itemsize=4):
+    return max(1, CHUNK_BYTES // max(1, width * itemsize))
+
+def _stream_array(array, nodata=None):
+    """(y0, rows) blocks of any row-sliceable array (memmap, TIFF zarr store), NaN for no data."""
+    step = _chunk_rows(array.shape[1]) # Sized for the float32 copy of the block
+    for y0 in range(0, array.shape[0], step):
+        rows = np.array(array[y0:y0 + step], np.float32) # A copy: sources may be read-only maps
+        if nodata is not None:
+            rows[rows == nodata] = np.nan
+        yield y0, rows
+
+def read_esri_ascii(path):
+    """ESRI ASCII grid (.asc): (shape, blocks) with blocks streamed straight from the text."""
+    header = {}
+    with open(path, "r") as f:
+        while True:
+            start = f.tell()
+            fields = f.readline().split()
+            if not fields or not fields[0][0].isalpha():
+                break
+            header[fields[0].lower()] = float(fields[1])
+    shape = (int(header["nrows"]), int(header["ncols"]))
+    nodata = header.get("nodata_value")
+
+    def rows_of(tokens):
+        rows = np.array(tokens, np.float32).reshape(-1, shape[1])
+        if nodata is not None:
+            rows[rows == nodata] = np.nan
+        return rows
+
+    def blocks():
+        block = _chunk_rows(shape[1], 64) * shape[1] # ~64 B per token held as a Python str
+        tokens, y0 = [], 0
+        with open(path, "r") as f:
+            f.seek(start)
+            for line in f:
+                tokens.extend(line.split()) # Rows may wrap over several lines
+                if len(tokens) >= block:
+                    n = len(tokens) // shape[1] * shape[1]
+                    rows = rows_of(tokens[:n])
+                    del tokens[:n]
+                    yield y0, rows
+                    y0 += len(rows)
+        if tokens:
+            yield y0, rows_of(tokens)
+    return shape, blocks()
+
+def read_raw(path, shape=None, dtype="<u2"):
+    """Headerless heightmap (.raw/.r16/.r32): memory-mapped. Square if `shape` is not given."""
+    dtype = np.dtype(dtype)
+    if shape is None:
+        side = int(round((os.path.getsize(path) // dtype.itemsize) ** 0.5))
+        if side * side * dtype.itemsize != os.path.getsize(path):
+            raise ValueError(f"{path} is not a square {dtype} heightmap: give its shape")
+        shape = (side, side)
+    array = np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape))
+    return array.shape, _stream_array(array)
+
+def read_tiff(path):
+    """GeoTIFF / TIFF heightmap: memory-mapped or read a block of rows at a time with tifffile."""
+    if tifffile is None:
+        array = cv2.imread(path, cv2.IMREAD_UNCHANGED | cv2.IMREAD_ANYDEPTH)
+        if array is None:
+            raise ValueError(f"Cannot read {path} (install tifffile for GeoTIFFs)")
+        array = array if array.ndim == 2 else array[..., 0]
+        return array.shape, _stream_array(array)
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        tag = page.tags.get(42113) # GDAL_NODATA
+        nodata = float(tag.value) if tag is not None else None
+    try:
+        array = tifffile.memmap(path, mode="r") # Uncompressed, contiguous
+    except ValueError:
+        try:
+            import zarr # Tiled/compressed: decode only the blocks a row range touches
+            array = zarr.open(tifffile.imread(path, aszarr=True), mode="r")
+        except ImportError:
+            array = tifffile.imread(path)
+    if array.ndim > 2:
+        array = array[..., 0] if array.shape[-1] <= 4 else array[0]
+    return array.shape, _stream_array(array, nodata)
+
+def import_xyz(path, size, delimiter=None):
+    """XYZ point cloud ("x y z" per line, any order): two streamed passes, bounds then binning.
+
+    Rows run north to south (largest y first), like the raster formats.
+    """
+    step = CHUNK_BYTES // 64 # Lines per chunk, held as Python strs while parsed
+    def chunks():
+        with open(path, "r") as f:
+            while True:
+                lines = list(itertools.islice(f, step))
+                if not lines:
+                    return
+                yield np.loadtxt(lines, delimiter=delimiter, usecols=(0, 1, 2), ndmin=2)
+
+    lo, hi = np.full(2, np.inf), np.full(2, -np.inf)
+    for pts in chunks():
+        lo = np.minimum(lo, pts[:, :2].min(axis=0))
+        hi = np.maximum(hi, pts[:, :2].max(axis=0))
+    if not np.isfinite(lo).all():
+        raise ValueError(f"No points in {path}")
+    span = np.maximum(hi - lo, 1e-9)
+    acc = AreaDownsampler(size, size)
+    h, w = size
+    for pts in chunks():
+        cols = np.minimum(((pts[:, 0] - lo[0]) / span[0] * w).astype(np.int64), w - 1)
+        rows = np.minimum(((hi[1] - pts[:, 1]) / span[1] * h).astype(np.int64), h - 1)
+        acc.add_points(rows, cols, pts[:, 2])
+    return acc.result()
+
+def rescale_heights(dem, height_range):
+    """Stretches the DEM's lowest..highest point onto the box's (low, high) mm."""
+    lo, hi = float(dem.min()), float(dem.max())
+    h0, h1 = height_range
+    scale = (h1 - h0) / (hi - lo) if hi > lo else 0.0
+    return ((dem - lo) * scale + h0).astype(np.float32)
+
+READERS = {
+    ".asc": read_esri_ascii,
+    ".raw": read_raw,
+    ".r16": read_raw,
+    ".r32": partial(read_raw, dtype="<f4"),
+    ".tif": read_tiff,
+    ".tiff": read_tiff,
+}
+
+def import_dem(path, size, height_range=(0.0, 150.0)):
+    """Any supported elevation file -> float32 (h, w) = `size` DEM in box mm.
+
+    Rasters are streamed in blocks of about CHUNK_BYTES and area-averaged
+    on the way, so a multi-GB national tile needs only the output grid in
+    memory; the heights are then stretched onto `height_range`.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xyz":
+        dem = import_xyz(path, size)
+    elif ext in READERS:
+        shape, blocks = READERS[ext](path)
+        acc = AreaDownsampler(shape, size)
+        for y0, rows in blocks:
+            acc.add_rows(y0, rows)
+        dem = acc.result()
+    else:
+        raise ValueError(f"No importer for {ext} files")
+    return rescale_heights(dem, height_range)
+
+def register_importers(library, height_range=(0.0, 150.0)):
+    """Lets a DEMLibrary index and serve real-world rasters; its pyramid cache keeps the conversions."""
+    for ext in list(READERS) + [".xyz"]:
+        library.loaders[ext] = partial(import_dem, height_range=height_range)
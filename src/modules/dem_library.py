@@ -0,0 +1,206 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+
+DEM_DIR = "src/modules/ContourMatch/dems"
+
+def _load_npy(path, size=None):
+    return np.load(path)
+
+def fit_to_frame(dem, shape, roi=None):
+    """Resamples a DEM onto the sensor frame: stretched over the ROI (x, y, w, h), 0 outside it.
+
+    Matches TerrainProcessor's elevation maps, which are full-frame with
+    zeros outside the ROI. Shrinking uses INTER_AREA, enlarging INTER_LINEAR.
+    """
+    h, w = shape
+    x, y, rw, rh = roi if roi is not None else (0, 0, w, h)
+    dem = np.asarray(dem, np.float32)
+    shrink = dem.shape[0] >= rh and dem.shape[1] >= rw
+    fitted = cv2.resize(dem, (rw, rh), interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+    if (x, y, rw, rh) == (0, 0, w, h):
+        return fitted
+    frame = np.zeros(shape, np.float32)
+    frame[y:y + rh, x:x + rw] = fitted
+    return frame
+
+class DEMLibrary:
+    """The target terrains of a directory, ready to match against at the sensor's geometry.
+
+    index() lists the DEM files under `root` (any extension in `loaders`).
+    A target is served as a pyramid: level 0 is the DEM resampled onto the
+    sensor frame and ROI (fit_to_frame), each further level halves it with
+    INTER_AREA. Pyramids are built once per (file version, frame shape,
+    ROI) into .npy files under `cache_dir` and opened memory-mapped, so a
+    rebuilt pyramid costs a page-in rather than a decode and resample. At
+    most `max_open` pyramids stay open (LRU), at most `max_files` stay on
+    disk (least recently used deleted first).
+
+    get() is thread-safe; preload() builds/opens a target on a background
+    thread, so selecting the next lesson terrain finds it already mapped.
+    """
+    def __init__(self, root=DEM_DIR, shape=(480, 640), roi=None, levels=3, cache_dir=None, max_open=4,
+                 max_files=32):
+        self.root = root
+        self.cache_dir = cache_dir or os.path.join(root, ".pyramids")
+        self.levels = levels
+        self.max_open = max_open
+        self.max_files = max_files
+        # Extension -> fn(path, (h, w) of the ROI) returning a 2-D elevation array (mm), ideally
+        # already at that size; new formats register here (see modules.dem_import)
+        self.loaders = {".npy": _load_npy}
+        self.shape, self.roi = tuple(shape), roi
+        self.entries = {}             # name -> path
+        self._open = OrderedDict()    # cache key -> [level arrays], memory-mapped
+        self._pending = {}            # cache key -> Future of a preload
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self.index()
+
+    def index(self):
+        """Rescans `root`; returns the target names (file names without extension), sorted.
+
+        Files that would share a name ('lake.npy', 'lake.asc') are all listed
+        under their full file names instead, so none of them is hidden.
+        """
+        found = {}
+        if os.path.isdir(self.root):
+            for fname in sorted(os.listdir(self.root)):
+                path = os.path.join(self.root, fname)
+                name, ext = self._split(fname)
+                if ext in self.loaders and os.path.isfile(path):
+                    found.setdefault(name, []).append(path)
+        self.entries = {}
+        for name, paths in found.items():
+            if len(paths) == 1:
+                self.entries[name] = paths[0]
+            else:
+                self.entries.update((os.path.basename(path), path) for path in paths)
+        return self.names()
+
+    def _split(self, fname):
+        """'lake.dem.npy' -> ('lake.dem', '.npy'): the name drops only the loader's extension."""
+        name, ext = os.path.splitext(fname)
+        return name, ext.lower()
+
+    def names(self):
+        return sorted(self.entries)
+
+    def add(self, path):
+        """Registers a DEM file outside `root` (or not indexed yet); returns its name."""
+        name, ext = self._split(os.path.basename(path))
+        if ext not in self.loaders:
+            raise ValueError(f"No loader for {ext} files")
+        known = self.entries.get(name)
+        if known is not None and os.path.abspath(known) != os.path.abspath(path):
+            raise ValueError(f"A DEM named '{name}' is already registered ({known})")
+        self.entries[name] = path
+        return name
+
+    def set_geometry(self, shape, roi=None):
+        """New sensor frame shape / ROI (x, y, w, h): later get() calls serve pyramids fitted to it."""
+        self.shape, self.roi = tuple(shape), roi
+
+    def _key(self, name):
+        path = self.entries[name]
+        st = os.stat(path)
+        ident = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{self.shape}|{self.roi}|{self.levels}"
+        return f"{name}-{hashlib.sha1(ident.encode()).hexdigest()[:16]}"
+
+    def get(self, name):
+        """[level 0, level 1, ...] float32 arrays of `name` at the current geometry (read-only)."""
+        key = self._key(name)
+        with self._lock:
+            pyramid = self._open.get(key)
+            if pyramid is not None:
+                self._open.move_to_end(key)
+                return pyramid
+            pending = self._pending.get(key)
+        if pending is not None: # Already on its way: wait for it instead of building twice
+            return pending.result()
+        return self._load(name, key)
+
+    def preload(self, name):
+        """Starts building/opening `name`'s pyramid in the background (no-op if open or pending)."""
+        if name not in self.entries:
+            return None
+        key = self._key(name)
+        with self._lock:
+            if key in self._open:
+                return None
+            if key not in self._pending:
+                self._pending[key] = self._pool.submit(self._load, name, key)
+            return self._pending[key]
+
+    def preload_next(self, name):
+        """Preloads the target after `name` in index order (wrapping), the likely next lesson."""
+        names = self.names()
+        if name in names and len(names) > 1:
+            return self.preload(names[(names.index(name) + 1) % len(names)])
+        return None
+
+    def _load(self, name, key):
+        try:
+            paths = [os.path.join(self.cache_dir, f"{key}.L{i}.npy") for i in range(self.levels)]
+            if not all(os.path.exists(p) for p in paths):
+                self._build(name, paths)
+            pyramid = []
+            for p in paths:
+                os.utime(p) # Recently used: last to be pruned
+                pyramid.append(np.load(p, mmap_mode="r"))
+            with self._lock:
+                self._open[key] = pyramid
+                while len(self._open) > self.max_open:
+                    self._open.popitem(last=False)
+            return pyramid
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _build(self, name, paths):
+        """Decodes and resamples once, writing each level through a memory map."""
+        path = self.entries[name]
+        h, w = self.shape
+        size = (self.roi[3], self.roi[2]) if self.roi is not None else (h, w)
+        dem = self.loaders[os.path.splitext(path)[1].lower()](path, size)
+        level = fit_to_frame(dem, self.shape, self.roi)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for i, dst in enumerate(paths):
+            if i:
+                h, w = level.shape
+                level = cv2.resize(level, ((w + 1) // 2, (h + 1) // 2), interpolation=cv2.INTER_AREA)
+            tmp = f"{dst}.{threading.get_ident()}.tmp"
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=level.shape)
+            out[:] = level
+            out.flush()
+            del out
+            os.replace(tmp, dst) # Readers only ever see complete files
+        self._prune()
+
+    def _prune(self):
+        """Deletes the least recently used pyramids beyond max_files."""
+        files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".npy")]
+        groups = {}
+        for f in files:
+            groups.setdefault(os.path.basename(f).rsplit(".L", 1)[0], []).append(f)
+        if len(groups) <= self.max_files:
+            return
+        with self._lock:
+            in_use = set(self._open)
+        by_age = sorted(groups.items(), key=lambda kv: max(os.path.getmtime(f) for f in kv[1]))
+        for key, group in by_age[:len(groups) - self.max_files]:
+            if key in in_use:
+                continue
+            for f in group:
+                try:
+                    os.remove(f)
+                except OSError: # Still mapped elsewhere (Windows); pruned next time
+                    pass
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,374 @@
+import numpy as np
+import cv2
+
+from core.change_detector import mark_tiles, tile_rects
+
+# Cell edges: top, right, bottom, left. Corners: a (top-left, bit 1), b (top-right, 2),
+# c (bottom-right, 4), d (bottom-left, 8); corner bit set = at or above the level.
+_T, _R, _B, _L = range(4)
+_EDGE_CORNERS = ((0, 1), (1, 2), (3, 2), (0, 3))
+_CORNER_XY = ((0, 0), (1, 0), (1, 1), (0, 1))
+_EDGE_MID = ((0.5, 0), (1, 0.5), (0.5, 1), (0, 0.5))
+
+def _oriented(e1, e2, corner, high):
+    """(e1, e2) ordered so that `corner` lies left of the segment if it is high, right if low.
+
+    One rule for every cell makes a contour's segments run head to tail, so
+    neighbouring cells chain up by matching end points.
+    """
+    (x1, y1), (x2, y2), (cx, cy) = _EDGE_MID[e1], _EDGE_MID[e2], _CORNER_XY[corner]
+    cross = (x2 - x1) * (cy - y1) - (y2 - y1) * (cx - x1)
+    return (e1, e2) if (cross > 0) == high else (e2, e1)
+
+def _segment_table():
+    """(18, 2, 2) edge pairs per case. 16 and 17 are saddles 5 and 10 with a high centre."""
+    table = np.full((18, 2, 2), -1, np.int64)
+    for case in range(1, 15):
+        high = [bool(case >> i & 1) for i in range(4)]
+        crossed = [e for e, (c0, c1) in enumerate(_EDGE_CORNERS) if high[c0] != high[c1]]
+        if len(crossed) == 2:
+            table[case, 0] = _oriented(*crossed, high.index(True), True)
+    around_ac = (_oriented(_L, _T, 0, True), _oriented(_R, _B, 2, True))
+    around_bd = (_oriented(_T, _R, 1, True), _oriented(_B, _L, 3, True))
+    # Saddles: a low centre isolates the high corners, a high one the low corners
+    table[5] = around_ac
+    table[16] = [_oriented(_T, _R, 1, False), _oriented(_B, _L, 3, False)]
+    table[10] = around_bd
+    table[17] = [_oriented(_L, _T, 0, False), _oriented(_R, _B, 2, False)]
+    return table
+
+_SEGMENTS = _segment_table()
+_EDGE_CORNERS_A = np.array(_EDGE_CORNERS)
+_CORNER_XY_A = np.array(_CORNER_XY, np.float32)
+# Edge -> (vertical?, row offset, column offset) of its id on the pixel grid
+_EDGE_VERTICAL = np.array([0, 1, 0, 1])
+_EDGE_DR = np.array([0, 0, 1, 0])
+_EDGE_DC = np.array([0, 1, 0, 0])
+_CELL = np.ones((2, 2), np.uint8)
+
+def trace_isolines(z, interval, tile=32, origin=(0, 0), shift=4, tiles=None):
+    """Vectorised marching squares: every isoline at multiples of `interval` through z.
+
+    z: (h, w) float32 elevation (a region of the full map whose top-left
+    pixel is `origin` (y, x), aligned to `tile`). Only cells whose corners
+    span a level boundary are visited, each crossing is linearly
+    interpolated, and the segments are chained into polylines (a polyline
+    never leaves its tile, so tiles can be cached and redrawn on their own).
+    tiles: optional bool (rows, cols) mask of the region's tiles to trace;
+    the others are skipped, so scattered tiles cost one call.
+
+    Returns (points, lengths, levels, tiles): all polylines' vertices as one
+    (N, 2) int32 array in full-frame pixels with `shift` fractional bits
+    (cv2.polylines' fixed-point format), the vertex count of each polyline,
+    its level index (elevation = level * interval) and its (tile_row,
+    tile_col). Polylines come grouped by tile.
+    """
+    h, w = z.shape
+    empty = (np.zeros((0, 2), np.int32), np.zeros(0, np.intp), np.zeros(0, np.intp), np.zeros((0, 2), np.intp))
+    if h < 2 or w < 2:
+        return empty
+
+    # 1. Cells whose corners fall in different bands (min/max over each 2x2 cell via erode/dilate),
+    #    one row per level they cross
+    inv = 1.0 / interval
+    lo = np.floor(cv2.erode(z, _CELL, anchor=(0, 0))[:-1, :-1] * inv).astype(np.int32)
+    hi = np.floor(cv2.dilate(z, _CELL, anchor=(0, 0))[:-1, :-1] * inv).astype(np.int32)
+    crossed = hi > lo
+    if tiles is not None:
+        crossed &= np.repeat(np.repeat(tiles, tile, axis=0), tile, axis=1)[:h - 1, :w - 1]
+    cells = np.flatnonzero(crossed)
+    if cells.size == 0:
+        return empty
+    lo, hi = lo.ravel()[cells], hi.ravel()[cells]
+    count = hi - lo
+    first = np.cumsum(count) - count
+    cell = np.repeat(cells, count)
+    k = np.repeat(lo + 1 - first, count) + np.arange(cell.size, dtype=np.int32)
+    r, c = np.divmod(cell, w - 1)
+
+    # 2. Case per (cell, level), then the edge pair(s) each case crosses
+    v = (k * np.float32(interval)).astype(np.float32)
+    corners = np.stack([z[r, c], z[r, c + 1], z[r + 1, c + 1], z[r + 1, c]])
+    case = (corners >= v).T.astype(np.intp) @ np.array([1, 2, 4, 8])
+    saddle_high = np.flatnonzero(((case == 5) | (case == 10)) & (corners.mean(axis=0) >= v))
+    case[saddle_high] = np.where(case[saddle_high] == 5, 16, 17)
+    pairs = _SEGMENTS[case]
+    slot, = np.nonzero(pairs[:, 1, 0] >= 0)
+    idx = np.concatenate([np.flatnonzero(pairs[:, 0, 0] >= 0), slot])
+    e = np.concatenate([pairs[pairs[:, 0, 0] >= 0, 0], pairs[slot, 1]])
+    n = idx.size
+    if n == 0:
+        return empty
+
+    def crossing(edge):
+        """Interpolated crossing on `edge` of each segment's cell, and its id (shared with the neighbour cell)."""
+        c0, c1 = _EDGE_CORNERS_A[edge, 0], _EDGE_CORNERS_A[edge, 1]
+        z0, z1 = corners[c0, idx], corners[c1, idx]
+        t = (v[idx] - z0) / (z1 - z0) # Never 0/0: a crossed edge has one corner on each side
+        xy = _CORNER_XY_A[c0] + t[:, None] * (_CORNER_XY_A[c1] - _CORNER_XY_A[c0])
+        # Full-frame coordinates before rounding, so every region rounds a point the same way
+        xy += np.stack([c[idx] + origin[1], r[idx] + origin[0]], axis=1)
+        eid = _EDGE_VERTICAL[edge] * (h * w) + (r[idx] + _EDGE_DR[edge]) * w + c[idx] + _EDGE_DC[edge]
+        return xy, eid + k[idx].astype(np.int64) * (2 * h * w)
+
+    start, start_key = crossing(e[:, 0])
+    end, end_key = crossing(e[:, 1])
+    tr, tc = (r[idx] + origin[0]) // tile, (c[idx] + origin[1]) // tile
+    seg_tile = tr * 65536 + tc
+    seg_k = k[idx]
+
+    # 3. Successor of each segment: the one starting where it ends (same tile only)
+    order = np.argsort(start_key)
+    pos = np.minimum(np.searchsorted(start_key[order], end_key), n - 1)
+    nxt = order[pos]
+    nxt[(start_key[nxt] != end_key) | (seg_tile[nxt] != seg_tile)] = -1
+    self_idx = np.arange(n)
+    # Pointer jumping needs log2(longest chain) rounds; a chain is no longer than its tile's segment count
+    tile_rows, tile_cols = tr - tr.min(), tc - tc.min()
+    longest = np.bincount(tile_rows * (tile_cols.max() + 1) + tile_cols).max()
+    rounds = int(np.ceil(np.log2(longest + 1))) + 1
+
+    # 4. Closed loops: cut each one in front of its lowest segment
+    p = np.where(nxt >= 0, nxt, self_idx)
+    low = self_idx.copy()
+    for _ in range(rounds):
+        low = np.minimum(low, low[p])
+        p = p[p]
+    in_loop = nxt[p] >= 0
+    heads = np.flatnonzero(in_loop & (low == self_idx))
+    if heads.size:
+        prev = np.full(n, -1)
+        linked = nxt >= 0
+        prev[nxt[linked]] = self_idx[linked]
+        nxt[prev[heads]] = -1
+
+    # 5. List ranking: distance to the chain's last segment, and which one that is
+    p = np.where(nxt >= 0, nxt, self_idx)
+    dist = (nxt >= 0).astype(np.intp)
+    for _ in range(rounds):
+        dist = dist + dist[p]
+        p = p[p]
+    order = np.lexsort((-dist, p, seg_tile))
+    tail = p[order]
+    new_chain = np.ones(n, bool)
+    new_chain[1:] = tail[1:] != tail[:-1]
+    chain_first = np.flatnonzero(new_chain)
+    chain_last = np.append(chain_first[1:], n)
+
+    # 6. Vertices: every segment's start, plus the end of each chain's last segment
+    points = np.insert(start[order], chain_last, end[tail[chain_last - 1]], axis=0)
+    points = np.rint(points * (1 << shift)).astype(np.int32)
+    lengths = chain_last - chain_first + 1
+    seg_first = order[chain_first]
+    tiles = np.stack([seg_tile[seg_first] // 65536, seg_tile[seg_first] % 65536], axis=1)
+    return points, lengths, seg_k[seg_first], tiles
+
+class _Tile:
+    """Cached polylines and (optional) label of one tile."""
+    __slots__ = ("points", "lengths", "major", "label")
+
+    def __init__(self, points, lengths, major, label):
+        self.points, self.lengths, self.major, self.label = points, lengths, major, label
+
+class IsolineEngine:
+    """Anti-aliased, labelled contour lines traced from the float elevation.
+
+    Replaces the quantize -> Canny raster contours: lines are sub-pixel
+    polylines from trace_isolines(), drawn with batched cv2.polylines(LINE_AA,
+    shift=4) calls: one for the minor lines, three for the bolder major lines
+    every `major_every` levels (thin lines half a pixel apart; OpenCV's
+    thick anti-aliased lines are ~6x slower). Closed loops shorter than
+    `min_loop` vertices (sensor-noise specks) are dropped. Every
+    `label_every`-th tile in each direction labels its longest major line
+    with its elevation in mm.
+
+    Polylines are cached per tile x tile block (use the ChangeDetector's
+    tile size). A change can move the lines of the neighbouring tiles too
+    (the blur spreads it, edge cells reach one pixel across), so
+    redraw_rects() widens a ChangeDetector's dirty tiles by one tile;
+    update() checks exactly those and draw() draws every tile that reaches
+    into an area, clipped to it. A tile's lines and label stay within HALO
+    pixels of it.
+
+    Tracing and labelling are the expensive part, so update() only re-runs
+    them for tiles whose level set changed: some pixel its cells use is
+    more than `hysteresis_mm` outside the band (floor(z / interval)) it
+    was in when the tile was traced. Other tiles keep their lines, which
+    then sit within about a pixel of a fresh trace; sensor noise on a line
+    no longer re-traces its tile every frame. Only a new interval or frame
+    size re-traces everything.
+    """
+    HALO = 2   # How far a tile's lines reach beyond it (px)
+    MARGIN = 4 # Extra pixels drawn around a partial redraw, then discarded
+    # Major lines: drawn as is, then half a pixel right and half a pixel down (fixed point, shift=4)
+    _MAJOR_OFFSETS = (None, np.array([8, 0], np.int32), np.array([0, 8], np.int32))
+
+    def __init__(self, tile=32, major_every=5, color=(0, 0, 0), min_loop=12, label_every=4, font_scale=0.7,
+                 hysteresis_mm=1.0):
+        self.tile = tile
+        self.major_every = major_every
+        self.color = color
+        self.min_loop = min_loop
+        self.label_every = label_every
+        self.font = cv2.FONT_HERSHEY_PLAIN
+        self.font_scale = font_scale
+        self.hysteresis_mm = hysteresis_mm
+        self._tiles = {}
+        self._key = None
+        self._shape = None
+        self._bands = None # floor(z / interval) each tile was last traced with
+        self.retraced = 0  # Tiles re-traced by the last update()
+        self._text_size = {}
+        self._scratch = None
+
+    def invalidate(self):
+        """Every tile is re-traced on the next update()."""
+        self._key = None
+
+    def redraw_rects(self, rects, shape):
+        """Changed areas (y0, y1, x0, x1) -> the tile runs whose lines they can affect."""
+        h, w = shape
+        t = self.tile
+        dirty = mark_tiles(np.zeros((-(-h // t), -(-w // t)), np.uint8), t, rects)
+        return tile_rects(cv2.dilate(dirty, np.ones((3, 3), np.uint8)).astype(bool), t, shape)
+
+    def update(self, elevation, interval, rects=None):
+        """Re-traces the tiles touching rects (y0, y1, x0, x1) whose level set changed; None checks all.
+
+        elevation: the smoothed float32 map the terrain is coloured from.
+        """
+        h, w = elevation.shape
+        t = self.tile
+        grid = (-(-h // t), -(-w // t))
+        key = (elevation.shape, interval, self.major_every)
+        everything = key != self._key
+        if everything:
+            self._key, self._shape = key, (h, w)
+            self._bands = np.empty((h, w), np.int32)
+            self._tiles.clear()
+
+        # 1. Tiles whose level set changed: a pixel left the band it was traced in by more than
+        #    hysteresis_mm (sensor noise at a line flips bands every frame without moving it)
+        dirty = np.full(grid, everything)
+        inv = 1.0 / interval
+        checked = [] if everything else [(0, h, 0, w)] if rects is None else \
+            tile_rects(mark_tiles(np.zeros(grid, bool), t, rects), t, (h, w))
+        for y0, y1, x0, x1 in checked:
+            # Cells on an area's last row/column use one pixel of the next tile
+            b1, a1 = min(h, y1 + 1), min(w, x1 + 1)
+            z, traced = elevation[y0:b1, x0:a1], self._bands[y0:b1, x0:a1]
+            changed = (np.floor((z - self.hysteresis_mm) * inv) > traced) | \
+                      (np.floor((z + self.hysteresis_mm) * inv) < traced)
+            # A cell (its top-left pixel) changes with any of its four corners
+            cells = cv2.dilate(changed.view(np.uint8), _CELL, anchor=(0, 0))[:y1 - y0, :x1 - x0]
+            rows = np.maximum.reduceat(cells, np.arange(0, y1 - y0, t), axis=0)
+            dirty[y0 // t:-(-y1 // t), x0 // t:-(-x1 // t)] |= \
+                np.maximum.reduceat(rows, np.arange(0, x1 - x0, t), axis=1).astype(bool)
+
+        # 2. Trace only those, in one pass over the map
+        self.retraced = int(dirty.sum())
+        if not self.retraced:
+            return
+        for y0, y1, x0, x1 in tile_rects(dirty, t, (h, w)):
+            np.floor(elevation[y0:y1, x0:x1] * inv, out=self._bands[y0:y1, x0:x1], casting="unsafe")
+        for row, col in zip(*np.nonzero(dirty)):
+            self._tiles.pop((row, col), None)
+        points, lengths, levels, tiles = trace_isolines(elevation, interval, t, tiles=dirty)
+        ends = np.cumsum(lengths)
+        speck = (lengths < self.min_loop) & np.all(points[ends - lengths] == points[ends - 1], axis=1)
+        if speck.any():
+            points = points[np.repeat(~speck, lengths)]
+            lengths, levels, tiles = lengths[~speck], levels[~speck], tiles[~speck]
+            ends = np.cumsum(lengths)
+        if lengths.size == 0:
+            return
+        new_tile = np.flatnonzero(np.any(tiles[1:] != tiles[:-1], axis=1)) + 1
+        bounds = np.concatenate(([0], new_tile, [lengths.size]))
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            p0 = ends[a] - lengths[a]
+            self._store(tuple(tiles[a]), points[p0:ends[b - 1]], lengths[a:b], levels[a:b], interval)
+
+    def _store(self, tile_rc, points, lengths, levels, interval):
+        major = levels % self.major_every == 0
+        tr, tc = tile_rc
+        label = None
+        if self.label_every and tr % self.label_every == 0 and tc % self.label_every == 0 and major.any():
+            # Label the longest major line at its middle vertex
+            longest = np.flatnonzero(major)[np.argmax(lengths[major])]
+            mid = points[int(lengths[:longest].sum()) + lengths[longest] // 2] >> 4
+            label = self._place_label(str(int(levels[longest] * interval)), mid, tr, tc)
+        self._tiles[tile_rc] = _Tile(points, lengths, major, label)
+
+    def _place_label(self, text, anchor, tr, tc):
+        """(text, origin) just above anchor, kept inside its tile; None if it does not fit."""
+        size = self._text_size.get(text)
+        if size is None:
+            (tw, th), baseline = cv2.getTextSize(text, self.font, self.font_scale, 1)
+            size = self._text_size[text] = (tw, th, baseline)
+        tw, th, baseline = size
+        t = self.tile
+        h, w = self._shape
+        x0, y0 = tc * t, tr * t
+        x1, y1 = min(w, x0 + t), min(h, y0 + t)
+        if tw > x1 - x0 or th + baseline > y1 - y0:
+            return None
+        x = min(max(int(anchor[0]) - tw // 2, x0), x1 - tw)
+        y = min(max(int(anchor[1]) - 3, y0 + th), y1 - baseline) # Just above the line
+        return text, (x, y)
+
+    def draw(self, img, rects=None):
+        """Draws the cached isolines onto img; only inside rects (y0, y1, x0, x1) if given.
+
+        Every tile reaching into any of the areas is drawn in one batch, into
+        a copy of the areas' bounding box (plus MARGIN: clipping would change
+        the anti-aliasing next to the clip edge), and only the areas are
+        copied back. So each pixel is drawn once however the areas overlap,
+        and many scattered areas cost no more than one full redraw.
+        """
+        h, w = img.shape[:2]
+        areas = [(0, h, 0, w)] if rects is None else rects
+        t, halo = self.tile, self.HALO
+        keys = set()
+        for y0, y1, x0, x1 in areas:
+            for tr in range(max(0, (y0 - halo) // t), (y1 + halo - 1) // t + 1):
+                for tc in range(max(0, (x0 - halo) // t), (x1 + halo - 1) // t + 1):
+                    keys.add((tr, tc))
+        tiles = [self._tiles[k] for k in sorted(keys) if k in self._tiles]
+        if not tiles:
+            return
+
+        m = self.MARGIN
+        gy0, gx0 = max(0, min(a[0] for a in areas) - m), max(0, min(a[2] for a in areas) - m)
+        gy1, gx1 = min(h, max(a[1] for a in areas) + m), min(w, max(a[3] for a in areas) + m)
+        if rects is None:
+            roi = img
+        else:
+            if self._scratch is None or self._scratch.shape != img.shape:
+                self._scratch = np.empty_like(img)
+            roi = self._scratch[gy0:gy1, gx0:gx1]
+            np.copyto(roi, img[gy0:gy1, gx0:gx1])
+        self._draw_tiles(roi, tiles, gy0, gx0)
+        if roi is not img:
+            for y0, y1, x0, x1 in areas:
+                img[y0:y1, x0:x1] = roi[y0 - gy0:y1 - gy0, x0 - gx0:x1 - gx0]
+
+    def _draw_tiles(self, roi, tiles, gy0, gx0):
+        """Lines and labels of `tiles` onto roi, whose top-left pixel is (gy0, gx0) of the frame."""
+        points = np.concatenate([e.points for e in tiles]) - np.array([gx0 << 4, gy0 << 4], np.int32)
+        lengths = np.concatenate([e.lengths for e in tiles])
+        major = np.concatenate([e.major for e in tiles]).tolist()
+        ends = np.cumsum(lengths).tolist()
+        spans = list(zip([0] + ends[:-1], ends))
+        minor_lines = [points[a:b] for (a, b), m in zip(spans, major) if not m]
+        if minor_lines:
+            cv2.polylines(roi, minor_lines, False, self.color, 1, cv2.LINE_AA, 4)
+        for offset in self._MAJOR_OFFSETS:
+            shifted = points + offset if offset is not None else points
+            major_lines = [shifted[a:b] for (a, b), m in zip(spans, major) if m]
+            if not major_lines:
+                break
+            cv2.polylines(roi, major_lines, False, self.color, 1, cv2.LINE_AA, 4)
+        for entry in tiles:
+            if entry.label is not None:
+                text, (x, y) = entry.label
+                cv2.putText(roi, text, (x - gx0, y - gy0), self.font, self.font_scale, self.color, 1, cv2.LINE_AA)
@@ -1,34 +1,149 @@
-# Module has to be worked on
-
 # Inside src/modules/rain_sim.py
 import cv2
 import numpy as np
 
+try:
+    import numba
+except ImportError: # Optional fast path
+    numba = None
+
 def calculate_slopes(depth_map):
     # Calculate horizontal and vertical gradients
     dz_dx = cv2.Sobel(depth_map, cv2.CV_32F, 1, 0, ksize=3)
     dz_dy = cv2.Sobel(depth_map, cv2.CV_32F, 0, 1, ksize=3)
     return dz_dx, dz_dy
 
+# cv2.remap maps must stay below SHRT_MAX per side, so particle arrays are
+# stored as (rows, _ROW) blocks and sampled in one remap call
+_ROW = 1024
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _step_kernel(x, y, vx, vy, life, dz_dx, dz_dy, dt, accel, damping, max_life):
+        h, w = dz_dx.shape
+        for i in numba.prange(x.size):
+            px, py = x[i], y[i]
+            # Bilinear gradient sample
+            x0 = min(max(int(px), 0), w - 2)
+            y0 = min(max(int(py), 0), h - 2)
+            fx, fy = px - x0, py - y0
+            gx = ((1 - fx) * (1 - fy) * dz_dx[y0, x0] + fx * (1 - fy) * dz_dx[y0, x0 + 1]
+                  + (1 - fx) * fy * dz_dx[y0 + 1, x0] + fx * fy * dz_dx[y0 + 1, x0 + 1])
+            gy = ((1 - fx) * (1 - fy) * dz_dy[y0, x0] + fx * (1 - fy) * dz_dy[y0, x0 + 1]
+                  + (1 - fx) * fy * dz_dy[y0 + 1, x0] + fx * fy * dz_dy[y0 + 1, x0 + 1])
+            vx[i] = vx[i] * damping - gx * accel * dt
+            vy[i] = vy[i] * damping - gy * accel * dt
+            x[i] = px + vx[i] * dt
+            y[i] = py + vy[i] * dt
+            life[i] -= dt
+            if life[i] <= 0 or x[i] < 0 or y[i] < 0 or x[i] >= w - 1 or y[i] >= h - 1:
+                x[i] = np.random.random() * (w - 1)
+                y[i] = np.random.random() * (h - 1)
+                vx[i] = 0
+                vy[i] = 0
+                life[i] = (0.5 + 0.5 * np.random.random()) * max_life
+
 class RainSimulation:
-    def __init__(self, count=300):
-        # Initialize particles randomly across the 640x480 space
-        self.particles = np.random.rand(count, 2) 
-        self.particles[:, 0] *= 639 # X bounds
-        self.particles[:, 1] *= 479 # Y bounds
-
-    def update(self, dz_dx, dz_dy):
-        for i in range(len(self.particles)):
-            # Convert float positions to integer indices
-            px = int(self.particles[i][0])
-            py = int(self.particles[i][1])
-
-            # Check bounds BEFORE indexing to avoid IndexError
-            if 0 <= px < 639 and 0 <= py < 479:
-                # Update velocity: Move in the direction of the gradient
-                # dz_dx[py, px] follows [row, col] -> [y, x]
-                self.particles[i][0] -= dz_dx[py, px] * 0.1
-                self.particles[i][1] -= dz_dy[py, px] * 0.1
-            else:
-                # Reset particle if it falls off the edge of the sandbox
-                self.particles[i] = [np.random.uniform(0, 639), np.random.uniform(0, 479)]
\ No newline at end of file
+    """Batched rain: drops run downhill along the terrain gradient.
+
+    Structure-of-arrays layout (x, y, vx, vy, life as separate float32 arrays),
+    so one update is a handful of whole-array operations whatever the drop
+    count. Gradients are sampled bilinearly for every drop in a single
+    cv2.remap call, and dead or escaped drops are respawned in one batch from
+    a preallocated random buffer.
+    """
+    def __init__(self, count=300, width=640, height=480, accel=0.1, damping=0.9,
+                 max_life=90.0, use_numba=False, seed=None, executor=None):
+        self.count = count
+        self.width, self.height = width, height
+        self.accel = np.float32(accel)
+        self.damping = np.float32(damping)
+        self.max_life = np.float32(max_life)
+        self.use_numba = use_numba and numba is not None
+        self.rng = np.random.default_rng(seed)
+        # Optional core.tiled_executor.TiledExecutor: particle rows are split across threads
+        self.executor = executor
+
+        # Padded to whole remap rows; the padding drops are simulated but never drawn
+        rows = -(-count // _ROW)
+        self._state = np.zeros((5, rows, _ROW), np.float32)
+        self._pos = self._state[:2]
+        self.x, self.y, self.vx, self.vy, self.life = (a.reshape(-1) for a in self._state)
+        self._gx = np.empty((rows, _ROW), np.float32)
+        self._gy = np.empty((rows, _ROW), np.float32)
+        self._tmp = np.empty((rows, _ROW), np.float32)
+        self._rand = np.empty((3, rows * _ROW), np.float32)
+        self._dead = np.empty((rows, _ROW), bool)
+        self._out = np.empty((rows, _ROW), bool)
+        self._spawn(np.arange(rows * _ROW))
+
+    @property
+    def particles(self):
+        """(count, 2) view of x, y, for code written against the old array layout."""
+        return self._pos.reshape(2, -1)[:, :self.count].T
+
+    @property
+    def positions(self):
+        """(2, count) view of x and y rows, without the padding drops."""
+        return self._pos.reshape(2, -1)[:, :self.count]
+
+    def _spawn(self, idx):
+        """Fresh random position and lifetime for the drops at flat indices idx."""
+        n = idx.size
+        for row in self._rand:
+            self.rng.random(dtype=np.float32, out=row[:n])
+        rx, ry, rl = self._rand[:, :n]
+        rx *= self.width - 1
+        ry *= self.height - 1
+        rl *= 0.5 * self.max_life
+        rl += 0.5 * self.max_life
+        self.x[idx] = rx
+        self.y[idx] = ry
+        self.vx[idx] = 0
+        self.vy[idx] = 0
+        self.life[idx] = rl
+
+    def update(self, dz_dx, dz_dy, dt=1.0):
+        if self.use_numba:
+            _step_kernel(self.x, self.y, self.vx, self.vy, self.life, dz_dx, dz_dy,
+                         np.float32(dt), self.accel, self.damping, self.max_life)
+            return
+
+        rows = self._state.shape[1]
+        if self.executor is None:
+            self._advance_rows(0, rows, dz_dx, dz_dy, dt)
+        else:
+            # Particle blocks are independent: no halo needed
+            self.executor.map_rows(self._advance_rows, rows, dz_dx, dz_dy, dt)
+
+        # 3. Respawn drops that died or left the sandbox (single-threaded: one RNG)
+        idx = np.flatnonzero(self._dead)
+        if idx.size:
+            self._spawn(idx)
+
+    def _advance_rows(self, r0, r1, dz_dx, dz_dy, dt):
+        """Moves the drops stored in particle rows r0..r1 and flags the dead ones."""
+        x, y, vx, vy, life = self._state[:, r0:r1]
+        gx, gy, tmp = self._gx[r0:r1], self._gy[r0:r1], self._tmp[r0:r1]
+
+        # 1. Bilinear gradient at every drop, one remap per component
+        cv2.remap(dz_dx, x, y, cv2.INTER_LINEAR, dst=gx, borderMode=cv2.BORDER_REPLICATE)
+        cv2.remap(dz_dy, x, y, cv2.INTER_LINEAR, dst=gy, borderMode=cv2.BORDER_REPLICATE)
+
+        # 2. Velocity: damped, accelerated downhill; then move
+        k = np.float32(self.accel * dt)
+        for v, g, p in ((vx, gx, x), (vy, gy, y)):
+            v *= self.damping
+            np.multiply(g, k, out=tmp)
+            v -= tmp
+            np.multiply(v, np.float32(dt), out=tmp)
+            p += tmp
+        life -= np.float32(dt)
+
+        dead, out = self._dead[r0:r1], self._out[r0:r1]
+        np.less_equal(life, 0, out=dead)
+        for p, limit in ((x, self.width - 1), (y, self.height - 1)):
+            np.less(p, 0, out=out)
+            np.logical_or(dead, out, out=dead)
+            np.greater_equal(p, limit, out=out)
+            np.logical_or(dead, out, out=dead)
\ No newline at end of file
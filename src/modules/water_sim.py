@@ -1,33 +1,179 @@
+import math
+import cv2
 import numpy as np
 
 class WaterSim:
-    def __init__(self, height=150, width=200, dx=1.0):
+    """Shallow water on the sand using the virtual pipes model (Mei et al. 2007).
+
+    Every cell is connected to its 4 neighbours by virtual pipes. Each step
+    accelerates the outflow through each pipe by the water-surface height
+    difference, scales a cell's outflows down so it can never send more water
+    than it holds, then moves the water. What leaves one cell arrives in its
+    neighbour, so total volume is conserved exactly (the box walls are closed).
+
+    All state lives in preallocated arrays; the depth field is double buffered
+    (h -> h_next, then swapped) and every operation writes through out= into
+    scratch buffers, so a step allocates nothing. With a TiledExecutor the
+    step runs as two strip-parallel phases (pipes, then transfer).
+    """
+    def __init__(self, height=480, width=640, dx=1.0, gravity=9.81, attenuation=0.995, cfl=0.5,
+                 max_substeps=16, executor=None):
         self.height, self.width, self.dx = height, width, dx
-        self.terrain = np.zeros((height, width), dtype=np.float32)
-        self.water_h = np.zeros((height, width), dtype=np.float32)
-        self.flux_x = np.zeros((height, width), dtype=np.float32)
-        self.flux_y = np.zeros((height, width), dtype=np.float32)
-
-    def update_simulation(self,dt, gravity=9.81, attenuation=0.99):
-        global water_h, flux_x, flux_y
-
-        surface = self.terrain + water_h
-    
-        # Calculate gradients (simplified finite difference)
-        grad_x = (surface[:, 1:] - surface[:, :-1]) / self.dx
-        grad_y = (surface[1:, :] - surface[:-1, :]) / self.dx
-        
-        self.flux_x[:, :-1] -= dt * gravity * (surface[:, 1:] - surface[:, :-1]) / self.dx
-        self.flux_y[:-1, :] -= dt * gravity * (surface[1:, :] - surface[:-1, :]) / self.dx
-        
-        # Apply damping to simulate friction/viscosity
-        self.flux_x *= attenuation
-        self.flux_y *= attenuation
-        
-        # Divergence: Change in height based on flux in/out
-        # dH/dt = - (dFluxX/dx + dFluxY/dy)
-        outflow_x = np.diff(self.flux_x, prepend=0, axis=1)
-        outflow_y = np.diff(self.flux_y, prepend=0, axis=0)
-        
-        self.water_h -= dt * (outflow_x + outflow_y) / self.dx
-        self.water_h = np.maximum(0, self.water_h) # Prevent negative water
\ No newline at end of file
+        self.gravity = gravity
+        self.attenuation = attenuation
+        self.cfl = cfl
+        self.max_substeps = max_substeps
+        shape = (height, width)
+
+        self.terrain = np.zeros(shape, dtype=np.float32)
+        self.water_h = np.zeros(shape, dtype=np.float32)
+        self._water_next = np.zeros(shape, dtype=np.float32)
+        # Outflow through the left/right/top/bottom pipe of each cell (volume per time)
+        self.flux_l = np.zeros(shape, dtype=np.float32)
+        self.flux_r = np.zeros(shape, dtype=np.float32)
+        self.flux_t = np.zeros(shape, dtype=np.float32)
+        self.flux_b = np.zeros(shape, dtype=np.float32)
+
+        self._surfaces = {} # (y0, y1) -> strip surface buffer with halo rows
+        self._tmp = np.zeros(shape, dtype=np.float32)
+        self._out_sum = np.zeros(shape, dtype=np.float32)
+        self.last_substeps = 0
+        # Optional core.tiled_executor.TiledExecutor to spread each step over row strips
+        self.executor = executor
+
+    # --- Coupling -------------------------------------------------------------
+    def set_terrain(self, elevation):
+        """Takes the live TerrainProcessor elevation (mm); resampled if the grids differ."""
+        if elevation.shape == self.terrain.shape:
+            np.copyto(self.terrain, elevation)
+        else:
+            cv2.resize(elevation, (self.width, self.height), dst=self.terrain, interpolation=cv2.INTER_AREA)
+
+    def add_water(self, x, y, radius, depth):
+        """Pours a disc of water `depth` deep centred on cell (x, y)."""
+        y0, y1 = max(0, y - radius), min(self.height, y + radius + 1)
+        x0, x1 = max(0, x - radius), min(self.width, x + radius + 1)
+        yy, xx = np.ogrid[y0:y1, x0:x1]
+        disc = (xx - x) ** 2 + (yy - y) ** 2 <= radius * radius
+        self.water_h[y0:y1, x0:x1][disc] += depth
+
+    def rain(self, depth):
+        """Uniform rainfall over the whole box."""
+        self.water_h += np.float32(depth)
+
+    def total_volume(self):
+        return float(self.water_h.sum(dtype=np.float64)) * self.dx * self.dx
+
+    # --- Time stepping --------------------------------------------------------
+    def max_stable_dt(self):
+        """CFL limit for gravity waves: dt <= cfl * dx / sqrt(g * h_max)."""
+        h_max = float(self.water_h.max())
+        if h_max <= 0:
+            return math.inf
+        return self.cfl * self.dx / math.sqrt(self.gravity * h_max)
+
+    def step(self, frame_dt):
+        """Advances by frame_dt using as many CFL-safe substeps as needed.
+
+        Substeps are capped at max_substeps; beyond that the simulation runs
+        in slow motion rather than going unstable.
+        """
+        dt_max = self.max_stable_dt()
+        n = 1 if math.isinf(dt_max) else min(self.max_substeps, max(1, math.ceil(frame_dt / dt_max)))
+        dt = min(frame_dt / n, dt_max)
+        for _ in range(n):
+            self.update_simulation(dt)
+        self.last_substeps = n
+
+    def update_simulation(self, dt, gravity=None, attenuation=None):
+        """One virtual-pipes step of length dt (caller is responsible for the CFL limit)."""
+        g = self.gravity if gravity is None else gravity
+        att = np.float32(self.attenuation if attenuation is None else attenuation)
+        if self.executor is None:
+            self._pipes(0, self.height, dt, g, att)
+            self._transfer(0, self.height, dt)
+        else:
+            # Two barriers: transfer reads the fluxes of the neighbouring strips' edge rows
+            self.executor.map_rows(self._pipes, self.height, dt, g, att)
+            self.executor.map_rows(self._transfer, self.height, dt)
+        self.water_h, self._water_next = self._water_next, self.water_h
+
+    def _strip_surface(self, y0, y1):
+        """Per-strip terrain+water buffer covering rows y0-1 .. y1 (one halo row each side)."""
+        buf = self._surfaces.get((y0, y1))
+        if buf is None:
+            buf = np.zeros((min(self.height, y1 + 1) - max(0, y0 - 1), self.width), np.float32)
+            self._surfaces[(y0, y1)] = buf
+        return buf
+
+    def _pipes(self, y0, y1, dt, g, att):
+        """Steps 1-2 for rows y0..y1: accelerate pipe flow, then limit outflow. Writes rows y0..y1 only."""
+        area = self.dx * self.dx
+        c = np.float32(dt * g * self.dx) # dt * g * pipe cross-section / pipe length
+        a0 = max(0, y0 - 1)
+        H = self._strip_surface(y0, y1)
+        np.add(self.terrain[a0:a0 + len(H)], self.water_h[a0:a0 + len(H)], out=H)
+        o, n = y0 - a0, y1 - y0 # Strip row r is H[o + r]
+        tmp, out_sum = self._tmp[y0:y1], self._out_sum[y0:y1]
+        fl, fr, ft, fb = (f[y0:y1] for f in (self.flux_l, self.flux_r, self.flux_t, self.flux_b))
+
+        # 1. Accelerate pipe flow by the surface height difference (walls: no flow out of the box)
+        d = tmp[:, :-1]
+        np.subtract(H[o:o + n, :-1], H[o:o + n, 1:], out=d)   # H(x) - H(x+1)
+        d *= c
+        fr[:, :-1] *= att
+        fr[:, :-1] += d
+        fl[:, 1:] *= att
+        fl[:, 1:] -= d
+        nb = min(y1, self.height - 1) - y0                    # Rows that have a row below
+        d = tmp[:nb]
+        np.subtract(H[o:o + nb], H[o + 1:o + 1 + nb], out=d)  # H(y) - H(y+1)
+        d *= c
+        fb[:nb] *= att
+        fb[:nb] += d
+        s0 = 1 if y0 == 0 else 0                              # Rows that have a row above
+        d = tmp[s0:]
+        np.subtract(H[o + s0:o + n], H[o + s0 - 1:o + n - 1], out=d) # H(y) - H(y-1)
+        d *= c
+        ft[s0:] *= att
+        ft[s0:] += d
+        for f in (fl, fr, ft, fb):
+            np.maximum(f, 0, out=f)
+        fr[:, -1] = 0
+        fl[:, 0] = 0
+        if y1 == self.height:
+            fb[-1, :] = 0
+        if y0 == 0:
+            ft[0, :] = 0
+
+        # 2. A cell can't send more than it holds: K = min(1, h * area / (sum_out * dt))
+        np.add(fl, fr, out=out_sum)
+        out_sum += ft
+        out_sum += fb
+        np.multiply(out_sum, np.float32(dt), out=tmp)
+        np.maximum(tmp, np.float32(1e-12), out=tmp)
+        np.divide(self.water_h[y0:y1], tmp, out=tmp)
+        tmp *= np.float32(area)
+        np.minimum(tmp, 1, out=tmp)
+        for f in (fl, fr, ft, fb):
+            f *= tmp
+        out_sum *= tmp
+
+    def _transfer(self, y0, y1, dt):
+        """Step 3 for rows y0..y1: h_next = h + dt/area * (inflow - outflow). Reads one halo row of flux."""
+        s = np.float32(dt / (self.dx * self.dx))
+        hn = self._water_next[y0:y1]
+        tmp = self._tmp[y0:y1]
+        np.multiply(self._out_sum[y0:y1], -s, out=hn)
+        hn += self.water_h[y0:y1]
+
+        fl, fr, ft, fb = self.flux_l, self.flux_r, self.flux_t, self.flux_b
+        top, bottom = max(y0, 1), min(y1, self.height - 1)
+        for dst, src in ((hn[:, 1:], fr[y0:y1, :-1]),                  # from the left neighbour
+                         (hn[:, :-1], fl[y0:y1, 1:]),                  # from the right neighbour
+                         (hn[top - y0:], fb[top - 1:y1 - 1]),          # from the row above
+                         (hn[:bottom - y0], ft[y0 + 1:bottom + 1])):   # from the row below
+            t = tmp[:src.shape[0], :src.shape[1]]
+            np.multiply(src, s, out=t)
+            dst += t
+        np.maximum(hn, 0, out=hn) # Rounding noise only; K keeps real depths positive
\ No newline at end of file
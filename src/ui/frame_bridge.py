@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+from PySide6.QtGui import QImage
+
+# Channel order of a (H, W, 3) uint8 frame -> the QImage format that reads it as-is
+_FORMATS = {"rgb": QImage.Format_RGB888, "bgr": QImage.Format_BGR888}
+
+def qimage_view(array, order="bgr"):
+    """QImage sharing memory with a C-contiguous uint8 array (no copy).
+
+    (H, W) -> Grayscale8, (H, W, 3) -> RGB888/BGR888 by `order`,
+    (H, W, 4) BGRx -> RGB32. The caller must keep `array` alive and
+    unchanged for as long as the image is painted; FrameBridge does that.
+    """
+    h, w = array.shape[:2]
+    if array.ndim == 2:
+        fmt = QImage.Format_Grayscale8
+    elif array.shape[2] == 4:
+        fmt = QImage.Format_RGB32
+    else:
+        fmt = _FORMATS[order]
+    return QImage(array, w, h, array.strides[0], fmt)
+
+def fit_size(src_size, target_size):
+    """Largest (w, h) with src_size's aspect ratio that fits in target_size (Qt.KeepAspectRatio)."""
+    sw, sh = src_size
+    tw, th = target_size
+    scale = min(tw / sw, th / sh)
+    return max(1, int(sw * scale)), max(1, int(sh * scale))
+
+class FrameBridge:
+    """A persistent numpy buffer and the QImage that wraps it, reused frame after frame.
+
+    upload() copies (or resizes) a frame into the buffer and returns the
+    same QImage every time; nothing is allocated unless the size changes.
+    The bridge holds the ndarray, so the QImage's memory stays valid as long
+    as the bridge does. Frames must already be in `order` ('rgb' or 'bgr'):
+    pick the renderer's output order so Qt never swaps channels.
+    """
+    def __init__(self, order="bgr"):
+        self.order = order
+        self.buffer = None
+        self.image = None
+        self._fit = {} # (src_size, target_size) -> scaled size
+
+    def _ensure(self, shape):
+        if self.buffer is None or self.buffer.shape != shape:
+            self.buffer = np.empty(shape, np.uint8)
+            self.image = qimage_view(self.buffer, self.order)
+
+    def upload(self, frame):
+        """Copies a uint8 frame into the buffer; returns the bridge's QImage."""
+        self._ensure(frame.shape)
+        np.copyto(self.buffer, frame)
+        return self.image
+
+    def upload_scaled(self, frame, target_size, interpolation=cv2.INTER_AREA):
+        """Resizes a frame straight into the buffer to fit target_size (w, h), keeping its aspect ratio.
+
+        Replaces QPixmap.scaled(..., Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        with one cv2.resize into reused memory; the fitted size is cached.
+        """
+        h, w = frame.shape[:2]
+        key = ((w, h), tuple(target_size))
+        size = self._fit.get(key)
+        if size is None:
+            if len(self._fit) > 16: # Window resizes: don't keep every size ever seen
+                self._fit.clear()
+            size = self._fit[key] = fit_size((w, h), target_size)
+        if size == (w, h):
+            return self.upload(frame)
+        self._ensure((size[1], size[0]) + frame.shape[2:])
+        cv2.resize(frame, size, dst=self.buffer, interpolation=interpolation)
+        return self.image
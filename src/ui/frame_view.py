@@ -0,0 +1,35 @@
+from PySide6.QtWidgets import QLabel
+from PySide6.QtGui import QPainter
+from PySide6.QtCore import Qt, Signal
+
+class FrameView(QLabel):
+    """QLabel that paints a ready-made QImage, centred on black.
+
+    set_image() only swaps the reference and schedules a repaint; there is no
+    per-frame QPixmap conversion or scaling on the GUI thread. Until the first
+    image arrives it behaves like a normal label (e.g. "Initializing...").
+    """
+    resized = Signal(int, int)
+
+    def __init__(self, text=""):
+        super().__init__(text)
+        self._image = None
+
+    def set_image(self, image):
+        self._image = image
+        self.update()
+
+    def paintEvent(self, event):
+        if self._image is None:
+            super().paintEvent(event)
+            return
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        x = (self.width() - self._image.width()) // 2
+        y = (self.height() - self._image.height()) // 2
+        painter.drawImage(x, y, self._image)
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resized.emit(self.width(), self.height())
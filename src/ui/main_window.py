@@ -112,13 +112,26 @@ import os
 from PySide6.QtWidgets import (QMainWindow, QLabel, QVBoxLayout, QWidget, QProgressBar,
                              QPushButton, QSlider, QHBoxLayout, QFrame, QComboBox, QApplication)
 from PySide6.QtGui import QImage, QPixmap, QFont, QPen, QPainter
-from PySide6.QtCore import Qt, Slot, Signal, QRect
+from PySide6.QtCore import Qt, Slot, Signal, QRect, QTimer
 
 from core.kinect import KinectWorker
 from core.processor import TerrainProcessor, TerrainProcessor_Smoothened
 from modules.color_maps import ColorMapManager
 from modules.contour_match import ContourMatchManager
+from modules.isolines import IsolineEngine
 from core.KinectProjector import KinectProjector
+from core.renderer import TerrainRenderer
+from core.projector_warp import ProjectorWarp, DepthAwareWarp
+from core.scheduler import SimulationScheduler
+from core.change_detector import ChangeDetector
+from core.render_worker import RenderWorker
+from core.tiled_executor import TiledExecutor
+from modules.water_sim import WaterSim
+from modules.rain_sim import RainSimulation
+from modules.particle_render import ParticleCompositor, WaterOverlay
+from ui.frame_view import FrameView
+from ui.presenter import create_presenter
+from ui.frame_bridge import FrameBridge
 
 class ProjectorWindow(QWidget):
     """The dedicated full-screen window for the projector (Secondary Screen)."""
@@ -130,20 +143,20 @@ class ProjectorWindow(QWidget):
         target_screen = screens[screen_index] if len(screens) > screen_index else screens[0]
         self.setGeometry(target_screen.geometry())
         
-        self.label = QLabel(self)
-        self.label.setAlignment(Qt.AlignCenter)
-        self.label.setStyleSheet("background-color: black;")
+        # OpenGL (persistent texture, vsync) when available, raster QImage otherwise
+        self.presenter = create_presenter(self)
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)
-        self.layout.addWidget(self.label)
+        self.layout.addWidget(self.presenter)
         self.showFullScreen()
 
+    def show_image(self, image):
+        """Paints a ready-made QImage (from the RenderWorker) on the next refresh."""
+        self.presenter.present(image)
+
     def display_pattern(self, pattern_img):
-        pattern_img = np.ascontiguousarray(pattern_img)
-        h, w, ch = pattern_img.shape
-        q_img = QImage(pattern_img.data, w, h, ch * w, QImage.Format_RGB888).rgbSwapped()
-        self.label.setPixmap(QPixmap.fromImage(q_img))
-        self.label.repaint()
+        """Shows a BGR numpy frame: one copy into the presenter's buffer, painted on the next refresh."""
+        self.presenter.present(pattern_img)
 
 class ARSMainWindow(QMainWindow):
     def __init__(self):
@@ -160,9 +173,32 @@ class ARSMainWindow(QMainWindow):
         
         self.cmap_manager = ColorMapManager()
         self.dem_manager = ContourMatchManager()
+        # Rendered in RGB order (via the LUT) so the Qt views never swap channels.
+        # Starts with the one-pixel band edges (FAST); the SMOOTH toggle switches to anti-aliased
+        # isolines, every 5th one bolder and labelled, cached per change-detector tile
+        self.isolines = IsolineEngine(tile=32, major_every=5)
+        self.renderer = TerrainRenderer(-250, 250, contour_interval=20, channel_order="rgb")
+        self.projector_warp = ProjectorWarp((1024, 768), scale=1.05)
+        self.depth_warp = None # DepthAwareWarp once a solvePnP calibration is loaded
+
+        # Physics runs on its own fixed-timestep thread, fed with terrain from process_frame
+        self.sim_executor = TiledExecutor()
+        self.scheduler = SimulationScheduler(water=WaterSim(executor=self.sim_executor),
+                                             rain=RainSimulation(count=3000, executor=self.sim_executor))
+        self.scheduler.water_enabled = False
+        self.scheduler.rain_enabled = False
+        self.rain_compositor = ParticleCompositor(640, 480, color=(0, 0, 255))  # RGB
+        self.water_overlay = WaterOverlay(640, 480, color=(0, 120, 255))
         
+        self.roi_bridge = FrameBridge() # Depth preview for ROI selection
+        # Only tiles where the sand moved > 2 mm are re-coloured and re-warped
+        self.change_detector = ChangeDetector(tile=32, threshold_mm=2.0)
+        self.composite = np.zeros((480, 640, 3), np.uint8) # Terrain + simulation overlays
+
         # --- State Variables ---
         self.contour_interval = 20
+        self.sea_level = 0
+        self.elevation_range = 250
         self.capture_next_as_base = False
         self.filtering_enabled = False
         self.is_calibrating_roi = False
@@ -171,9 +207,20 @@ class ARSMainWindow(QMainWindow):
         self.init_ui()
         
         # --- Data Stream ---
+        # Kinect thread -> RenderWorker (process_frame) -> GUI thread only paints the result
+        self.render_worker = RenderWorker(self.process_frame, order="rgb")
+        self.render_worker.images_ready.connect(self.show_images)
+        self.display_label.resized.connect(self.render_worker.set_operator_size)
         self.worker = KinectWorker(alpha=0.3)
-        self.worker.depth_frame_ready.connect(self.update_frame)
+        self.worker.add_listener(self.render_worker.submit)
+        self.render_worker.start()
         self.worker.start()
+        self.scheduler.start()
+
+        # Pipeline health: queue depth and per-stage timings, refreshed once a second
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(1000)
 
         # --- Load Calibration Matrix ---
         self.load_calibration()
@@ -195,6 +242,19 @@ class ARSMainWindow(QMainWindow):
         self.interval_slider.setValue(self.contour_interval)
         self.interval_slider.valueChanged.connect(self.update_interval_value)
 
+        # Sea level and colour range only move the renderer's index affine: smooth enough to animate tides
+        self.sea_label = QLabel(f"Sea Level: {self.sea_level} mm")
+        self.sea_slider = QSlider(Qt.Horizontal)
+        self.sea_slider.setRange(-100, 100)
+        self.sea_slider.setValue(self.sea_level)
+        self.sea_slider.valueChanged.connect(self.update_sea_level)
+
+        self.range_label = QLabel(f"Elevation Range: ±{self.elevation_range} mm")
+        self.range_slider = QSlider(Qt.Horizontal)
+        self.range_slider.setRange(50, 500)
+        self.range_slider.setValue(self.elevation_range)
+        self.range_slider.valueChanged.connect(self.update_elevation_range)
+
         self.calibrate_btn = QPushButton("Calibrate Kinect (Base)")
         self.calibrate_btn.clicked.connect(self.reset_base_plane)
 
@@ -203,25 +263,44 @@ class ARSMainWindow(QMainWindow):
 
         self.cmap_combo = QComboBox()
         self.cmap_combo.addItems(self.cmap_manager.get_names())
-        self.cmap_combo.currentTextChanged.connect(self.cmap_manager.set_map_by_name)
+        self.cmap_combo.currentTextChanged.connect(self.update_color_map)
 
         self.roi_btn = QPushButton("Set ROI Boundary")
         self.roi_btn.clicked.connect(self.enter_roi_mode)
 
+        self.rain_btn = QPushButton("Rain Simulation: OFF")
+        self.rain_btn.clicked.connect(self.toggle_rain)
+
+        self.water_btn = QPushButton("Water Simulation: OFF")
+        self.water_btn.clicked.connect(self.toggle_water)
+
+        self.contour_btn = QPushButton("Contour Lines: FAST")
+        self.contour_btn.clicked.connect(self.toggle_contour_style)
+
         # Assemble Sidebar
         side_layout.addWidget(QLabel("GeoBox Controls"))
         side_layout.addWidget(self.slider_label)
         side_layout.addWidget(self.interval_slider)
+        side_layout.addWidget(self.contour_btn)
+        side_layout.addWidget(self.sea_label)
+        side_layout.addWidget(self.sea_slider)
+        side_layout.addWidget(self.range_label)
+        side_layout.addWidget(self.range_slider)
         side_layout.addSpacing(20)
         side_layout.addWidget(self.calibrate_btn)
         side_layout.addWidget(self.processor_btn)
         side_layout.addWidget(QLabel("Color Map Selection"))
         side_layout.addWidget(self.cmap_combo)
         side_layout.addWidget(self.roi_btn)
+        side_layout.addWidget(self.rain_btn)
+        side_layout.addWidget(self.water_btn)
         side_layout.addStretch()
+        self.stats_label = QLabel("")
+        self.stats_label.setStyleSheet("font-family: monospace; font-size: 10px;")
+        side_layout.addWidget(self.stats_label)
 
         # Main Display
-        self.display_label = QLabel("Initializing...")
+        self.display_label = FrameView("Initializing...")
         self.display_label.setAlignment(Qt.AlignCenter)
         self.display_label.setStyleSheet("background-color: #000;")
         
@@ -237,11 +316,16 @@ class ARSMainWindow(QMainWindow):
         self.setCentralWidget(container)
 
     def load_calibration(self):
-        """Attempts to load the 3x3 Homography Matrix from the utility."""
+        """Loads the depth-aware projection (calibration.json) and/or the flat 3x3 Homography."""
+        if os.path.exists("calibration.json") and self.calibrator.load_calibration("calibration.json"):
+            self.depth_warp = DepthAwareWarp(self.calibrator, (1024, 768))
+            print("Successfully loaded Projector Calibration (depth-aware warp).")
+
         file_path = "homography_matrix.npy"
         if os.path.exists(file_path):
             self.calibrator.homography = np.load(file_path)
             self.calibrator._is_calibrated = True
+            self.projector_warp.set_homography(self.calibrator.homography)
             print("Successfully loaded Projector Homography.")
         else:
             print("No Calibration File Found. Projector output will not be warped.")
@@ -256,68 +340,144 @@ class ARSMainWindow(QMainWindow):
         # Since we moved to a standalone app, this could just show a reminder
         print("Please use the standalone Calibration Utility for projector alignment.")
 
-    @Slot(np.ndarray)
-    def update_frame(self, raw_frame):
-        self.last_raw_frame = raw_frame.copy()
+    def process_frame(self, frame, timer):
+        """Runs on the RenderWorker thread: DepthFrame (float32 mm) -> (operator BGR, projector BGR or None)."""
+        self.last_raw_frame = frame.depth.copy()
 
         # 1. Handle Base Plane Calibration
         if self.capture_next_as_base:
             if self.active_processor.roi is None:
                 self.active_processor.update_roi(0, 0, 640, 480)
-            self.active_processor.set_base_plane(raw_frame)
+            self.active_processor.set_base_plane(frame)
             self.capture_next_as_base = False
-            return
-
-        # 2. Elevation Processing
-        elevation = self.active_processor.calculate_elevation(raw_frame)
-        elevation_smooth = cv2.GaussianBlur(elevation, (5, 5), 0)
-
-        # 3. Coloring and Contours
-        norm_for_lut = np.clip(((elevation_smooth + 250) / 500) * 255, 0, 255).astype(np.uint8)
-        color_terrain = self.cmap_manager.apply(norm_for_lut)
-
-        quantized = (elevation_smooth // self.contour_interval) * self.contour_interval
-        contours = cv2.Canny(quantized.astype(np.uint8), 1, 1)
-        color_terrain[contours > 0] = [0, 0, 0]
-
-        # 4. Render to Main GUI (Laptop screen)
-        h, w, ch = color_terrain.shape
-        qt_img = QImage(color_terrain.data.tobytes(), w, h, ch * w, QImage.Format_RGB888).rgbSwapped()
-        self.display_label.setPixmap(QPixmap.fromImage(qt_img).scaled(
-            self.display_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-
-        # 5. Render to Projector (Warped Perspective)
-        if self.calibrator._is_calibrated:
-            # Magic-Sand often uses a 1.05x or 1.1x scale factor 
-            # to "over-fill" the sandbox and hide black borders
-            scale_factor = 1.05
-            M = self.calibrator.homography.copy()
-            M[0,0] *= scale_factor
-            M[1,1] *= scale_factor
-            
-            warped = cv2.warpPerspective(
-                color_terrain, 
-                M, 
-                (1024, 768),
-                flags=cv2.INTER_LINEAR
-            )
-            self.projector_ui.display_pattern(warped)
+            return None, None
+
+        # 2. Elevation Processing, and which tiles of it moved enough to redraw
+        with timer.stage("elevation"):
+            elevation = self.active_processor.calculate_elevation(frame)
+            self.change_detector.update(elevation)
+
+        # Physics picks the new terrain up on its next tick; this never waits for it
+        if self.scheduler.water_enabled or self.scheduler.rain_enabled:
+            self.scheduler.submit_terrain(elevation)
+
+        # 3. Coloring and Contours (blur, LUT and contour lines; only the dirty tiles)
+        with timer.stage("render"):
+            color_terrain = self.renderer.render(elevation, self.cmap_manager.get_lut(),
+                                                 self.change_detector.rects())
+        changed = self.renderer.drawn_rects
+
+        # Overlay the simulation state, interpolated to this moment between physics ticks.
+        # Drawn on a copy: the renderer's buffer must keep only terrain for the next incremental frame
+        if self.scheduler.water_enabled or self.scheduler.rain_enabled:
+            with timer.stage("overlay"):
+                np.copyto(self.composite, color_terrain)
+                color_terrain, changed = self.composite, None
+                water, drops = self.scheduler.sample()
+                if water is not None and self.scheduler.water_enabled:
+                    self.water_overlay.render(color_terrain, water)
+                if drops is not None and self.scheduler.rain_enabled:
+                    self.rain_compositor.render(color_terrain, drops[0], drops[1])
+
+        # 4. Projector image (Warped Perspective)
+        warped = None
+        with timer.stage("warp"):
+            # Preferred: per-pixel map that follows the sand height (re-solved only where it moved)
+            if self.depth_warp is not None:
+                warped = self.depth_warp.warp(color_terrain, frame.depth)
+            # Fallback: flat homography; remap tables (incl. the 1.05x over-fill) built once per calibration
+            elif self.projector_warp.ready:
+                warped = self.projector_warp.warp(color_terrain, changed)
+        return color_terrain, warped
+
+    @Slot()
+    def show_images(self):
+        """GUI thread: swap in the newest images from the RenderWorker and schedule a paint."""
+        operator_img, projector_img = self.render_worker.take()
+        if operator_img is not None:
+            self.display_label.set_image(operator_img)
+        if projector_img is not None:
+            self.projector_ui.show_image(projector_img)
+
+    def update_stats(self):
+        stats = self.render_worker.stats()
+        lines = [f"queue: {stats['queue_depth']}  skipped: {stats['skipped']}",
+                 f"dirty: {100 * self.change_detector.dirty_fraction:.0f}%"]
+        lines += [f"{name:<10}{ms:6.1f} ms" for name, ms in stats["stage_ms"].items()]
+        lines.append(f"physics   {self.scheduler.last_tick_ms:6.1f} ms")
+        self.stats_label.setText("\n".join(lines))
+
+    def toggle_rain(self):
+        self.scheduler.rain_enabled = not self.scheduler.rain_enabled
+        self.rain_btn.setText(f"Rain Simulation: {'ON' if self.scheduler.rain_enabled else 'OFF'}")
+
+    def toggle_water(self):
+        water_on = not self.scheduler.water_enabled
+        if water_on:
+            # Start from a uniform shower that drains downhill (applied on the physics thread)
+            self.scheduler.post(self.scheduler.water.rain, 2.0)
+        self.scheduler.water_enabled = water_on
+        self.water_btn.setText(f"Water Simulation: {'ON' if water_on else 'OFF'}")
+
+    def toggle_contour_style(self):
+        """Labelled vector isolines (SMOOTH) or the cheaper one-pixel band edges (FAST)."""
+        smooth = self.renderer.isolines is None
+        self.render_worker.post(setattr, self.renderer, "isolines", self.isolines if smooth else None)
+        self.contour_btn.setText(f"Contour Lines: {'SMOOTH' if smooth else 'FAST'}")
+
+    def closeEvent(self, event):
+        self.worker.stop()
+        self.render_worker.stop()
+        self.scheduler.stop()
+        self.sim_executor.shutdown()
+        super().closeEvent(event)
 
     def toggle_filtering(self):
         self.filtering_enabled = not self.filtering_enabled
-        self.active_processor = self.processor_filtered if self.filtering_enabled else self.processor_raw
+        # process_frame reads active_processor several times per frame: swap it between frames
+        processor = self.processor_filtered if self.filtering_enabled else self.processor_raw
+        self.render_worker.post(self.switch_processor, processor)
         self.processor_btn.setText(f"Spatial Filtering: {'ON' if self.filtering_enabled else 'OFF'}")
 
+    def switch_processor(self, processor):
+        """Render thread: makes `processor` the active one, with the current ROI and base plane."""
+        current = self.active_processor
+        if processor is current:
+            return
+        if current.roi is not None:
+            processor.update_roi(*current.roi)
+        if current.base_depth is not None:
+            processor.set_base_plane(current.base_depth)
+        self.active_processor = processor
+
+    def update_roi(self, x, y, w, h):
+        """Render thread: applies a sensor-space ROI to whichever processor is active by then."""
+        self.active_processor.update_roi(x, y, w, h)
+
     def update_interval_value(self, value):
         self.contour_interval = value
+        self.render_worker.post(self.renderer.set_contour_interval, value)
         self.slider_label.setText(f"Contour Interval: {self.contour_interval}")
 
+    def update_color_map(self, name):
+        # The render thread reads the colour tables mid-frame: switch them between frames
+        self.render_worker.post(self.cmap_manager.set_map_by_name, name)
+
+    def update_sea_level(self, value):
+        self.sea_level = value
+        self.render_worker.post(self.renderer.set_sea_level, value)
+        self.sea_label.setText(f"Sea Level: {value} mm")
+
+    def update_elevation_range(self, value):
+        self.elevation_range = value
+        self.render_worker.post(self.renderer.set_range, -value, value)
+        self.range_label.setText(f"Elevation Range: ±{value} mm")
+
     def enter_roi_mode(self):
         if hasattr(self, 'last_raw_frame'):
             visible_frame = cv2.normalize(self.last_raw_frame, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-            h, w = visible_frame.shape
-            qimg = QImage(visible_frame.data, w, h, w, QImage.Format_Grayscale8)
-            pixmap = QPixmap.fromImage(qimg).scaled(self.display_label.size(), Qt.KeepAspectRatio)
+            label_size = (self.display_label.width(), self.display_label.height())
+            pixmap = QPixmap.fromImage(self.roi_bridge.upload_scaled(visible_frame, label_size))
             self.roi_selector.setPixmap(pixmap)
             self.display_label.hide()
             self.centralWidget().layout().replaceWidget(self.display_label, self.roi_selector)
@@ -340,7 +500,9 @@ class ARSMainWindow(QMainWindow):
         sensor_w = int(min(w / scale, 640 - sensor_x))
         sensor_h = int(min(h / scale, 480 - sensor_y))
 
-        self.active_processor.update_roi(sensor_x, sensor_y, sensor_w, sensor_h)
+        # The processors belong to the render thread; apply the change between frames
+        self.render_worker.post(self.update_roi, sensor_x, sensor_y, sensor_w, sensor_h)
+        self.dem_manager.set_roi(sensor_x, sensor_y, sensor_w, sensor_h) # Match targets follow the sandbox
         
         # Reset UI view
         self.roi_selector.hide()
@@ -0,0 +1,208 @@
+import os
+
+import cv2
+import numpy as np
+from PySide6.QtWidgets import QWidget
+from PySide6.QtGui import QImage, QPainter, QSurfaceFormat, QOpenGLContext
+from PySide6.QtCore import Qt, QRect, QRectF
+
+from ui.frame_bridge import qimage_view
+
+try:
+    from PySide6.QtOpenGLWidgets import QOpenGLWidget
+    from PySide6.QtOpenGL import QOpenGLTexture, QOpenGLTextureBlitter, QOpenGLPixelTransferOptions
+except ImportError: # Optional: the raster presenter needs only QtWidgets
+    QOpenGLWidget = None
+
+class FrameStore:
+    """The frame a presenter shows next, kept in one persistent buffer.
+
+    numpy BGR frames are expanded into a BGRx buffer allocated once per size
+    and wrapped by a Format_RGB32 QImage. On little-endian machines that is
+    exactly OpenCV's byte order plus a padding byte, so the upload is a single
+    cvtColor pass (no rgbSwapped() copy, no QPixmap conversion), and RGB32
+    is the raster backing store's native format, so painting is a plain blit.
+    QImages, e.g. from the RenderWorker, are display-ready and only referenced.
+    """
+    def __init__(self):
+        self.buffer = None
+        self._buffer_image = None
+        self.image = None
+        self.serial = 0 # Bumped on every upload, so GPU copies know when they are stale
+
+    def upload(self, frame):
+        self.serial += 1
+        if isinstance(frame, QImage):
+            self.image = frame
+            return
+        h, w = frame.shape[:2]
+        if self.buffer is None or self.buffer.shape[:2] != (h, w):
+            self.buffer = np.empty((h, w, 4), np.uint8)
+            self._buffer_image = qimage_view(self.buffer)
+        code = cv2.COLOR_GRAY2BGRA if frame.ndim == 2 else cv2.COLOR_BGR2BGRA
+        cv2.cvtColor(frame, code, dst=self.buffer)
+        self.image = self._buffer_image
+
+    def pixels(self):
+        """(H, bytes_per_line) uint8 view of the current frame's memory."""
+        image = self.image
+        if image is self._buffer_image:
+            return self.buffer.reshape(self.buffer.shape[0], -1)
+        bits = np.frombuffer(image.constBits(), np.uint8, count=image.sizeInBytes())
+        return bits.reshape(image.height(), image.bytesPerLine())
+
+    def fit_rect(self, width, height):
+        """Where the frame goes in a width x height area: 1:1 if it fits exactly, else scaled, centred."""
+        iw, ih = self.image.width(), self.image.height()
+        if (iw, ih) == (width, height):
+            return QRect(0, 0, iw, ih)
+        scale = min(width / iw, height / ih)
+        tw, th = int(iw * scale), int(ih * scale)
+        return QRect((width - tw) // 2, (height - th) // 2, tw, th)
+
+    def paint(self, painter, width, height):
+        """Frame drawn 1:1 when it fits the widget, else scaled to fit on black."""
+        if self.image is None:
+            painter.fillRect(0, 0, width, height, Qt.black)
+            return
+        rect = self.fit_rect(width, height)
+        if rect.size() == self.image.size():
+            if rect.width() != width or rect.height() != height:
+                painter.fillRect(0, 0, width, height, Qt.black)
+            painter.drawImage(rect.topLeft(), self.image)
+            return
+        painter.fillRect(0, 0, width, height, Qt.black)
+        painter.drawImage(rect, self.image)
+
+class RasterPresenter(QWidget):
+    """Software presenter: paints the stored frame in paintEvent after an update().
+
+    update() is asynchronous and coalesced by Qt, so presenting faster than
+    the screen refreshes just replaces the frame that gets painted next.
+    """
+    backend = "raster"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = FrameStore()
+        # We paint every pixel ourselves: skip Qt's background fill
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setAttribute(Qt.WA_NoSystemBackground)
+
+    def present(self, frame):
+        """frame: (H, W, 3) BGR uint8 array or a display-ready QImage."""
+        self.store.upload(frame)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        self.store.paint(painter, self.width(), self.height())
+        painter.end()
+
+if QOpenGLWidget is not None:
+    class GLPresenter(QOpenGLWidget):
+        """OpenGL presenter: one persistent texture, vsync'd swaps, one frame in flight.
+
+        The texture is allocated once per frame size; each painted frame is a
+        single glTexSubImage upload straight from the RGB, BGR or BGRx bytes
+        (pixel_formats; the driver swizzles, no CPU channel swap) and one
+        textured quad via QOpenGLTextureBlitter. Swap interval 1 ties presentation to the
+        projector's refresh. present() only requests a repaint once the previous
+        frame has been swapped (frameSwapped); frames arriving in between just
+        replace the stored one, so at most one upload happens per refresh and
+        it is always the newest frame.
+        """
+        backend = "opengl"
+        # QImage format -> (texture pixel format, bytes per pixel) of its bytes as stored
+        pixel_formats = {
+            QImage.Format_RGB32: (QOpenGLTexture.BGRA, 4), # BGRx on little-endian
+            QImage.Format_RGB888: (QOpenGLTexture.RGB, 3),
+            QImage.Format_BGR888: (QOpenGLTexture.BGR, 3),
+        }
+
+        def __init__(self, parent=None):
+            super().__init__(parent)
+            fmt = QSurfaceFormat.defaultFormat()
+            fmt.setSwapInterval(1)
+            self.setFormat(fmt)
+            self.store = FrameStore()
+            self._texture = None
+            self._uploaded = 0 # store.serial currently in the texture
+            self._blitter = None
+            self._transfer = QOpenGLPixelTransferOptions()
+            self._transfer.setAlignment(1)
+            self._pending = False
+            self.frameSwapped.connect(self._on_swapped)
+
+        def present(self, frame):
+            """frame: (H, W, 3) BGR uint8 array or a display-ready QImage."""
+            if isinstance(frame, QImage) and frame.format() not in self.pixel_formats:
+                frame = frame.convertToFormat(QImage.Format_RGB32)
+            self.store.upload(frame)
+            if not self._pending:
+                # Hidden widgets never swap; don't wait for a frameSwapped that won't come
+                self._pending = self.isVisible()
+                self.update()
+
+        def _on_swapped(self):
+            self._pending = False
+
+        def initializeGL(self):
+            self._blitter = QOpenGLTextureBlitter()
+            self._blitter.create()
+
+        def _upload(self):
+            image = self.store.image
+            w, h = image.width(), image.height()
+            if self._texture is None or (self._texture.width(), self._texture.height()) != (w, h):
+                if self._texture is not None:
+                    self._texture.destroy()
+                self._texture = QOpenGLTexture(QOpenGLTexture.Target2D)
+                self._texture.setFormat(QOpenGLTexture.RGB8_UNorm)
+                self._texture.setSize(w, h)
+                self._texture.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
+                self._texture.setWrapMode(QOpenGLTexture.ClampToEdge)
+                self._texture.allocateStorage()
+            pixels = self.store.pixels()
+            # Uploaded as stored; the driver does any swizzling
+            fmt, bpp = self.pixel_formats[image.format()]
+            self._transfer.setRowLength(pixels.shape[1] // bpp)
+            self._texture.setData(fmt, QOpenGLTexture.UInt8, pixels.ctypes.data, self._transfer)
+            self._uploaded = self.store.serial
+
+        def paintGL(self):
+            f = self.context().functions()
+            f.glClearColor(0, 0, 0, 1)
+            f.glClear(0x00004000) # GL_COLOR_BUFFER_BIT
+            if self.store.image is None:
+                return
+            if self._uploaded != self.store.serial:
+                self._upload()
+
+            ratio = self.devicePixelRatio()
+            viewport = QRect(0, 0, int(self.width() * ratio), int(self.height() * ratio))
+            target = QRectF(self.store.fit_rect(viewport.width(), viewport.height()))
+            self._blitter.bind()
+            self._blitter.blit(self._texture.textureId(),
+                               QOpenGLTextureBlitter.targetTransform(target, viewport),
+                               QOpenGLTextureBlitter.OriginTopLeft)
+            self._blitter.release()
+else:
+    GLPresenter = None
+
+def _gl_context_available():
+    """True if this platform can actually create an OpenGL context (not the case on most CI)."""
+    return QOpenGLContext().create()
+
+def create_presenter(parent=None, backend=None):
+    """Best available presenter: OpenGL unless disabled or unavailable, else raster.
+
+    backend: 'opengl', 'raster' or None for GEOBOX_PRESENTER / auto. Headless
+    platforms (offscreen, minimal) and machines without a usable GL driver
+    get the raster presenter.
+    """
+    backend = backend or os.environ.get("GEOBOX_PRESENTER", "auto")
+    headless = os.environ.get("QT_QPA_PLATFORM", "") in ("offscreen", "minimal")
+    if backend != "raster" and GLPresenter is not None and not headless and _gl_context_available():
+        return GLPresenter(parent)
+    return RasterPresenter(parent)
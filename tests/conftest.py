@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The code imports as core.* / modules.*, like the benchmarks (run from the repo root)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
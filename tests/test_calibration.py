@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from core.calibration import ransac_dlt, back_project, solve_projector, synthetic_correspondences
+
+def test_recovers_known_projector():
+    uvd, proj, truth = synthetic_correspondences(poses=6, outliers=0.1)
+    result = solve_projector(uvd, proj)
+    np.testing.assert_allclose(result.K, truth["K"], rtol=0.01, atol=2.0)
+    np.testing.assert_allclose(result.R, truth["R"], atol=0.01)
+    # The garbage matches are the ones left out
+    assert not result.inliers[truth["outliers"]].any()
+    assert result.inliers[~truth["outliers"]].mean() > 0.95
+
+def test_synthetic_corners_lie_in_kinect_view():
+    for seed in range(10):
+        uvd, _, _ = synthetic_correspondences(poses=20, outliers=0.0, seed=seed)
+        assert (uvd[:, 0] >= 0).all() and (uvd[:, 0] < 640).all()
+        assert (uvd[:, 1] >= 0).all() and (uvd[:, 1] < 480).all()
+
+def test_rejects_pure_outliers():
+    rng = np.random.default_rng(0)
+    n = 120
+    uvd = np.column_stack([rng.uniform(0, 640, n), rng.uniform(0, 480, n), rng.uniform(800, 1100, n)])
+    proj = rng.uniform(0, [1024, 768], (n, 2))
+    with pytest.raises(ValueError):
+        solve_projector(uvd, proj)
+
+def test_ransac_rejects_too_few_points():
+    uvd, proj, _ = synthetic_correspondences(poses=1, outliers=0.0)
+    with pytest.raises(ValueError):
+        ransac_dlt(back_project(uvd[:5]), proj[:5])